@@ -1,23 +1,49 @@
 from django.contrib import admin
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Count, Min, Q
 from .models import (
     ElderProfile, Medication, MedicationSchedule, MedicationLog,
     Appointment, CareTask, EmergencyContact, VitalsLog,
-    IncidentReport, Notification, UserProfile
+    IncidentReport, Notification, UserProfile, OutboxEvent, Job, TaskRecurrence, CalendarFeed,
+    ImportRun, ScreeningTerm
 )
+from . import importer, jobs, screening, sharding, tasks, workload
+from .admin_tools import AutocompleteFilter, LargeTableAdmin, bulk_transition
+from .recurrence import generate_occurrences
+
+class AgeBandFilter(admin.SimpleListFilter):
+    title = 'age'
+    parameter_name = 'age_band'
+    
+    def lookups(self, request, model_admin):
+        return [(label, label) for label, _, _ in ElderProfile.AGE_BANDS]
+    
+    def queryset(self, request, queryset):
+        for label, min_age, max_age in ElderProfile.AGE_BANDS:
+            if self.value() == label:
+                return queryset.age_between(min_age, max_age)
+        return queryset
 
 @admin.register(ElderProfile)
-class ElderProfileAdmin(admin.ModelAdmin):
+class ElderProfileAdmin(LargeTableAdmin):
     list_display = ['full_name', 'age', 'gender', 'guardian', 'blood_type', 'created_at', 'updated_at']
-    list_filter = ['gender', 'blood_type', 'created_at', 'guardian']
+    list_filter = ['gender', AgeBandFilter, 'blood_type', 'created_at', ('guardian', AutocompleteFilter)]
+    list_select_related = ['guardian']
     search_fields = ['full_name', 'medical_conditions', 'address', 'guardian__username', 'guardian__first_name', 'guardian__last_name']
     readonly_fields = ['created_at', 'updated_at', 'age']
+    autocomplete_fields = ['guardian', 'caregivers']
+    ordering = ['full_name']
     fieldsets = (
         ('Basic Information', {
             'fields': ('guardian', 'full_name', 'date_of_birth', 'gender')
         }),
+        ('Care Team', {
+            'fields': ('caregivers',)
+        }),
         ('Contact Information', {
             'fields': ('address', 'phone', 'email')
         }),
@@ -30,9 +56,22 @@ class ElderProfileAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_age()
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        # Called while the list renders, so the report reads from the same database as the list
+        extra_context['age_bands'] = ElderProfile.objects.age_band_counts
+        return super().changelist_view(request, extra_context=extra_context)
+    
     def age(self, obj):
-        return obj.age if obj.age else 'N/A'
+        # The change form's readonly field has no annotation
+        age = obj.age_years if hasattr(obj, 'age_years') else obj.age
+        return age if age is not None else 'N/A'
     age.short_description = 'Age'
+    # Youngest first is latest birth date first, which the date_of_birth index returns in order
+    age.admin_order_field = '-date_of_birth'
 
 @admin.register(Medication)
 class MedicationAdmin(admin.ModelAdmin):
@@ -40,14 +79,20 @@ class MedicationAdmin(admin.ModelAdmin):
     list_filter = ['medication_type', 'is_active', 'manufacturer']
     search_fields = ['name', 'description', 'strength', 'manufacturer']
     list_editable = ['is_active']
+    ordering = ['name']
 
 @admin.register(MedicationSchedule)
-class MedicationScheduleAdmin(admin.ModelAdmin):
+class MedicationScheduleAdmin(LargeTableAdmin):
     list_display = ['elder', 'medication', 'dosage', 'frequency', 'start_date', 'end_date', 'is_active']
-    list_filter = ['frequency', 'is_active', 'start_date', 'end_date', 'elder']
+    list_filter = ['frequency', 'is_active', 'start_date', 'end_date', ('elder', AutocompleteFilter)]
+    list_select_related = ['elder', 'medication']
+    autocomplete_fields = ['elder', 'medication']
+    ordering = ['-pk']
     search_fields = ['elder__full_name', 'medication__name', 'dosage']
     list_editable = ['is_active']
     date_hierarchy = 'start_date'
+    readonly_fields = ['screening_warnings']
+    actions = ['deactivate_schedules']
     fieldsets = (
         ('Schedule Information', {
             'fields': ('elder', 'medication', 'dosage', 'frequency', 'start_date', 'end_date')
@@ -56,25 +101,41 @@ class MedicationScheduleAdmin(admin.ModelAdmin):
             'fields': ('time_1', 'time_2', 'time_3', 'instructions')
         }),
         ('Status', {
-            'fields': ('is_active',)
+            'fields': ('is_active', 'screening_warnings')
         })
     )
+    
+    def deactivate_schedules(self, request, queryset):
+        with sharding.atomic():
+            updated, elder_ids = bulk_transition(queryset, Q(is_active=True), {'is_active': False})
+            # A stopped schedule no longer duplicates the elder's other medications
+            screening.rescan(elder_ids)
+        self.message_user(request, f'{updated} schedules deactivated.')
+    deactivate_schedules.short_description = 'Deactivate selected schedules'
+    deactivate_schedules.allowed_permissions = ('change',)
 
 @admin.register(MedicationLog)
-class MedicationLogAdmin(admin.ModelAdmin):
+class MedicationLogAdmin(LargeTableAdmin):
     list_display = ['schedule', 'taken_at', 'taken_by', 'was_skipped']
-    list_filter = ['was_skipped', 'taken_at', 'schedule__elder']
+    list_filter = ['was_skipped', 'taken_at', ('schedule__elder', AutocompleteFilter)]
+    list_select_related = ()
+    list_prefetch_related = ['schedule__elder', 'schedule__medication', 'taken_by']
+    autocomplete_fields = ['schedule', 'taken_by']
+    ordering = ['-taken_at']
     search_fields = ['schedule__medication__name', 'schedule__elder__full_name', 'taken_by__username']
     readonly_fields = ['taken_at']
     date_hierarchy = 'taken_at'
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(LargeTableAdmin):
     list_display = ['title', 'elder', 'appointment_type', 'appointment_date', 'status', 'doctor_name']
-    list_filter = ['appointment_type', 'status', 'appointment_date', 'elder']
+    list_filter = ['appointment_type', 'status', 'appointment_date', ('elder', AutocompleteFilter)]
+    list_select_related = ['elder']
+    autocomplete_fields = ['elder']
     search_fields = ['title', 'elder__full_name', 'doctor_name', 'location', 'notes']
     list_editable = ['status']
     date_hierarchy = 'appointment_date'
+    actions = ['complete_appointments', 'cancel_appointments']
     fieldsets = (
         ('Appointment Details', {
             'fields': ('elder', 'title', 'appointment_type', 'appointment_date', 'duration')
@@ -86,17 +147,35 @@ class AppointmentAdmin(admin.ModelAdmin):
             'fields': ('notes', 'status', 'reminder_sent')
         })
     )
+    
+    UPCOMING_STATUSES = ['SCHEDULED', 'CONFIRMED', 'RESCHEDULED']
+    
+    def complete_appointments(self, request, queryset):
+        updated, _ = bulk_transition(queryset, Q(status__in=self.UPCOMING_STATUSES), {'status': 'COMPLETED'})
+        self.message_user(request, f'{updated} appointments marked as completed.')
+    complete_appointments.short_description = 'Mark selected appointments as completed'
+    complete_appointments.allowed_permissions = ('change',)
+    
+    def cancel_appointments(self, request, queryset):
+        updated, _ = bulk_transition(queryset, Q(status__in=self.UPCOMING_STATUSES), {'status': 'CANCELLED'})
+        self.message_user(request, f'{updated} appointments cancelled.')
+    cancel_appointments.short_description = 'Cancel selected appointments'
+    cancel_appointments.allowed_permissions = ('change',)
 
 @admin.register(CareTask)
-class CareTaskAdmin(admin.ModelAdmin):
+class CareTaskAdmin(LargeTableAdmin):
     list_display = ['title', 'elder', 'task_type', 'priority', 'status', 'assigned_to', 'due_date']
-    list_filter = ['task_type', 'priority', 'status', 'due_date', 'elder']
+    list_filter = ['task_type', 'priority', 'status', 'due_date', ('elder', AutocompleteFilter), ('assigned_to', AutocompleteFilter)]
+    list_select_related = ['elder', 'assigned_to']
+    raw_id_fields = ['recurrence']
+    autocomplete_fields = ['elder', 'assigned_to', 'completed_by']
     search_fields = ['title', 'description', 'elder__full_name', 'assigned_to__username']
     list_editable = ['status', 'priority']
     date_hierarchy = 'created_at'
+    actions = ['auto_assign', 'complete_tasks']
     fieldsets = (
         ('Task Information', {
-            'fields': ('elder', 'title', 'description', 'task_type', 'frequency')
+            'fields': ('elder', 'title', 'description', 'task_type', 'frequency', 'recurrence')
         }),
         ('Assignment & Priority', {
             'fields': ('assigned_to', 'priority', 'due_date')
@@ -106,10 +185,57 @@ class CareTaskAdmin(admin.ModelAdmin):
         })
     )
 
+    def auto_assign(self, request, queryset):
+        result = workload.auto_assign(queryset)
+        self.message_user(
+            request,
+            f'{result.assigned} tasks assigned to {result.caregivers} caregivers; '
+            f'{result.unassignable} left unassigned because their elder has no caregivers.'
+        )
+    auto_assign.short_description = 'Auto-assign unassigned tasks to the least loaded caregiver'
+    
+    def complete_tasks(self, request, queryset):
+        open_tasks = queryset.filter(status__in=workload.OPEN_STATUSES).order_by()
+        with sharding.atomic():
+            assignees = set(open_tasks.values_list('assigned_to_id', flat=True).distinct())
+            rule_ids = list(open_tasks.filter(recurrence__isnull=False).values_list('recurrence_id', flat=True).distinct())
+            updated, _ = bulk_transition(queryset, Q(status__in=workload.OPEN_STATUSES), {
+                'status': 'COMPLETED', 'completed_at': timezone.now(), 'completed_by': request.user,
+            })
+            workload.schedule_refresh(assignees)
+            if rule_ids:
+                generate_occurrences(rule_ids=rule_ids)
+        self.message_user(request, f'{updated} tasks marked as completed.')
+    complete_tasks.short_description = 'Mark selected tasks as completed'
+    complete_tasks.allowed_permissions = ('change',)
+
+@admin.register(TaskRecurrence)
+class TaskRecurrenceAdmin(admin.ModelAdmin):
+    list_display = ['title', 'elder', 'frequency', 'interval', 'weekdays', 'starts_at', 'ends_at', 'next_due', 'is_active']
+    list_filter = ['frequency', 'is_active']
+    list_select_related = ['elder']
+    search_fields = ['title', 'description', 'elder__full_name']
+    autocomplete_fields = ['elder', 'assigned_to']
+    readonly_fields = ['next_due', 'created_at']
+    actions = ['stop_series']
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.next_due = obj.starts_at
+        super().save_model(request, obj, form, change)
+    
+    def stop_series(self, request, queryset):
+        # Occurrences already generated stay; future ones are no longer created
+        updated = queryset.filter(is_active=True).update(is_active=False)
+        self.message_user(request, f'{updated} series stopped.')
+    stop_series.short_description = 'Stop generating the selected series'
+
 @admin.register(EmergencyContact)
-class EmergencyContactAdmin(admin.ModelAdmin):
+class EmergencyContactAdmin(LargeTableAdmin):
     list_display = ['name', 'elder', 'relation', 'phone', 'is_primary']
-    list_filter = ['relation', 'is_primary', 'elder']
+    list_filter = ['relation', 'is_primary', ('elder', AutocompleteFilter)]
+    list_select_related = ['elder']
+    autocomplete_fields = ['elder']
     search_fields = ['name', 'elder__full_name', 'phone', 'email']
     list_editable = ['is_primary']
     fieldsets = (
@@ -122,9 +248,14 @@ class EmergencyContactAdmin(admin.ModelAdmin):
     )
 
 @admin.register(VitalsLog)
-class VitalsLogAdmin(admin.ModelAdmin):
+class VitalsLogAdmin(LargeTableAdmin):
     list_display = ['elder', 'recorded_at', 'blood_pressure', 'heart_rate', 'temperature', 'weight', 'logged_by']
-    list_filter = ['recorded_at', 'elder', 'logged_by']
+    list_filter = ['recorded_at', ('elder', AutocompleteFilter), ('logged_by', AutocompleteFilter)]
+    list_select_related = ()
+    list_prefetch_related = ['elder', 'logged_by']
+    autocomplete_fields = ['elder', 'logged_by']
+    # Newest first along the date index, so drilling down never sorts a month of rows
+    ordering = ['-recorded_at']
     search_fields = ['elder__full_name', 'notes']
     readonly_fields = ['recorded_at']
     date_hierarchy = 'recorded_at'
@@ -147,12 +278,15 @@ class VitalsLogAdmin(admin.ModelAdmin):
     blood_pressure.short_description = 'Blood Pressure'
 
 @admin.register(IncidentReport)
-class IncidentReportAdmin(admin.ModelAdmin):
+class IncidentReportAdmin(LargeTableAdmin):
     list_display = ['incident_type', 'elder', 'incident_date', 'severity', 'is_resolved', 'reported_by']
-    list_filter = ['incident_type', 'severity', 'is_resolved', 'incident_date', 'elder']
+    list_filter = ['incident_type', 'severity', 'is_resolved', 'incident_date', ('elder', AutocompleteFilter)]
+    list_select_related = ['elder', 'reported_by']
+    autocomplete_fields = ['elder', 'reported_by', 'resolved_by']
     search_fields = ['elder__full_name', 'description', 'location', 'reported_by__username']
     list_editable = ['is_resolved']
     date_hierarchy = 'incident_date'
+    actions = ['resolve_incidents']
     fieldsets = (
         ('Incident Details', {
             'fields': ('elder', 'incident_type', 'incident_date', 'description', 'severity')
@@ -170,29 +304,178 @@ class IncidentReportAdmin(admin.ModelAdmin):
             'fields': ('reported_by',)
         })
     )
+    
+    def resolve_incidents(self, request, queryset):
+        updated, _ = bulk_transition(queryset, Q(is_resolved=False), {
+            'is_resolved': True, 'resolved_date': timezone.now(), 'resolved_by': request.user,
+        })
+        self.message_user(request, f'{updated} incidents marked as resolved.')
+    resolve_incidents.short_description = 'Mark selected incidents as resolved'
+    resolve_incidents.allowed_permissions = ('change',)
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(LargeTableAdmin):
     list_display = ['notification_type', 'elder', 'message_preview', 'priority', 'is_read', 'created_at']
-    list_filter = ['notification_type', 'priority', 'is_read', 'created_at']
+    list_filter = ['notification_type', 'priority', 'is_read', 'created_at', ('elder', AutocompleteFilter)]
+    list_select_related = ['elder']
+    autocomplete_fields = ['elder', 'read_by']
+    ordering = ['-created_at']
     search_fields = ['message', 'elder__full_name']
     list_editable = ['is_read', 'priority']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
+    actions = ['mark_read']
     
     def message_preview(self, obj):
         return obj.message[:50] + "..." if len(obj.message) > 50 else obj.message
     message_preview.short_description = 'Message'
+    
+    def mark_read(self, request, queryset):
+        updated, _ = bulk_transition(queryset, Q(is_read=False), {
+            'is_read': True, 'read_at': timezone.now(), 'read_by': request.user,
+        })
+        self.message_user(request, f'{updated} notifications marked as read.')
+    mark_read.short_description = 'Mark selected notifications as read'
+    mark_read.allowed_permissions = ('change',)
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'user_type', 'phone', 'is_active', 'created_at']
     list_filter = ['user_type', 'is_active', 'created_at']
+    list_select_related = ['user']
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'phone']
+    autocomplete_fields = ['user']
     list_editable = ['is_active']
     readonly_fields = ['created_at']
 
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdmin):
+    list_display = ['id', 'event_type', 'status', 'attempts', 'created_at', 'available_at', 'processed_at']
+    list_filter = ['status', 'event_type', 'created_at']
+    readonly_fields = ['event_type', 'payload', 'dedupe_key', 'attempts', 'created_at', 'processed_at', 'last_error']
+    date_hierarchy = 'created_at'
+    actions = ['retry_events']
+    
+    def retry_events(self, request, queryset):
+        updated = queryset.exclude(status=OutboxEvent.PENDING).update(
+            status=OutboxEvent.PENDING, attempts=0, available_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} events queued for retry.')
+    retry_events.short_description = 'Retry selected events'
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'task', 'created_at']
+    search_fields = ['task', 'unique_key', 'locked_by']
+    readonly_fields = ['attempts', 'unique_key', 'locked_by', 'locked_at', 'created_at', 'finished_at', 'last_error']
+    date_hierarchy = 'created_at'
+    actions = ['retry_jobs', 'cancel_jobs']
+    
+    def changelist_view(self, request, extra_context=None):
+        # Queue status summary shown above the job list
+        now = timezone.now()
+        extra_context = extra_context or {}
+        extra_context['task_status'] = Job.objects.values('task').annotate(
+            due=Count('pk', filter=Q(status=Job.PENDING, run_at__lte=now)),
+            scheduled=Count('pk', filter=Q(status=Job.PENDING, run_at__gt=now)),
+            running=Count('pk', filter=Q(status=Job.RUNNING)),
+            failed=Count('pk', filter=Q(status=Job.FAILED)),
+            done=Count('pk', filter=Q(status=Job.DONE)),
+            oldest_due=Min('run_at', filter=Q(status=Job.PENDING, run_at__lte=now)),
+        ).order_by('task')
+        extra_context['workers'] = Job.objects.filter(status=Job.RUNNING).values('locked_by').annotate(
+            running=Count('pk'), since=Min('locked_at')
+        ).order_by('locked_by')
+        extra_context['schedules'] = [
+            (schedule.task, schedule.cron.expression if schedule.cron else f'every {schedule.every}')
+            for schedule in jobs.SCHEDULES
+        ]
+        return super().changelist_view(request, extra_context=extra_context)
+    
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status__in=[Job.FAILED, Job.CANCELLED]).update(
+            status=Job.PENDING, attempts=0, run_at=timezone.now(), finished_at=None, last_error=''
+        )
+        self.message_user(request, f'{updated} jobs queued for retry.')
+    retry_jobs.short_description = 'Retry selected failed or cancelled jobs'
+    
+    def cancel_jobs(self, request, queryset):
+        updated = queryset.filter(status=Job.PENDING).update(status=Job.CANCELLED, finished_at=timezone.now())
+        self.message_user(request, f'{updated} jobs cancelled.')
+    cancel_jobs.short_description = 'Cancel selected pending jobs'
+
 # Customize admin site
 admin.site.site_header = "Special Care Platform Administration"
 admin.site.site_title = "Care Platform Admin"
 admin.site.index_title = "Welcome to Special Care Platform Administration"
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ['user', 'elder', 'created_at']
+    list_select_related = ['user', 'elder']
+    search_fields = ['user__username', 'elder__full_name']
+    autocomplete_fields = ['user', 'elder']
+    raw_id_fields = ['user', 'elder']
+    # The token is a password; it is shown to its owner on the subscriptions page only
+    exclude = ['token']
+
+@admin.register(ImportRun)
+class ImportRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'resource', 'status', 'rows_done', 'rows_imported', 'rows_rejected', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'resource', 'created_at']
+    date_hierarchy = 'created_at'
+    actions = ['resume_imports']
+    
+    def get_fieldsets(self, request, obj=None):
+        if obj is None:
+            listed = format_html_join(
+                mark_safe('<br>'), '<strong>{}</strong>: {}',
+                ((label, ', '.join(f'{name}*' if required else name for name, required in importer.columns(resource)))
+                 for resource, label in ImportRun.RESOURCE_CHOICES)
+            )
+            return [(None, {
+                'fields': ('resource', 'file', 'chunk_size'),
+                'description': format_html('Columns (* required):<br>{}', listed),
+            })]
+        return [
+            (None, {'fields': ('resource', 'file', 'chunk_size', 'status', 'created_by')}),
+            ('Progress', {'fields': ('rows_done', 'rows_imported', 'rows_rejected', 'started_at', 'finished_at', 'last_error')}),
+            ('Rejected Rows', {'fields': ('rejected_rows',)}),
+        ]
+    
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return []
+        return [field for _, options in self.get_fieldsets(request, obj) for field in options['fields']]
+    
+    def save_model(self, request, obj, form, change):
+        if change:
+            return super().save_model(request, obj, form, change)
+        obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        transaction.on_commit(lambda: jobs.enqueue(tasks.import_csv.task_name, obj.pk))
+    
+    def rejected_rows(self, obj):
+        return format_html_join(
+            mark_safe('<br>'), 'Line {}: {}',
+            ((rejected['line'], '; '.join(' '.join(messages) if name == '__all__' else f"{name}: {' '.join(messages)}"
+                                          for name, messages in rejected['errors'].items()))
+             for rejected in obj.errors)
+        ) or '-'
+    rejected_rows.short_description = 'First rejected rows'
+    
+    def resume_imports(self, request, queryset):
+        run_ids = list(queryset.filter(status=ImportRun.FAILED).values_list('pk', flat=True))
+        ImportRun.objects.filter(pk__in=run_ids).update(status=ImportRun.PENDING, last_error='')
+        for run_id in run_ids:
+            transaction.on_commit(lambda run_id=run_id: jobs.enqueue(tasks.import_csv.task_name, run_id))
+        self.message_user(request, f'{len(run_ids)} imports queued to resume.')
+    resume_imports.short_description = 'Resume selected failed imports'
+
+@admin.register(ScreeningTerm)
+class ScreeningTermAdmin(admin.ModelAdmin):
+    # Saving or deleting terms recompiles the matchers and rescans the active schedules (see signals.py)
+    list_display = ['term', 'concept']
+    search_fields = ['term', 'concept']
+    ordering = ['term', 'concept']
@@ -0,0 +1,296 @@
+"""
+Changelist building blocks for tables that grow without bound.
+
+The stock changelist costs grow with the table: it counts every row twice
+(the filtered total and the grand total), renders every related object as a
+filter link, and its date hierarchy finds the years, months or days to offer
+with SELECT DISTINCT over every row. LargeTableAdmin instead:
+
+- counts an unfiltered list with the database's own row estimate (the
+  planner statistics kept by PostgreSQL's ANALYZE, MySQL's table status and
+  SQLite's ANALYZE) once the table has more than ESTIMATE_THRESHOLD rows,
+  and skips the grand total;
+- filters by related objects through AutocompleteFilter, a search box
+  backed by the admin's autocomplete view that only ever loads the selected
+  object;
+- gets the drill-down from the indexed_date_hierarchy tag (see
+  templatetags/care_admin.py), which reads the first and last date with two
+  index probes and links every period in between.
+
+Counts of filtered lists stay exact; they run on the filter's index. When
+elder data is sharded (see sharding.py), the lists of elder rows get a
+ShardFilter picking the facility database they show.
+
+Actions on a whole filtered list ("Select all") must not save row by row
+either. bulk_transition() moves the rows in a given state to another with
+UPDATEs of TRANSITION_BATCH_SIZE rows and does what the model's signals
+would have done, and every LargeTableAdmin offers export_as_csv, which
+streams the selected rows as they are read. The admins of the models with
+archived history (see archive.py) also offer export_with_archive_as_csv,
+which follows the selected rows with their elders' archived rows.
+"""
+import csv
+import itertools
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.options import IS_POPUP_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import archive, cache_versions, replicas, sharding
+from .changelog import record_changes
+from .models import ElderCareSummary
+from .signals import FRAGMENT_CACHED_MODELS, SUMMARY_SECTIONS
+
+# Below this many rows an exact count is cheap and an estimate needlessly vague
+ESTIMATE_THRESHOLD = 100000
+# Rows per UPDATE; well under the bound parameter limit of every backend
+TRANSITION_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+
+
+def estimated_count(model, using='default'):
+    """The database's estimate of the rows in ``model``'s table, or None if it keeps none"""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        # A partitioned table's rows are its partitions' (see partitions.py)
+        sql, params = (
+            "SELECT CASE WHEN p.relkind = 'p' THEN (SELECT SUM(GREATEST(c.reltuples, 0)) FROM pg_inherits i "
+            'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = p.oid) ELSE p.reltuples END::bigint '
+            'FROM pg_class p WHERE p.oid = %s::regclass'
+        ), [connection.ops.quote_name(table)]
+    elif connection.vendor == 'mysql':
+        sql, params = ('SELECT table_rows FROM information_schema.tables '
+                       'WHERE table_schema = DATABASE() AND table_name = %s'), [table]
+    elif connection.vendor == 'sqlite':
+        # The first number of every sqlite_stat1 row of a table is its row count; a
+        # partitioned log's rows are in its month tables
+        sql, params = (
+            'SELECT SUM(CAST(stat AS INTEGER)) FROM (SELECT MIN(stat) AS stat FROM sqlite_stat1 '
+            'WHERE tbl = %s OR tbl GLOB %s GROUP BY tbl)'
+        ), [table, f'{table}_p[0-9]*']
+    else:
+        return None
+    try:
+        # A savepoint, so a missing statistics table cannot break the request's transaction
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    # PostgreSQL reports -1 for a table that was never analyzed
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts an unfiltered queryset of a large table with the database's row estimate"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Filter by a related object picked from a search box instead of a list of
+    every object; the related model's admin needs search_fields
+    """
+    template = 'admin/care_app/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.model_admin = model_admin
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        # Only the selected object is loaded; the search box fetches the others
+        selected = [value for value in self.lookup_val or [] if value]
+        if not selected:
+            return []
+        return field.get_choices(include_blank=False, limit_choices_to={'pk__in': selected})
+
+    def has_output(self):
+        return True
+
+    def widget(self):
+        remote_model = self.field.remote_field.model
+        choice_field = forms.ModelChoiceField(
+            queryset=remote_model._default_manager.all(), required=False,
+            widget=AutocompleteSelect(self.field, self.model_admin.admin_site, attrs={
+                'data-filter-parameter': self.lookup_kwarg,
+                'data-clear-parameters': self.lookup_kwarg_isnull,
+            }),
+        )
+        value = self.lookup_val[-1] if self.lookup_val else None
+        return choice_field.widget.render(self.lookup_kwarg, value, attrs={'id': f'filter_{self.lookup_kwarg}'})
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """The facility database a changelist shows; ShardMiddleware has already switched the request to it"""
+    title = 'database'
+    parameter_name = sharding.SHARD_PARAMETER
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.shard_aliases()]
+
+    def queryset(self, request, queryset):
+        return queryset
+
+    def choices(self, changelist):
+        # There is no list of every shard, so one is always selected
+        current = sharding.current_shard()
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': alias == current,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+
+def bulk_transition(queryset, condition, values, batch_size=TRANSITION_BATCH_SIZE):
+    """
+    Set ``values`` on the rows of ``queryset`` matching ``condition`` (a Q
+    object), a batch at a time, in one transaction; the model needs an elder
+    foreign key. Returns (rows updated, elder ids of those rows).
+    """
+    model = queryset.model
+    values = dict(values)
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        values.setdefault('updated_at', timezone.now())
+    with sharding.atomic():
+        pks = list(queryset.filter(condition).order_by().values_list('pk', flat=True))
+        rows = {}
+        updated = 0
+        for start in range(0, len(pks), batch_size):
+            # Locked, the rows still matching the condition are the ones the UPDATE changes;
+            # the rest someone else has moved on since they were read
+            batch = dict(
+                model._base_manager.select_for_update().filter(condition, pk__in=pks[start:start + batch_size])
+                .values_list('pk', 'elder_id')
+            )
+            updated += model._base_manager.filter(condition, pk__in=list(batch)).update(**values)
+            rows.update(batch)
+        record_changes(model, list(rows))
+        elder_ids = set(rows.values())
+        if model in SUMMARY_SECTIONS:
+            summarized = [elder_id for elder_id in elder_ids if elder_id is not None]
+            # One rebuild on the next read instead of one per elder while the admin waits
+            transaction.on_commit(lambda: ElderCareSummary.objects.filter(pk__in=summarized).delete())
+        if model in FRAGMENT_CACHED_MODELS:
+            label = model._meta.model_name
+            for elder_id in elder_ids:
+                transaction.on_commit(lambda elder_id=elder_id: cache_versions.bump(label, elder_id))
+    return updated, elder_ids
+
+
+class _Echo:
+    """File-like object csv.writer writes to, handing each row back to the response"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_response(opts, fields, rows):
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow([field.name for field in fields])
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv; charset=utf-8')
+    filename = f'{opts.model_name}-{timezone.localdate():%Y%m%d}.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _export_rows(modeladmin, request, queryset):
+    opts = modeladmin.model._meta
+    excluded = set(modeladmin.exclude or ())
+    fields = [field for field in opts.concrete_fields if field.name not in excluded]
+    # Actions are POSTed and this streams after the action returns, so replica_reads cannot pick the database
+    replica = replicas.replica_for(request.user)
+    if replica is not None:
+        queryset = queryset.using(replica)
+    rows = queryset.select_related(None).prefetch_related(None).values_list(
+        *(field.attname for field in fields)
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return queryset, fields, rows
+
+
+def export_as_csv(modeladmin, request, queryset):
+    """Stream the selected rows' fields, related objects as ids, without loading them all"""
+    _, fields, rows = _export_rows(modeladmin, request, queryset)
+    return _csv_response(modeladmin.model._meta, fields, rows)
+export_as_csv.short_description = 'Export selected %(verbose_name_plural)s as CSV'
+export_as_csv.allowed_permissions = ('view',)
+
+
+def export_with_archive_as_csv(modeladmin, request, queryset):
+    """export_as_csv, followed by the archived rows of the selected rows' elders, a month at a time"""
+    queryset, fields, rows = _export_rows(modeladmin, request, queryset)
+    spec = archive.ARCHIVED_MODELS[modeladmin.model._meta.label]
+    elder_ids = queryset.order_by().exclude(**{f'{spec.elder}__isnull': True}).values_list(spec.elder, flat=True).distinct()
+
+    def archived_rows():
+        for obj in archive.read_rows(modeladmin.model, list(elder_ids), using=queryset.db):
+            yield [getattr(obj, field.attname) for field in fields]
+
+    return _csv_response(modeladmin.model._meta, fields, itertools.chain(rows, archived_rows()))
+export_with_archive_as_csv.short_description = "Export selected %(verbose_name_plural)s and their elders' archived history as CSV"
+export_with_archive_as_csv.allowed_permissions = ('view',)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin with estimated changelist counts, a CSV export and the scripts AutocompleteFilter needs"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Related objects shown in the list, fetched with one query each rather than joined (set
+    # list_select_related = () with it): on the biggest tables a join can tempt the planner to
+    # start from the small related table and sort millions of rows for one page
+    list_prefetch_related = ()
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.list_prefetch_related:
+            queryset = queryset.prefetch_related(*self.list_prefetch_related)
+        return queryset
+
+    def changelist_view(self, request, extra_context=None):
+        # Only GET requests use a replica; actions are POSTed
+        return replicas.replica_reads(super().changelist_view)(request, extra_context)
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if sharding.is_sharded(self.model) and len(sharding.shard_aliases()) > 1:
+            list_filter = [ShardFilter, *list_filter]
+        return list_filter
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if self.actions is not None and IS_POPUP_VAR not in request.GET and self.has_view_permission(request):
+            actions['export_as_csv'] = self.get_action(export_as_csv)
+            if self.model._meta.label in archive.ARCHIVED_MODELS:
+                actions['export_with_archive_as_csv'] = self.get_action(export_with_archive_as_csv)
+        return actions
+
+    @property
+    def media(self):
+        media = super().media
+        if any(isinstance(spec, tuple) and spec[1] is AutocompleteFilter for spec in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+            media += forms.Media(js=['care_app/js/admin_autocomplete_filter.js'])
+        return media
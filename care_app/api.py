@@ -0,0 +1,407 @@
+"""
+Versioned read-only API for the mobile app.
+
+    GET /api/v1/<resource>/          cursor-paginated list
+    GET /api/v1/<resource>/<id>/     single object
+
+Query parameters:
+
+    fields=a,b                only return these fields of the requested resource
+    fields[<resource>]=a,b    only return these fields of an included resource
+    include=a,b.c             embed related objects; each relation is loaded with
+                              one batched query for the whole page, never per row
+    elder=<id>                only rows belonging to this elder
+    limit=<n>&cursor=<c>      page size and the opaque cursor from "next"
+    format=msgpack            MessagePack instead of JSON (or Accept: application/msgpack)
+
+Offline devices keep a sync token and call GET /api/v1/changes/?since=<token>
+to receive only the rows inserted, updated or deleted since then (see
+changelog.py); without ``since`` it returns the token to start from. The
+response also lists the elders that left the user's scope ("revoked": drop
+every stored row of theirs) and that entered it ("granted": fetch their rows
+with the lists' ``elder=<id>`` filter).
+
+A caregiver's whole roster is one request, e.g.
+/api/v1/elders/?include=medication_schedules.medication,appointments,care_tasks,emergency_contacts
+"""
+import base64
+import json
+from collections import namedtuple
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.db.models import Prefetch, Q
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from . import changelog
+from .conditional import across_scope, scoped_elders
+from .models import (
+    ElderProfile, Medication, MedicationSchedule, MedicationLog, Appointment,
+    CareTask, EmergencyContact, VitalsLog, IncidentReport, Notification, ChangeLogEntry
+)
+from .summary import _encode
+
+try:
+    import msgpack
+except ImportError:  # MessagePack support is optional
+    msgpack = None
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_INCLUDE_DEPTH = 3
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _owned_by(path, include_unassigned=False):
+    """Scope rows to the elders the user may see, following ``path`` to the elder"""
+    def scope(queryset, elders):
+        if elders is None:
+            return queryset
+        condition = Q(**{f'{path}__in': elders})
+        if include_unassigned:
+            condition |= Q(**{f'{path}__isnull': True})
+        return queryset.filter(condition)
+    return scope
+
+
+# relations map an include name (forward foreign key or reverse accessor) to a
+# resource name; resources without a scope can only be reached through include
+Resource = namedtuple('Resource', ['model', 'fields', 'relations', 'scope'])
+
+RESOURCES = {
+    'elders': Resource(
+        model=ElderProfile,
+        fields=[
+            'id', 'guardian', 'full_name', 'date_of_birth', 'gender', 'address', 'phone', 'email',
+            'medical_conditions', 'allergies', 'blood_type', 'emergency_notes', 'created_at', 'updated_at',
+        ],
+        relations={
+            'guardian': 'users',
+            'medication_schedules': 'schedules',
+            'appointments': 'appointments',
+            'care_tasks': 'tasks',
+            'emergency_contacts': 'contacts',
+            'vitals_logs': 'vitals',
+            'incident_reports': 'incidents',
+            'notifications': 'notifications',
+        },
+        scope=_owned_by('pk'),
+    ),
+    'schedules': Resource(
+        model=MedicationSchedule,
+        fields=[
+            'id', 'elder', 'medication', 'dosage', 'frequency', 'start_date', 'end_date',
+            'time_1', 'time_2', 'time_3', 'instructions', 'is_active', 'created_at',
+        ],
+        relations={'elder': 'elders', 'medication': 'medications', 'logs': 'logs'},
+        scope=_owned_by('elder'),
+    ),
+    'logs': Resource(
+        model=MedicationLog,
+        fields=['id', 'schedule', 'taken_at', 'taken_by', 'notes', 'was_skipped', 'skip_reason'],
+        relations={'schedule': 'schedules', 'taken_by': 'users'},
+        scope=_owned_by('schedule__elder'),
+    ),
+    'appointments': Resource(
+        model=Appointment,
+        fields=[
+            'id', 'elder', 'title', 'appointment_type', 'appointment_date', 'duration', 'location',
+            'doctor_name', 'phone', 'notes', 'status', 'reminder_sent', 'created_at', 'updated_at',
+        ],
+        relations={'elder': 'elders'},
+        scope=_owned_by('elder'),
+    ),
+    'tasks': Resource(
+        model=CareTask,
+        fields=[
+            'id', 'elder', 'title', 'description', 'task_type', 'frequency', 'assigned_to', 'status',
+            'priority', 'due_date', 'completed_at', 'completed_by', 'notes', 'created_at', 'updated_at',
+        ],
+        relations={'elder': 'elders', 'assigned_to': 'users', 'completed_by': 'users'},
+        scope=_owned_by('elder'),
+    ),
+    'contacts': Resource(
+        model=EmergencyContact,
+        fields=[
+            'id', 'elder', 'name', 'relation', 'phone', 'phone_2', 'email', 'address',
+            'is_primary', 'notes', 'created_at', 'updated_at',
+        ],
+        relations={'elder': 'elders'},
+        scope=_owned_by('elder'),
+    ),
+    'vitals': Resource(
+        model=VitalsLog,
+        fields=[
+            'id', 'elder', 'recorded_at', 'blood_pressure_systolic', 'blood_pressure_diastolic',
+            'heart_rate', 'temperature', 'weight', 'oxygen_saturation', 'blood_sugar', 'notes',
+            'logged_by', 'updated_at',
+        ],
+        relations={'elder': 'elders', 'logged_by': 'users'},
+        scope=_owned_by('elder'),
+    ),
+    'incidents': Resource(
+        model=IncidentReport,
+        fields=[
+            'id', 'elder', 'incident_type', 'report_date', 'incident_date', 'description', 'severity',
+            'location', 'witnesses', 'actions_taken', 'follow_up_required', 'follow_up_notes',
+            'reported_by', 'is_resolved', 'resolved_date', 'resolved_by',
+        ],
+        relations={'elder': 'elders', 'reported_by': 'users', 'resolved_by': 'users'},
+        scope=_owned_by('elder'),
+    ),
+    'notifications': Resource(
+        model=Notification,
+        fields=[
+            'id', 'elder', 'notification_type', 'message', 'priority', 'is_read', 'read_at',
+            'read_by', 'created_at', 'expires_at', 'updated_at',
+        ],
+        relations={'elder': 'elders', 'read_by': 'users'},
+        scope=_owned_by('elder', include_unassigned=True),
+    ),
+    'medications': Resource(
+        model=Medication,
+        fields=['id', 'name', 'description', 'medication_type', 'strength', 'manufacturer', 'is_active'],
+        relations={},
+        scope=None,
+    ),
+    'users': Resource(
+        model=User,
+        fields=['id', 'username', 'first_name', 'last_name'],
+        relations={},
+        scope=None,
+    ),
+}
+
+# What to load and return for one resource, and for each relation embedded in it
+Selection = namedtuple('Selection', ['resource', 'fields', 'includes'])
+
+
+def _split(value):
+    return [item for item in (part.strip() for part in value.split(',')) if item]
+
+
+def _selection(request, name, include_paths=(), primary=False):
+    resource = RESOURCES[name]
+    requested = request.GET.get('fields') if primary else None
+    if requested is None:
+        requested = request.GET.get(f'fields[{name}]')
+    fields = resource.fields if requested is None else _split(requested)
+    unknown = set(fields) - set(resource.fields)
+    if unknown:
+        raise APIError(f"Unknown fields for {name}: {', '.join(sorted(unknown))}")
+    if 'id' not in fields:
+        fields = ['id'] + fields
+
+    nested = {}
+    for path in include_paths:
+        relation, _, rest = path.partition('.')
+        if relation not in resource.relations:
+            raise APIError(f"{name} has no relation {relation!r}")
+        nested.setdefault(relation, [])
+        if rest:
+            nested[relation].append(rest)
+    includes = {
+        relation: _selection(request, resource.relations[relation], paths)
+        for relation, paths in nested.items()
+    }
+    return Selection(resource, fields, includes)
+
+
+def _include_paths(request):
+    paths = _split(request.GET.get('include', ''))
+    if any(path.count('.') + 1 > MAX_INCLUDE_DEPTH for path in paths):
+        raise APIError(f'Includes may be at most {MAX_INCLUDE_DEPTH} levels deep.')
+    return paths
+
+
+def _load(queryset, selection, extra_fields=()):
+    """Restrict ``queryset`` to the selected columns and prefetch every include in one query each"""
+    opts = selection.resource.model._meta
+    columns = set(selection.fields) | set(extra_fields)
+    prefetches = []
+    for relation, child in selection.includes.items():
+        field = opts.get_field(relation)
+        child_extra = ()
+        if field.one_to_many:
+            # The reverse side needs the foreign key to attach rows to their parent
+            child_extra = (field.field.name,)
+        else:
+            columns.add(relation)
+        child_queryset = child.resource.model.objects.all()
+        if not child.resource.model._meta.ordering:
+            child_queryset = child_queryset.order_by('pk')
+        prefetches.append(Prefetch(relation, queryset=_load(child_queryset, child, child_extra)))
+    return queryset.only(*columns).prefetch_related(*prefetches)
+
+
+def _serialize(obj, selection):
+    opts = selection.resource.model._meta
+    row = {name: _encode(getattr(obj, opts.get_field(name).attname)) for name in selection.fields}
+    for relation, child in selection.includes.items():
+        related = getattr(obj, relation)
+        if opts.get_field(relation).one_to_many:
+            row[relation] = [_serialize(item, child) for item in related.all()]
+        else:
+            row[relation] = None if related is None else _serialize(related, child)
+    return row
+
+
+def _encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise APIError('Invalid cursor.')
+
+
+def _page_size(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise APIError('limit must be an integer.')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _wants_msgpack(request):
+    if request.GET.get('format') == 'msgpack':
+        return True
+    accept = request.headers.get('Accept', '')
+    return any(content_type in accept for content_type in MSGPACK_TYPES)
+
+
+def _render(request, payload, status=200):
+    if _wants_msgpack(request):
+        if msgpack is None:
+            response = JsonResponse({'error': 'MessagePack encoding is not available.'}, status=406)
+        else:
+            response = HttpResponse(msgpack.packb(payload), content_type=MSGPACK_TYPES[0], status=status)
+    else:
+        response = HttpResponse(
+            json.dumps(payload, separators=(',', ':')), content_type='application/json', status=status
+        )
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def _resource(name):
+    resource = RESOURCES.get(name)
+    if resource is None or resource.scope is None:
+        raise APIError(f'Unknown resource {name!r}.', status=404)
+    return resource
+
+
+def _scoped_queryset(request, resource):
+    elders = scoped_elders(request)
+    if 'elder' in request.GET:
+        try:
+            elder_id = int(request.GET['elder'])
+        except ValueError:
+            raise APIError('elder must be an integer.')
+        elders = (elders if elders is not None else ElderProfile.objects.all()).filter(pk=elder_id)
+    return resource.scope(resource.model.objects.all(), elders)
+
+
+def api_view(view_func):
+    """Session-authenticated, read-only API endpoint that reports errors as JSON"""
+    @require_safe
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except APIError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return _wrapped_view
+
+
+@api_view
+def api_list(request, resource_name):
+    resource = _resource(resource_name)
+    selection = _selection(request, resource_name, _include_paths(request), primary=True)
+    limit = _page_size(request)
+
+    # The user's elders may be on several shards; the pages merge them by id
+    queryset = across_scope(request, _scoped_queryset(request, resource).order_by('pk'))
+    if request.GET.get('cursor'):
+        queryset = queryset.filter(pk__gt=_decode_cursor(request.GET['cursor']))
+    rows = list(_load(queryset, selection)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].pk)
+    return _render(request, {'data': [_serialize(obj, selection) for obj in rows], 'next': next_cursor})
+
+
+@api_view
+def api_detail(request, resource_name, pk):
+    resource = _resource(resource_name)
+    selection = _selection(request, resource_name, _include_paths(request), primary=True)
+    obj = _load(_scoped_queryset(request, resource).filter(pk=pk), selection).first()
+    if obj is None:
+        raise APIError('Not found.', status=404)
+    return _render(request, {'data': _serialize(obj, selection)})
+
+
+@api_view
+def api_changes(request):
+    if 'since' not in request.GET:
+        # New devices take a token first and then fetch the lists; replaying
+        # changes made in between is harmless because upserts are idempotent
+        token = _encode_cursor(changelog.latest_token())
+        return _render(request, {'changes': {}, 'granted': [], 'revoked': [], 'next': token, 'more': False})
+
+    since = _decode_cursor(request.GET['since'])
+    if changelog.is_expired(since):
+        raise APIError('Sync token has expired; fetch the lists again.', status=410)
+    elders = scoped_elders(request)
+    entries, next_token, more = changelog.changes_since(
+        since, elders if elders is None else across_scope(request, elders), _page_size(request), request.user
+    )
+
+    # Only the last action per object, and per elder entering or leaving scope, matters to the device
+    actions, scope = {}, {}
+    for entry in entries:
+        if entry.action in (ChangeLogEntry.GRANT, ChangeLogEntry.REVOKE):
+            scope[entry.elder_id] = entry.action
+        else:
+            actions[(entry.resource, entry.object_id)] = entry.action
+    upserts, deletes = {}, {}
+    for (name, object_id), action in actions.items():
+        target = upserts if action == ChangeLogEntry.UPSERT else deletes
+        target.setdefault(name, []).append(object_id)
+
+    changes = {}
+    for name in sorted(upserts.keys() | deletes.keys()):
+        resource = RESOURCES[name]
+        queryset = resource.model.objects.filter(pk__in=upserts.get(name, []))
+        if resource.scope is not None:
+            queryset = across_scope(request, resource.scope(queryset, elders))
+        selection = _selection(request, name)
+        rows = list(_load(queryset.order_by('pk'), selection))
+        # Rows deleted or moved out of scope since they were logged go out as deletes
+        found = {obj.pk for obj in rows}
+        gone = [pk for pk in upserts.get(name, []) if pk not in found]
+        changes[name] = {
+            'upserts': [_serialize(obj, selection) for obj in rows],
+            'deletes': deletes.get(name, []) + gone,
+        }
+    return _render(request, {
+        'changes': changes,
+        'granted': sorted(pk for pk, action in scope.items() if action == ChangeLogEntry.GRANT),
+        'revoked': sorted(pk for pk, action in scope.items() if action == ChangeLogEntry.REVOKE),
+        'next': _encode_cursor(next_token),
+        'more': more,
+    })
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class CareAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'care_app'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,405 @@
+"""
+Cold archive of old log rows.
+
+The vitals and medication logs and read notifications are only ever added
+to; after a few months they are read for audits, not for care. With
+CARE_ARCHIVE_AFTER_DAYS set, archive_old_rows(), run daily by the
+archive_history job and by the command of that name, moves the rows of
+every whole (UTC) month older than that out of their table into files under
+CARE_ARCHIVE_ROOT, a directory outside MEDIA_ROOT that every web and job
+process reads (shards share it). The rows of ARCHIVED_MODELS matching their
+condition are written one file per elder, model and month, and an
+ArchivedMonth row per file is the manifest the readers look files up in.
+Rows that turn up later for an archived month (back-dated entries, a moved
+elder) are merged into a new version of its file on the next run.
+
+Rows leave the table with raw deletes, without change log entries or
+signals: they still exist, like rows moved to another shard. Notifications
+without an elder are not archived. Archive the logs' months before
+CARE_PARTITION_RETENTION_MONTHS detaches them (see partitions.py); the
+archiver only sees the live table.
+
+A file holds its rows by column: the magic bytes, the length of a JSON
+header naming each column's kind and place, then each column as a
+zlib-compressed JSON list. Ids, foreign keys and times are stored as the
+differences between neighbouring rows, which compress to a few bytes a row.
+Readers memory-map the files, so the pages of a file are shared by the
+processes reading it and only the columns asked for are decompressed.
+
+Archived rows are read through, on demand, by the vitals list and detail
+pages (?archived=1 and ?elder_id=) and the admin's
+export_with_archive_as_csv; see WithArchive, read_rows() and find().
+They come back as model instances with archived = True, which are not to
+be saved.
+"""
+import datetime
+import heapq
+import json
+import mmap
+import os
+import secrets
+import struct
+import zlib
+from collections import OrderedDict, namedtuple
+from itertools import groupby
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+
+from . import cache_versions, sharding
+from .models import ArchivedMonth
+from .partitions import add_months, month_of
+from .summary import schedule_refresh
+
+# How a model's rows are archived: the time field that dates them, the lookup
+# of their elder, which rows may go, the related objects the readers load and
+# the summary section showing them
+Archived = namedtuple('Archived', ['time', 'elder', 'condition', 'related', 'section'])
+
+ARCHIVED_MODELS = {
+    'care_app.VitalsLog': Archived('recorded_at', 'elder_id', Q(), ['elder', 'logged_by'], 'recent_vitals'),
+    'care_app.MedicationLog': Archived('taken_at', 'schedule__elder_id', Q(), ['schedule', 'taken_by'], None),
+    'care_app.Notification': Archived('created_at', 'elder_id', Q(is_read=True), ['elder', 'read_by'], None),
+}
+MAGIC = b'CAREARC1'
+COMPRESSION_LEVEL = 9
+DELETE_BATCH_SIZE = 1000
+# Files each process keeps mapped
+OPEN_FILES = 64
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Full path -> ArchiveFile, least recently read first
+_open_files = OrderedDict()
+
+
+def archive_root():
+    root = getattr(settings, 'CARE_ARCHIVE_ROOT', None)
+    if not root:
+        raise ImproperlyConfigured('CARE_ARCHIVE_ROOT must name the directory of the archive files.')
+    return root
+
+
+def archive_after_days():
+    return getattr(settings, 'CARE_ARCHIVE_AFTER_DAYS', None)
+
+
+def archived_models():
+    return [apps.get_model(label) for label in ARCHIVED_MODELS]
+
+
+def _kind(field):
+    if isinstance(field, models.DateTimeField):
+        return 'time'
+    if isinstance(field, (models.IntegerField, models.AutoField, models.ForeignKey)):
+        return 'int'
+    return 'value'
+
+
+def _deltas(values):
+    previous, deltas = 0, []
+    for value in values:
+        if value is None:
+            deltas.append(None)
+        else:
+            deltas.append(value - previous)
+            previous = value
+    return deltas
+
+
+def _sums(deltas):
+    total, values = 0, []
+    for delta in deltas:
+        if delta is None:
+            values.append(None)
+        else:
+            total += delta
+            values.append(total)
+    return values
+
+
+def _microseconds(value):
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _time(microseconds):
+    if microseconds is None:
+        return None
+    value = _EPOCH + datetime.timedelta(microseconds=microseconds)
+    return value.replace(tzinfo=datetime.timezone.utc) if settings.USE_TZ else value
+
+
+def _encode(kind, values):
+    if kind == 'int':
+        return _deltas(values)
+    if kind == 'time':
+        return _deltas([_microseconds(value) for value in values])
+    return [
+        value if value is None or isinstance(value, (bool, int, float, str)) else
+        value.isoformat() if isinstance(value, (datetime.date, datetime.time)) else str(value)
+        for value in values
+    ]
+
+
+def _decode(field, kind, values):
+    if kind == 'int':
+        return _sums(values)
+    if kind == 'time':
+        return [_time(value) for value in _sums(values)]
+    return [None if value is None else field.to_python(value) for value in values]
+
+
+def write_file(path, model, rows):
+    """Write ``rows``, tuples of the values of model's concrete fields, to ``path``; returns its size"""
+    fields = model._meta.concrete_fields
+    columns, blocks, offset = [], [], 0
+    for position, field in enumerate(fields):
+        kind = _kind(field)
+        values = _encode(kind, [row[position] for row in rows])
+        block = zlib.compress(json.dumps(values, separators=(',', ':')).encode(), COMPRESSION_LEVEL)
+        columns.append([field.attname, kind, offset, len(block)])
+        blocks.append(block)
+        offset += len(block)
+    header = json.dumps({'model': model._meta.label, 'rows': len(rows), 'columns': columns}).encode()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A reader never sees half a file, and a crash leaves at worst a stray .tmp
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as handle:
+        handle.write(MAGIC)
+        handle.write(struct.pack('<I', len(header)))
+        handle.write(header)
+        for block in blocks:
+            handle.write(block)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+    return len(MAGIC) + 4 + len(header) + offset
+
+
+class ArchiveFile:
+    """A memory-mapped archive file, decompressing a column when it is asked for"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not an archive file.')
+        start = len(MAGIC) + 4
+        (length,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        header = json.loads(self._map[start:start + length])
+        self._data = start + length
+        self.model_label = header['model']
+        self.rows = header['rows']
+        self._columns = {attname: (kind, offset, size) for attname, kind, offset, size in header['columns']}
+
+    def column(self, field):
+        """The values of ``field``, or its default on every row if the file predates it"""
+        if field.attname not in self._columns:
+            return [field.get_default()] * self.rows
+        kind, offset, size = self._columns[field.attname]
+        start = self._data + offset
+        return _decode(field, kind, json.loads(zlib.decompress(self._map[start:start + size])))
+
+    def values(self, model):
+        """Tuples of the values of ``model``'s concrete fields, in file order"""
+        return list(zip(*(self.column(field) for field in model._meta.concrete_fields)))
+
+
+def _open(path):
+    path = os.path.join(archive_root(), path)
+    archive_file = _open_files.pop(path, None)
+    if archive_file is None:
+        archive_file = ArchiveFile(path)
+        # Evicted maps close once the readers still holding them are done
+        while len(_open_files) >= OPEN_FILES:
+            _open_files.popitem(last=False)
+    # Files are never rewritten in place, so a mapped one stays current
+    _open_files[path] = archive_file
+    return archive_file
+
+
+def remove_file(path):
+    """Remove the archive file at ``path``, relative to CARE_ARCHIVE_ROOT, if it is there"""
+    try:
+        os.remove(os.path.join(archive_root(), path))
+    except FileNotFoundError:
+        pass
+
+
+def _instances(model, month, rows=None):
+    """Model instances of the rows of an ArchivedMonth (all of them, or the positions in ``rows``)"""
+    values = _open(month.path).values(model)
+    if rows is not None:
+        values = [values[position] for position in rows]
+    attnames = [field.attname for field in model._meta.concrete_fields]
+    instances = []
+    for row in values:
+        instance = model.from_db(month._state.db, attnames, row)
+        instance.archived = True
+        instances.append(instance)
+    return instances
+
+
+def archived_months(model, elders=None, using=None):
+    """The manifest rows of ``model``'s archived months, of the given elders (ids or a queryset) or of all"""
+    months = ArchivedMonth.objects.filter(model_label=model._meta.label)
+    if using is not None:
+        months = months.using(using)
+    if elders is not None:
+        months = months.filter(elder__in=elders)
+    return months
+
+
+def read_rows(model, elders=None, using=None):
+    """
+    Archived rows of ``model``, newest first, of the given elders (ids or a
+    queryset) or of all; a month's files are read when the reader gets to it
+    """
+    spec = ARCHIVED_MODELS[model._meta.label]
+    time = model._meta.get_field(spec.time).attname
+    months = archived_months(model, elders, using).order_by('-month', 'elder_id').iterator()
+    for _, group in groupby(months, key=lambda month: month.month):
+        instances = [instance for month in group for instance in _instances(model, month)]
+        instances.sort(key=lambda instance: (getattr(instance, time), instance.pk), reverse=True)
+        prefetch_related_objects(instances, *spec.related)
+        yield from instances
+
+
+def find(model, pk, elder_id=None, using=None):
+    """The archived ``model`` row ``pk`` (of ``elder_id``, to look in that elder's files only), or None"""
+    months = archived_months(model, using=using).filter(first_id__lte=pk, last_id__gte=pk)
+    if elder_id is not None:
+        months = months.filter(elder_id=elder_id)
+    for month in months.order_by('-month'):
+        ids = _open(month.path).column(model._meta.pk)
+        if pk in ids:
+            instance = _instances(model, month, [ids.index(pk)])[0]
+            prefetch_related_objects([instance], *ARCHIVED_MODELS[model._meta.label].related)
+            return instance
+    return None
+
+
+class WithArchive:
+    """
+    A queryset of an archived model, ordered by its time field newest first,
+    followed through to the archived rows of the given elders (all if None)
+    that pass ``matches``; iterating merges the two in that order
+    """
+
+    def __init__(self, queryset, elders=None, matches=None, chunk_size=2000):
+        self.queryset = queryset
+        self.elders = elders
+        self.matches = matches
+        self.chunk_size = chunk_size
+
+    def _shards(self):
+        # A query across shards has the archived months of each of them too
+        return [queryset.db for queryset in getattr(self.queryset, 'querysets', [self.queryset])]
+
+    def exists(self):
+        return self.queryset.exists() or any(
+            archived_months(self.queryset.model, self.elders, alias).exists() for alias in self._shards()
+        )
+
+    def __iter__(self):
+        model = self.queryset.model
+        time = model._meta.get_field(ARCHIVED_MODELS[model._meta.label].time).attname
+        rows = heapq.merge(
+            *(read_rows(model, self.elders, alias) for alias in self._shards()),
+            key=lambda obj: getattr(obj, time), reverse=True,
+        )
+        if self.matches is not None:
+            rows = filter(self.matches, rows)
+        return heapq.merge(
+            self.queryset.iterator(chunk_size=self.chunk_size), rows,
+            key=lambda obj: getattr(obj, time), reverse=True,
+        )
+
+
+def _bound(month):
+    """The start of ``month`` as the time fields hold it"""
+    bound = datetime.datetime(month.year, month.month, 1)
+    return bound.replace(tzinfo=datetime.timezone.utc) if settings.USE_TZ else bound
+
+
+def _archive_month(model, spec, elder_id, start, end):
+    """Move an elder's rows of one month into its file; returns the rows moved"""
+    label = model._meta.label
+    fields = model._meta.concrete_fields
+    time = [field.name for field in fields].index(spec.time)
+    pk = fields.index(model._meta.pk)
+    written = None
+    try:
+        with sharding.atomic():
+            rows = list(model._base_manager.filter(
+                spec.condition, **{spec.elder: elder_id, f'{spec.time}__gte': start, f'{spec.time}__lt': end}
+            ).select_for_update().order_by().values_list(*(field.attname for field in fields)))
+            if not rows:
+                return 0
+            month = month_of(start)
+            existing = ArchivedMonth.objects.select_for_update().filter(
+                elder_id=elder_id, model_label=label, month=month
+            ).first()
+            merged = {}
+            if existing is not None:
+                merged = {row[pk]: row for row in _open(existing.path).values(model)}
+            # The live row wins over an older archived copy
+            merged.update((row[pk], row) for row in rows)
+            merged = sorted(merged.values(), key=lambda row: (row[time], row[pk]))
+            written = os.path.join(model._meta.model_name, str(elder_id), f'{month:%Y-%m}-{secrets.token_hex(4)}.arc')
+            size = write_file(os.path.join(archive_root(), written), model, merged)
+            ArchivedMonth.objects.update_or_create(elder_id=elder_id, model_label=label, month=month, defaults={
+                'path': written, 'rows': len(merged), 'size': size,
+                'first_id': min(row[pk] for row in merged), 'last_id': max(row[pk] for row in merged),
+            })
+            if existing is not None:
+                transaction.on_commit(lambda path=existing.path: remove_file(path))
+            alias = sharding.current_shard()
+            pks = [row[pk] for row in rows]
+            for offset in range(0, len(pks), DELETE_BATCH_SIZE):
+                model._base_manager.filter(pk__in=pks[offset:offset + DELETE_BATCH_SIZE])._raw_delete(alias)
+            if spec.section:
+                schedule_refresh([elder_id], [spec.section])
+            transaction.on_commit(lambda: cache_versions.bump(model._meta.model_name, elder_id))
+    except BaseException:
+        if written is not None:
+            remove_file(written)
+        raise
+    return len(rows)
+
+
+def archive_old_rows(after_days=None):
+    """
+    Archive the current shard's rows of every whole month older than
+    ``after_days`` (settings.CARE_ARCHIVE_AFTER_DAYS by default, and
+    nothing if that is unset); returns {model label: rows archived}
+    """
+    if after_days is None:
+        after_days = archive_after_days()
+    if after_days is None:
+        return {}
+    cutoff = _bound(month_of(timezone.now() - datetime.timedelta(days=after_days)))
+    archived = {}
+    for model in archived_models():
+        spec = ARCHIVED_MODELS[model._meta.label]
+        old = model._base_manager.filter(spec.condition, **{f'{spec.time}__lt': cutoff}).order_by()
+        elder_ids = old.exclude(**{f'{spec.elder}__isnull': True}).values_list(spec.elder, flat=True).distinct()
+        moved = 0
+        for elder_id in list(elder_ids):
+            months = old.filter(**{spec.elder: elder_id}).datetimes(spec.time, 'month', tzinfo=datetime.timezone.utc)
+            for start in months:
+                month = month_of(start)
+                # Each month in a transaction of its own, so a long history is not one long lock
+                moved += _archive_month(model, spec, elder_id, _bound(month), _bound(add_months(month, 1)))
+        archived[model._meta.label] = moved
+    return archived
+
@@ -0,0 +1,52 @@
+"""
+Version counters for template fragment caching.
+
+Every write to a care_app model bumps a global counter for that model and,
+for elder-owned rows, a counter scoped to the elder. Fragment cache keys
+include the counters a fragment depends on, so a write only invalidates the
+fragments that show the changed data; stale entries simply age out.
+
+Counters live in the default cache, which must be shared between worker
+processes (memcached, Redis, database cache) for invalidation to be seen by
+every worker.
+"""
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'care_app:version'
+
+
+def _key(label, elder_id=None):
+    if elder_id is None:
+        return f'{KEY_PREFIX}:{label}'
+    return f'{KEY_PREFIX}:{label}:{elder_id}'
+
+
+def _fresh_value():
+    # Counters recreated after eviction start from the clock, never from a value
+    # an older cached fragment could still be keyed on
+    return int(time.time() * 1000)
+
+
+def bump(label, elder_id=None):
+    """Invalidate fragments depending on ``label`` (and on ``label`` for one elder)"""
+    keys = [_key(label)]
+    if elder_id is not None:
+        keys.append(_key(label, elder_id))
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_value(), None)
+
+
+def get_version(*labels, elder_id=None):
+    """Return a combined version string for the given model labels"""
+    keys = [_key(label, elder_id) for label in labels]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_value(), None)
+            found[key] = cache.get(key)
+    return '.'.join(str(found[key]) for key in keys)
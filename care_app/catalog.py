@@ -0,0 +1,202 @@
+"""
+In-process medication catalog for autocomplete.
+
+Each process keeps one MedicationCatalog of the active medications, built on
+first use and rebuilt when the 'medication' fragment cache version changes
+(see cache_versions.py), which every Medication write bumps. A lookup
+touches no database and, on a catalog of 100k medications, takes well under
+a millisecond.
+
+The words of each medication's name, strength and manufacturer make up a
+sorted vocabulary. A query word matches the vocabulary words it is a prefix
+of (a bisect on the sorted list, which does what a prefix trie would in a
+fraction of the memory) or, when it is a prefix of none and so probably has
+a typo, the words sharing enough trigrams with it. Catalogs repeat the same
+few words across thousands of strengths and makers, so the trigram index
+covers the vocabulary rather than every entry and stays small. Each
+vocabulary word lists the entries containing it, in name order.
+
+Every query word must match some word of an entry. Entries are ranked by the
+sum of their best match per query word: an exact word beats a prefix, which
+beats a fuzzy match.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+
+from . import cache_versions
+from .models import Medication
+
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_WORDS = 4
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+# Trigram similarity as pg_trgm computes it (shared / all trigrams of both words), with its default threshold
+FUZZY_THRESHOLD = 0.3
+FUZZY_WEIGHT = 0.8
+# When the most selective query word still matches more entries than this,
+# the other words only filter and the first ``limit`` matches are returned
+EXACT_RANKING_LIMIT = 500
+
+Entry = namedtuple('Entry', ['id', 'name', 'strength', 'manufacturer', 'medication_type'])
+
+_WORD = re.compile(r'\w+')
+
+
+def words(text):
+    """Lower-cased words of ``text`` with accents removed"""
+    text = text.casefold()
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return _WORD.findall(text)
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class MedicationCatalog:
+    def __init__(self, medications, version=None):
+        """``medications`` is an iterable of Entry tuples"""
+        self.version = version
+        shared = {}
+        self.entries = sorted(
+            (Entry(pk, name, *(shared.setdefault(value, value) for value in rest))
+             for pk, name, *rest in medications),
+            key=lambda entry: (entry.name.casefold(), entry.strength, entry.id),
+        )
+        # Names, strengths and makers repeat, so each distinct value is split once
+        split = {}
+        entry_words = []
+        for entry in self.entries:
+            found = set()
+            for value in (entry.name, entry.strength, entry.manufacturer):
+                if value not in split:
+                    split[value] = words(value)
+                found.update(split[value])
+            entry_words.append(found)
+        vocabulary = set().union(*entry_words)
+        self.words = sorted(vocabulary)
+        index_of = {word: index for index, word in enumerate(self.words)}
+
+        postings = [array('I') for _ in self.words]
+        # Flattened word indices of each entry: entry_words[starts[i]:starts[i + 1]]
+        self.starts = array('I', [0])
+        self.entry_words = array('I')
+        for entry_index, found in enumerate(entry_words):
+            for word in found:
+                postings[index_of[word]].append(entry_index)
+                self.entry_words.append(index_of[word])
+            self.starts.append(len(self.entry_words))
+        self.postings = postings
+
+        grams = defaultdict(lambda: array('I'))
+        self.gram_counts = array('H')
+        for word_index, word in enumerate(self.words):
+            word_grams = trigrams(word)
+            self.gram_counts.append(min(len(word_grams), 0xFFFF))
+            for gram in word_grams:
+                grams[gram].append(word_index)
+        self.grams = dict(grams)
+
+    @classmethod
+    def load(cls, version=None):
+        medications = Medication.objects.filter(is_active=True).values_list(
+            'pk', 'name', 'strength', 'manufacturer', 'medication_type'
+        )
+        return cls(medications.iterator(chunk_size=5000), version)
+
+    def _match(self, token):
+        """Vocabulary word index -> score for one query word"""
+        matched = {}
+        start = bisect_left(self.words, token)
+        for index in range(start, len(self.words)):
+            word = self.words[index]
+            if not word.startswith(token):
+                break
+            matched[index] = EXACT_SCORE if word == token else PREFIX_SCORE
+        # Typos: only when no word starts with the query word
+        if not matched and len(token) >= 3:
+            token_grams = trigrams(token)
+            shared = defaultdict(int)
+            for gram in token_grams:
+                for index in self.grams.get(gram, ()):
+                    shared[index] += 1
+            for index, count in shared.items():
+                similarity = count / (len(token_grams) + self.gram_counts[index] - count)
+                if similarity >= FUZZY_THRESHOLD:
+                    matched[index] = similarity * FUZZY_WEIGHT
+        return matched
+
+    def _ranked(self, matched):
+        """(score, entry index) of the entries of the matched words, best score first, then name order"""
+        by_score = defaultdict(list)
+        for index, score in matched.items():
+            by_score[score].append(self.postings[index])
+        seen = set()
+        for score in sorted(by_score, reverse=True):
+            for entry_index in heapq.merge(*by_score[score]):
+                if entry_index not in seen:
+                    seen.add(entry_index)
+                    yield score, entry_index
+
+    def _score(self, entry_index, matched):
+        words_of_entry = self.entry_words[self.starts[entry_index]:self.starts[entry_index + 1]]
+        return max((matched[index] for index in words_of_entry if index in matched), default=None)
+
+    def search(self, query, limit=10):
+        """Best ``limit`` entries for ``query``"""
+        tokens = list(dict.fromkeys(words(query)))[:MAX_QUERY_WORDS]
+        matches = [self._match(token) for token in tokens]
+        sizes = [sum(len(self.postings[index]) for index in matched) for matched in matches]
+        if not sizes or not all(sizes):
+            return []
+        # Walk the entries of the most selective word and check the others against them
+        order = sorted(range(len(tokens)), key=sizes.__getitem__)
+        driver, others = matches[order[0]], [matches[index] for index in order[1:]]
+
+        scored = []
+        for score, entry_index in self._ranked(driver):
+            total = score
+            for matched in others:
+                other = self._score(entry_index, matched)
+                if other is None:
+                    break
+                total += other
+            else:
+                scored.append((-total, entry_index))
+                # With one word the entries already come in their final order
+                if (not others or sizes[order[0]] > EXACT_RANKING_LIMIT) and len(scored) == limit:
+                    break
+        return [self.entries[entry_index] for _, entry_index in heapq.nsmallest(limit, scored)]
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """This process's catalog, rebuilt if a medication was written since it was built"""
+    global _catalog
+    version = cache_versions.get_version('medication')
+    if _catalog is None or _catalog.version != version:
+        with _lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = MedicationCatalog.load(version)
+    return _catalog
+
+
+def search(query, limit=10):
+    if len(query.strip()) < MIN_QUERY_LENGTH:
+        return []
+    return get_catalog().search(query, limit)
+
+
+def label(entry):
+    text = f'{entry.name} {entry.strength}'.strip()
+    return f'{text} ({entry.manufacturer})' if entry.manufacturer else text
@@ -0,0 +1,131 @@
+"""
+Append-only change log behind the offline sync feed (/api/v1/changes/).
+
+Every save or delete of a synced model writes one ChangeLogEntry in the same
+transaction as the change itself, so a rolled-back write never shows up in
+the feed. Entry ids increase monotonically and double as the sync token a
+device holds: "give me everything after entry N".
+
+Signals record single-object writes; code doing queryset .update() or
+bulk_create() must call record_changes() itself.
+
+An elder entering or leaving a guardian's scope (a guardian handover, or the
+elder being deleted) is recorded as a GRANT or REVOKE entry addressed to that
+user alone: the device cannot learn it from the elder's own entries, which
+stop being visible to it once the elder is out of scope.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    ElderProfile, Medication, MedicationSchedule, MedicationLog, Appointment,
+    CareTask, EmergencyContact, VitalsLog, IncidentReport, Notification, ChangeLogEntry
+)
+
+# Synced model -> (API resource name, lookup from the model to its elder id)
+SYNCED_MODELS = {
+    ElderProfile: ('elders', 'pk'),
+    MedicationSchedule: ('schedules', 'elder_id'),
+    MedicationLog: ('logs', 'schedule__elder_id'),
+    Appointment: ('appointments', 'elder_id'),
+    CareTask: ('tasks', 'elder_id'),
+    EmergencyContact: ('contacts', 'elder_id'),
+    VitalsLog: ('vitals', 'elder_id'),
+    IncidentReport: ('incidents', 'elder_id'),
+    Notification: ('notifications', 'elder_id'),
+    Medication: ('medications', None),
+}
+
+# Entries younger than this are held back: ids are assigned at insert time, so a
+# slow transaction can still commit an id lower than one a device already saw
+SETTLE_DELAY = timedelta(seconds=5)
+
+RECORD_BATCH_SIZE = 1000
+
+
+def _elder_of(instance, lookup):
+    if lookup is None:
+        return None
+    value = instance
+    for part in lookup.split('__'):
+        value = getattr(value, part)
+        if value is None:
+            return None
+    return value
+
+
+def record_change(instance, action):
+    resource, lookup = SYNCED_MODELS[type(instance)]
+    ChangeLogEntry.objects.create(
+        resource=resource, object_id=instance.pk, elder_id=_elder_of(instance, lookup), action=action
+    )
+
+
+def record_changes(model, pks, action=ChangeLogEntry.UPSERT):
+    """Log a bulk write to ``model`` rows ``pks``; call before deleting, since the elder is looked up"""
+    resource, lookup = SYNCED_MODELS[model]
+    pks = list(pks)
+    for start in range(0, len(pks), RECORD_BATCH_SIZE):
+        batch = pks[start:start + RECORD_BATCH_SIZE]
+        if lookup is None:
+            rows = [(pk, None) for pk in batch]
+        else:
+            rows = model.objects.filter(pk__in=batch).values_list('pk', lookup)
+        ChangeLogEntry.objects.bulk_create([
+            ChangeLogEntry(resource=resource, object_id=pk, elder_id=elder_id, action=action)
+            for pk, elder_id in rows
+        ])
+
+
+def record_scope_change(elder_id, user_id, action):
+    """Tell ``user_id``'s devices that elder ``elder_id`` entered (GRANT) or left (REVOKE) their scope"""
+    ChangeLogEntry.objects.create(
+        resource='elders', object_id=elder_id, elder_id=elder_id, user_id=user_id, action=action
+    )
+
+
+def _settled():
+    return ChangeLogEntry.objects.filter(changed_at__lte=timezone.now() - SETTLE_DELAY)
+
+
+def latest_token():
+    """Token a new device should start from before fetching the full lists"""
+    return _settled().order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def is_expired(since):
+    """True when entries after ``since`` have been pruned and the device must resync"""
+    oldest = ChangeLogEntry.objects.order_by('pk').values_list('pk', flat=True).first()
+    return oldest is not None and since < oldest - 1
+
+
+def changes_since(since, elders, limit, user=None):
+    """
+    Return (entries, next_token, more) for the entries after token ``since``
+    visible to ``elders`` (None for every elder), oldest first, at most ``limit``.
+    The scope entries addressed to ``user`` come along; administrators, who see
+    every elder, get none.
+    """
+    # With nothing left to send the token jumps to the newest settled entry, so
+    # devices do not rescan other elders' entries on their next sync
+    ceiling = latest_token()
+    entries = ChangeLogEntry.objects.filter(pk__gt=since, pk__lte=ceiling)
+    if elders is None:
+        entries = entries.filter(user_id__isnull=True)
+    else:
+        # The elders may live on other databases than the log, so no subquery
+        visible = Q(elder_id__in=list(elders.values_list('pk', flat=True))) | Q(elder_id__isnull=True)
+        scope = Q(user_id=user.pk) if user is not None else Q(pk__in=[])
+        entries = entries.filter((Q(user_id__isnull=True) & visible) | scope)
+    entries = list(entries.order_by('pk')[:limit + 1])
+    if len(entries) > limit:
+        return entries[:limit], entries[limit - 1].pk, True
+    return entries, max(since, ceiling), False
+
+
+def prune(older_than):
+    """Delete entries older than ``older_than`` but always keep the newest one"""
+    cutoff = timezone.now() - older_than
+    return ChangeLogEntry.objects.filter(changed_at__lt=cutoff, pk__lt=latest_token()).delete()[0]
@@ -0,0 +1,142 @@
+"""
+Conditional GET (ETag / Last-Modified) for pages that ward tablets poll.
+
+Each validator returns a cheap fingerprint of the rows a page shows plus the
+newest change time, or None to skip conditional handling. The fingerprint is
+hashed together with the requesting user's scope, so two users never share a
+validator, and an unchanged page is answered with 304 before the view runs
+its queries or renders a template.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import sharding
+from .archive import archived_months
+from .models import ElderProfile, VitalsLog, Notification, ElderCareSummary, UserProfile
+
+
+def _user_scope(request):
+    user = request.user
+    try:
+        user_type = user.profile.user_type
+    except UserProfile.DoesNotExist:
+        user_type = None
+    # The CSRF cookie is part of the scope because rendered pages embed a token tied to it
+    return (user.pk, user.get_username(), user.get_full_name(), user_type,
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME))
+
+
+def _has_pending_messages(request):
+    storage = getattr(request, '_messages', None)
+    return storage is not None and len(storage) > 0
+
+
+def scoped_elders(request):
+    """Elders the user may see, or None for administrators, who see every elder"""
+    try:
+        if request.user.profile.user_type == 'ADMIN':
+            return None
+    except UserProfile.DoesNotExist:
+        pass
+    return ElderProfile.objects.filter(guardian=request.user)
+
+
+def across_scope(request, queryset):
+    """
+    ``queryset`` of elder rows run on every shard holding one of the user's
+    elders and merged (see sharding.py); administrators see their facility's
+    shard, as before
+    """
+    if scoped_elders(request) is None:
+        return queryset
+    if not hasattr(request, '_care_shards'):
+        request._care_shards = sharding.user_shards(request.user)
+    if request._care_shards == [sharding.current_shard()]:
+        return queryset
+    return sharding.across_shards(queryset, request._care_shards)
+
+
+def _resolve(request, validator, args, kwargs):
+    # condition() asks for the ETag and Last-Modified separately; compute them once
+    if not hasattr(request, '_care_validators'):
+        result = None
+        if request.method in ('GET', 'HEAD') and not _has_pending_messages(request):
+            state = validator(request, *args, **kwargs)
+            if state is not None:
+                fingerprint, last_modified = state
+                key = repr((fingerprint, request.GET.urlencode(), _user_scope(request)))
+                result = (hashlib.sha1(key.encode()).hexdigest(), last_modified)
+        request._care_validators = result
+    return request._care_validators
+
+
+def conditional_page(validator):
+    """Answer matching If-None-Match / If-Modified-Since requests with 304 using ``validator``"""
+    def etag_func(request, *args, **kwargs):
+        result = _resolve(request, validator, args, kwargs)
+        return result[0] if result else None
+
+    def last_modified_func(request, *args, **kwargs):
+        result = _resolve(request, validator, args, kwargs)
+        return result[1] if result else None
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                # Per-user pages: browsers may keep them but must revalidate every time
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ['Cookie'])
+            return response
+        return _wrapped_view
+    return decorator
+
+
+def elder_detail_validator(request, elder_id):
+    # The care summary row is rewritten whenever anything on the page changes
+    updated_at = ElderCareSummary.objects.filter(pk=elder_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return ('elder_detail', elder_id, updated_at.isoformat()), updated_at
+
+
+def vitals_list_validator(request, elder_id=None):
+    vitals = VitalsLog.objects.all()
+    elders = scoped_elders(request)
+    if elder_id:
+        vitals = vitals.filter(elder_id=elder_id)
+        elders = [elder_id]
+    elif elders is not None:
+        vitals = across_scope(request, vitals.filter(elder__in=elders))
+    # The row count catches deletions, which leave no timestamp behind
+    state = vitals.aggregate(
+        count=Count('pk'), changed=Max('updated_at'), elders_changed=Max('elder__updated_at')
+    )
+    # The page offers the archived months, and reads them with ?archived=1
+    months = archived_months(VitalsLog, elders)
+    if not elder_id:
+        months = across_scope(request, months)
+    archived = months.aggregate(count=Count('pk'), changed=Max('archived_at'))
+    last_modified = max(filter(None, [state['changed'], state['elders_changed'], archived['changed']]), default=None)
+    return ('vitals_list', elder_id, state['count'], str(state['changed']), str(state['elders_changed']),
+            archived['count'], str(archived['changed'])), last_modified
+
+
+def notification_list_validator(request):
+    notifications = Notification.objects.all()
+    elders = scoped_elders(request)
+    if elders is not None:
+        notifications = across_scope(request, notifications.filter(Q(elder__in=elders) | Q(elder__isnull=True)))
+    state = notifications.aggregate(
+        count=Count('pk'), changed=Max('updated_at'), elders_changed=Max('elder__updated_at')
+    )
+    last_modified = max(filter(None, [state['changed'], state['elders_changed']]), default=None)
+    return ('notification_list', state['count'], str(state['changed']), str(state['elders_changed'])), last_modified
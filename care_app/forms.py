@@ -1,5 +1,10 @@
 from django import forms
 from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils import timezone
+from . import catalog, scheduling, screening
 from .models import (
     ElderProfile, Medication, MedicationSchedule, MedicationLog, 
     Appointment, CareTask, EmergencyContact, VitalsLog, 
@@ -27,6 +32,17 @@ class MedicationForm(forms.ModelForm):
         model = Medication
         fields = ['name', 'description', 'medication_type', 'strength', 'manufacturer']
 
+class MedicationAutocompleteWidget(forms.Widget):
+    """Search box over the medication catalog (see catalog.py); posts the chosen medication's id"""
+    template_name = 'widgets/medication_autocomplete.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        medication = Medication.objects.filter(pk=value).first() if str(value or '').isdigit() else None
+        context['widget']['label'] = catalog.label(medication) if medication else ''
+        context['widget']['url'] = reverse('medication_autocomplete')
+        return context
+
 class MedicationScheduleForm(forms.ModelForm):
     class Meta:
         model = MedicationSchedule
@@ -35,6 +51,7 @@ class MedicationScheduleForm(forms.ModelForm):
             'end_date', 'time_1', 'time_2', 'time_3', 'instructions'
         ]
         widgets = {
+            'medication': MedicationAutocompleteWidget(),
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'end_date': forms.DateInput(attrs={'type': 'date'}),
             'time_1': forms.TimeInput(attrs={'type': 'time'}),
@@ -43,6 +60,26 @@ class MedicationScheduleForm(forms.ModelForm):
             'instructions': forms.Textarea(attrs={'rows': 3}),
         }
 
+    # Shown as a checkbox once screening has found something to confirm
+    confirm_warnings = forms.BooleanField(
+        required=False, widget=forms.HiddenInput, label='Schedule despite these warnings'
+    )
+    screen_schedule = True
+
+    def clean(self):
+        cleaned_data = super().clean()
+        elder = cleaned_data.get('elder')
+        medication = cleaned_data.get('medication')
+        if not (self.screen_schedule and elder and medication and self.instance.is_active):
+            return cleaned_data
+
+        findings = screening.screen(elder, medication, exclude_pk=self.instance.pk)
+        self.instance.screening_warnings = [finding.message for finding in findings]
+        if findings and not cleaned_data.get('confirm_warnings'):
+            self.fields['confirm_warnings'].widget = forms.CheckboxInput()
+            raise forms.ValidationError(self.instance.screening_warnings)
+        return cleaned_data
+
 class MedicationLogForm(forms.ModelForm):
     class Meta:
         model = MedicationLog
@@ -67,7 +104,66 @@ class AppointmentForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        elder = cleaned_data.get('elder')
+        start = cleaned_data.get('appointment_date')
+        duration = cleaned_data.get('duration')
+        if not (elder and start and duration) or self.instance.status not in scheduling.BLOCKING_STATUSES:
+            return cleaned_data
+        
+        doctor_name = cleaned_data.get('doctor_name', '')
+        candidate = Appointment(
+            pk=self.instance.pk, elder=elder, appointment_date=start, duration=duration, doctor_name=doctor_name
+        )
+        clashes = scheduling.conflicts(candidate)
+        if clashes:
+            listed = '; '.join(self._describe_clash(other, elder) for other in clashes[:3])
+            message = f'This overlaps {listed}.'
+            slot = scheduling.next_free_slot(elder.pk, doctor_name, duration, start, exclude_pk=self.instance.pk)
+            if slot:
+                message += f' The next free slot is {timezone.localtime(slot):%Y-%m-%d %H:%M}.'
+            raise forms.ValidationError(message)
+        return cleaned_data
+
+    @staticmethod
+    def _describe_clash(other, elder):
+        # Another elder's appointment only shows that the doctor is busy, not whose it is or why
+        start = timezone.localtime(other.appointment_date)
+        if other.elder_id == elder.pk:
+            return f"{other.title} at {start:%Y-%m-%d %H:%M} ({other.duration} min)"
+        doctor = other.doctor_name if other.doctor_name.startswith(('Dr.', 'Dr ')) else f'Dr. {other.doctor_name}'
+        end = timezone.localtime(scheduling.ends_at(other))
+        return f"{doctor} is booked {start:%H:%M}–{end:%H:%M}"
+
+class CaregiverChoiceField(forms.ModelChoiceField):
+    """User dropdown showing each user's open task count, so tasks can be balanced by hand"""
+    def label_from_instance(self, user):
+        return f"{user.get_full_name() or user.username} ({user.open_tasks} open tasks)"
+
 class CareTaskForm(forms.ModelForm):
+    assigned_to = CaregiverChoiceField(
+        queryset=User.objects.annotate(open_tasks=Coalesce('workload__open_tasks', 0)).order_by('username'),
+        required=False
+    )
+    # Daily, weekly and monthly tasks start a series when created; see recurrence.py
+    repeat_interval = forms.IntegerField(
+        required=False, min_value=1, initial=1,
+        help_text='Repeat every N days, weeks or months (daily, weekly and monthly tasks)'
+    )
+    repeat_until = forms.DateTimeField(
+        required=False,
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'),
+        help_text='Leave empty to repeat indefinitely'
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            # Editing changes one occurrence, not the series
+            del self.fields['repeat_interval']
+            del self.fields['repeat_until']
+
     class Meta:
         model = CareTask
         fields = [
@@ -237,3 +333,29 @@ class SearchForm(forms.Form):
         required=False,
         initial='all'
     )
+
+class ElderFilterForm(forms.Form):
+    SORT_ORDERINGS = {
+        'name': ['full_name'],
+        'youngest': [F('date_of_birth').desc(nulls_last=True), 'full_name'],
+        'oldest': [F('date_of_birth').asc(nulls_last=True), 'full_name'],
+    }
+    
+    age_band = forms.ChoiceField(
+        choices=[('', 'All ages')] + [(label, label) for label, _, _ in ElderProfile.AGE_BANDS],
+        required=False
+    )
+    sort = forms.ChoiceField(
+        choices=[('name', 'Name'), ('youngest', 'Youngest first'), ('oldest', 'Oldest first')],
+        required=False,
+        initial='name'
+    )
+    
+    def filter(self, elders):
+        """``elders`` narrowed to the chosen age band and in the chosen order"""
+        if not self.is_valid():
+            return elders
+        for label, min_age, max_age in ElderProfile.AGE_BANDS:
+            if self.cleaned_data['age_band'] == label:
+                elders = elders.age_between(min_age, max_age)
+        return elders.order_by(*self.SORT_ORDERINGS[self.cleaned_data['sort'] or 'name'])
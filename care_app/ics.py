@@ -0,0 +1,204 @@
+"""
+iCalendar (RFC 5545) feeds of appointments and care task due dates.
+
+Each CalendarFeed has a secret URL that calendar apps subscribe to without
+logging in. A feed covers one elder or every elder its user can see, from
+PAST_DAYS ago onwards.
+
+The feed is written as a stream: querysets are read with .iterator() and
+sent every CHUNK_SIZE events, so a feed over all elders never sits in
+memory. Clients poll every few minutes, so feed_validators() answers with
+an ETag and Last-Modified taken from the newest change log entry (see
+changelog.py) touching the feed's elders; an unchanged feed costs one index
+probe and a 304.
+"""
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .changelog import SYNCED_MODELS
+from .models import Appointment, CareTask, ChangeLogEntry, ElderProfile, UserProfile
+
+PAST_DAYS = 90
+CHUNK_SIZE = 200
+# Tasks show up as short events at their due time
+TASK_MINUTES = 15
+PRODID = '-//Elder Care//Care Calendar//EN'
+OPEN_TASK_STATUSES = ['PENDING', 'IN_PROGRESS', 'OVERDUE']
+FEED_RESOURCES = [SYNCED_MODELS[model][0] for model in (ElderProfile, Appointment, CareTask)]
+APPOINTMENT_STATUS = {'CANCELLED': 'CANCELLED', 'RESCHEDULED': 'CANCELLED', 'SCHEDULED': 'TENTATIVE'}
+APPOINTMENT_TYPES = dict(Appointment.APPOINTMENT_TYPE_CHOICES)
+TASK_PRIORITIES = dict(CareTask.PRIORITY_CHOICES)
+TASK_STATUSES = dict(CareTask.STATUS_CHOICES)
+APPOINTMENT_FIELDS = [
+    'pk', 'title', 'appointment_type', 'appointment_date', 'duration', 'location', 'doctor_name',
+    'phone', 'notes', 'status', 'updated_at', 'elder__full_name',
+]
+TASK_FIELDS = [
+    'pk', 'title', 'description', 'priority', 'status', 'due_date', 'updated_at', 'elder__full_name',
+    'assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name',
+]
+
+
+def feed_elders(feed):
+    """
+    Elders the feed covers, or None for all of them (administrators' feeds);
+    raises ElderProfile.DoesNotExist if the user may no longer see the feed's elder
+    """
+    user = feed.user
+    try:
+        is_admin = user.profile.user_type == 'ADMIN'
+    except UserProfile.DoesNotExist:
+        is_admin = False
+    if is_admin:
+        return None if feed.elder_id is None else ElderProfile.objects.filter(pk=feed.elder_id)
+    visible = ElderProfile.objects.filter(Q(guardian=user) | Q(caregivers=user)).distinct()
+    if feed.elder_id is None:
+        return visible
+    if not visible.filter(pk=feed.elder_id).exists():
+        raise ElderProfile.DoesNotExist('The feed owner no longer looks after this elder.')
+    return ElderProfile.objects.filter(pk=feed.elder_id)
+
+
+def feed_validators(feed, elders):
+    """(ETag, Last-Modified) of the feed"""
+    entries = ChangeLogEntry.objects.filter(resource__in=FEED_RESOURCES)
+    elder_ids = None
+    if elders is not None:
+        elder_ids = sorted(elders.values_list('pk', flat=True))
+        entries = entries.filter(elder_id__in=elder_ids)
+    # Newest first, so the scan stops at the first matching entry
+    latest = entries.order_by('-id').values_list('id', 'changed_at').first()
+    # The window moves daily, and the elders covered can change without a logged write
+    key = repr((feed.pk, feed.token, timezone.localdate().isoformat(), elder_ids, latest and latest[0]))
+    return hashlib.sha1(key.encode()).hexdigest(), latest and latest[1]
+
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n'))
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces joined by CRLF and a space"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    pieces = []
+    while encoded:
+        limit = 75 if not pieces else 74
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(uid, start, end, summary, stamp, status=None, location='', description=''):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{_utc(stamp)}',
+        f'LAST-MODIFIED:{_utc(stamp)}',
+        f'DTSTART:{_utc(start)}',
+        f'DTEND:{_utc(end)}',
+        f'SUMMARY:{_escape(summary)}',
+    ]
+    if status:
+        lines.append(f'STATUS:{status}')
+    if location:
+        lines.append(f'LOCATION:{_escape(location)}')
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+
+def _appointment_event(row, host):
+    details = [APPOINTMENT_TYPES.get(row.appointment_type, row.appointment_type)]
+    if row.doctor_name:
+        details.append(f'Doctor: {row.doctor_name}')
+    if row.phone:
+        details.append(f'Phone: {row.phone}')
+    if row.notes:
+        details.append(row.notes)
+    return _event(
+        uid=f'appointment-{row.pk}@{host}',
+        start=row.appointment_date,
+        end=row.appointment_date + timedelta(minutes=row.duration),
+        summary=f'{row.title} ({row.elder__full_name})',
+        stamp=row.updated_at or row.appointment_date,
+        status=APPOINTMENT_STATUS.get(row.status, 'CONFIRMED'),
+        location=row.location,
+        description='\n'.join(details),
+    )
+
+
+def _task_event(row, host):
+    details = [f'Priority: {TASK_PRIORITIES[row.priority]}', f'Status: {TASK_STATUSES[row.status]}']
+    if row.assigned_to__username:
+        name = f'{row.assigned_to__first_name} {row.assigned_to__last_name}'.strip()
+        details.append(f'Assigned to: {name or row.assigned_to__username}')
+    if row.description:
+        details.append(row.description)
+    return _event(
+        uid=f'task-{row.pk}@{host}',
+        start=row.due_date,
+        end=row.due_date + timedelta(minutes=TASK_MINUTES),
+        summary=f'Due: {row.title or "Untitled Task"} ({row.elder__full_name})',
+        stamp=row.updated_at or row.due_date,
+        description='\n'.join(details),
+    )
+
+
+def _chunked(events):
+    chunk = []
+    for event in events:
+        chunk.append(event)
+        if len(chunk) == CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_feed(feed, elders, host):
+    """Yield the feed's iCalendar text in chunks"""
+    since = timezone.now() - timedelta(days=PAST_DAYS)
+    appointments = Appointment.objects.filter(appointment_date__gte=since)
+    tasks = CareTask.objects.filter(due_date__gte=since, status__in=OPEN_TASK_STATUSES)
+    if elders is not None:
+        appointments = appointments.filter(elder__in=elders)
+        tasks = tasks.filter(elder__in=elders)
+    name = feed.elder.full_name if feed.elder_id else 'All elders'
+
+    yield ''.join(_fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(f"Care calendar - {name}")}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+        'X-PUBLISHED-TTL:PT15M',
+    ])
+    # Plain rows rather than model instances: building instances costs more than writing the events
+    yield from _chunked(
+        _appointment_event(row, host)
+        for row in appointments.order_by('appointment_date').values_list(*APPOINTMENT_FIELDS, named=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    yield from _chunked(
+        _task_event(row, host)
+        for row in tasks.order_by('due_date').values_list(*TASK_FIELDS, named=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,274 @@
+"""
+Chunked, resumable CSV imports for onboarding a facility.
+
+An ImportRun names a resource and a CSV file whose header row holds the
+field names of that resource's form, the same forms the add pages use, so
+every row meets the rules a person typing it in would. Foreign keys take a
+primary key or a natural key: elders by full name, medications by name and
+users by username.
+
+The file is read as a stream, chunk_size rows at a time, and each chunk is
+one transaction: the references in each column are looked up with one query,
+the valid rows are written with bulk_create and the run's rows_done advances
+with them. A run that fails, or whose worker dies, starts again at rows_done,
+so no row is imported twice. Invalid rows do not stop the import; they are
+counted and the first MAX_REPORTED_ERRORS are kept with their line numbers.
+
+Bulk writes bypass the signals, so each chunk logs its changes, bumps the
+fragment cache versions and drops the care summaries of the elders it
+touched (they are rebuilt in full on their next read) itself. Imported
+schedules are screened for allergies and duplicate therapy (see
+screening.py) in the same transaction, and notified about rather than
+rejected.
+"""
+import csv
+import io
+from collections import defaultdict, namedtuple
+from itertools import islice
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache_versions, screening, sharding
+from .changelog import record_changes
+from .forms import ElderForm, EmergencyContactForm, MedicationForm, MedicationScheduleForm, VitalsLogForm
+from .models import ElderCareSummary, ElderProfile, EmergencyContact, ImportRun, Medication, MedicationSchedule
+
+MAX_REPORTED_ERRORS = 1000
+
+Importer = namedtuple('Importer', ['form', 'natural_keys', 'prepare'])
+
+
+class ChunkChoiceField(forms.Field):
+    """Stands in for a ModelChoiceField, answering from the references looked up for the chunk"""
+
+    def __init__(self, found, **kwargs):
+        self.found = found
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        value = (value or '').strip()
+        if value in self.empty_values:
+            return None
+        match = self.found.get(value)
+        if match is None or isinstance(match, str):
+            raise ValidationError(match or f'Nothing matches "{value}".', code='invalid_choice')
+        return match
+
+
+class ImportFormMixin:
+    def _get_validation_exclusions(self):
+        # The chunk's lookup already found these references; the model would query each one again
+        exclude = super()._get_validation_exclusions()
+        exclude.update(name for name, field in self.fields.items() if isinstance(field, ChunkChoiceField))
+        return exclude
+
+
+class ElderImportForm(ImportFormMixin, ElderForm):
+    pass
+
+
+class MedicationImportForm(ImportFormMixin, MedicationForm):
+    pass
+
+
+class ScheduleImportForm(ImportFormMixin, MedicationScheduleForm):
+    # Screened a chunk at a time once written; a file has nobody to confirm warnings
+    confirm_warnings = None
+    screen_schedule = False
+
+
+class ContactImportForm(ImportFormMixin, EmergencyContactForm):
+    class Meta(EmergencyContactForm.Meta):
+        fields = ['elder'] + EmergencyContactForm.Meta.fields
+
+
+class VitalsImportForm(ImportFormMixin, VitalsLogForm):
+    # Historical readings carry their own time; empty means now
+    recorded_at = forms.DateTimeField(required=False)
+
+
+def _instances(rows, run, now):
+    return [instance for instance, _ in rows]
+
+
+def _prepare_schedules(rows, run, now):
+    schedules = _instances(rows, run, now)
+    for schedule in schedules:
+        schedule.created_at = now
+    return schedules
+
+
+def _prepare_contacts(rows, run, now):
+    contacts = _instances(rows, run, now)
+    primary = {}
+    for contact in contacts:
+        contact.created_by_id = contact.updated_by_id = run.created_by_id
+        # As in EmergencyContact.save(), a new primary contact takes over, so the last one of an elder wins
+        if contact.is_primary:
+            if contact.elder_id in primary:
+                primary[contact.elder_id].is_primary = False
+            primary[contact.elder_id] = contact
+    demoted = EmergencyContact.objects.filter(elder_id__in=primary, is_primary=True)
+    record_changes(EmergencyContact, demoted.values_list('pk', flat=True))
+    demoted.update(is_primary=False, updated_at=now)
+    return contacts
+
+
+def _prepare_vitals(rows, run, now):
+    vitals = []
+    for instance, cleaned_data in rows:
+        instance.recorded_at = cleaned_data['recorded_at'] or now
+        instance.logged_by_id = run.created_by_id
+        vitals.append(instance)
+    return vitals
+
+
+IMPORTERS = {
+    'elders': Importer(ElderImportForm, {'guardian': 'username'}, _instances),
+    'medications': Importer(MedicationImportForm, {}, _instances),
+    'schedules': Importer(ScheduleImportForm, {'elder': 'full_name', 'medication': 'name'}, _prepare_schedules),
+    'contacts': Importer(ContactImportForm, {'elder': 'full_name'}, _prepare_contacts),
+    'vitals': Importer(VitalsImportForm, {'elder': 'full_name'}, _prepare_vitals),
+}
+
+
+def columns(resource):
+    """(name, required) of each column the resource's files may have"""
+    return [(name, field.required) for name, field in IMPORTERS[resource].form.base_fields.items()]
+
+
+def _check_header(resource, header):
+    known = dict(columns(resource))
+    unknown = [name for name in header if name not in known]
+    missing = [name for name, required in known.items() if required and name not in header]
+    problems = []
+    if unknown:
+        problems.append(f"unknown columns {', '.join(unknown)}")
+    if missing:
+        problems.append(f"missing columns {', '.join(missing)}")
+    if problems:
+        raise ValueError(f"The header does not match the {resource} form: {'; '.join(problems)}.")
+
+
+def _resolve(field, natural_key, values):
+    """Map each raw value to the object of the field's queryset it names, or to an error message"""
+    values = {value.strip() for value in values if value and value.strip()}
+    ids = {value for value in values if value.isdigit()}
+    names = values - ids
+    queryset = field.queryset.only('pk', natural_key)
+    found = {str(obj.pk): obj for obj in queryset.filter(pk__in=ids)}
+    matches = defaultdict(list)
+    for obj in queryset.filter(**{f'{natural_key}__in': names}) if names else []:
+        matches[getattr(obj, natural_key)].append(obj)
+    plural = queryset.model._meta.verbose_name_plural
+    for name, objs in matches.items():
+        found[name] = objs[0] if len(objs) == 1 else f'{len(objs)} {plural} match "{name}"; use the id instead.'
+    return found
+
+
+def _bulk_written(model, objects):
+    """Do what the signals would have done for the new ``objects``"""
+    record_changes(model, [obj.pk for obj in objects])
+    label = model._meta.model_name
+    if model in (ElderProfile, Medication):
+        if len(sharding.shard_aliases()) > 1:
+            if model is ElderProfile and objects:
+                sharding.place_elders([obj.pk for obj in objects], objects[0]._state.db)
+            else:
+                for obj in objects:
+                    sharding.copy_reference_row(obj)
+        # Nothing cached or summarized per elder can show a row that did not exist
+        transaction.on_commit(lambda: cache_versions.bump(label))
+        return
+    elder_ids = {obj.elder_id for obj in objects}
+    # One rebuild on the next read instead of one per chunk while an import adds rows
+    ElderCareSummary.objects.filter(pk__in=elder_ids).delete()
+    if model is MedicationSchedule:
+        screening.rescan(elder_ids)
+    for elder_id in elder_ids:
+        transaction.on_commit(lambda elder_id=elder_id: cache_versions.bump(label, elder_id))
+
+
+def _import_chunk(run, importer, chunk, position):
+    """Validate and write one chunk; returns False if another worker has moved the run on"""
+    fields = {
+        name: ChunkChoiceField(
+            _resolve(importer.form.base_fields[name], natural_key, [row.get(name) for _, row in chunk]),
+            required=importer.form.base_fields[name].required,
+        )
+        for name, natural_key in importer.natural_keys.items()
+    }
+    model = importer.form._meta.model
+    # One form per chunk, bound to each row in turn: building a form per row copies every field
+    form = importer.form(data={})
+    form.fields.update(fields)
+    valid, rejected = [], []
+    for line, row in chunk:
+        if None in row:
+            rejected.append({'line': line, 'errors': {'__all__': ['The row has more values than the header.']}})
+            continue
+        form.data = row
+        form.instance = model()
+        form.full_clean()
+        if form.is_valid():
+            valid.append((form.instance, form.cleaned_data))
+        else:
+            rejected.append({'line': line, 'errors': {name: list(errors) for name, errors in form.errors.items()}})
+
+    with sharding.atomic():
+        locked = ImportRun.objects.select_for_update().get(pk=run.pk)
+        if locked.rows_done != position:
+            return False
+        created = model.objects.bulk_create(importer.prepare(valid, run, timezone.now()))
+        _bulk_written(model, created)
+        locked.rows_done += len(chunk)
+        locked.rows_imported += len(created)
+        locked.rows_rejected += len(rejected)
+        locked.errors += rejected[:max(0, MAX_REPORTED_ERRORS - len(locked.errors))]
+        locked.save(update_fields=['rows_done', 'rows_imported', 'rows_rejected', 'errors'])
+    return True
+
+
+def _rows(reader):
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _chunks(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_import(run_id):
+    """Import the run's file from rows_done onwards; returns the run"""
+    run = ImportRun.objects.get(pk=run_id)
+    if run.status == ImportRun.DONE:
+        return run
+    importer = IMPORTERS[run.resource]
+    run.status = ImportRun.RUNNING
+    run.started_at = run.started_at or timezone.now()
+    run.last_error = ''
+    run.save(update_fields=['status', 'started_at', 'last_error'])
+    try:
+        # Rows go to the facility of whoever started the import
+        with run.file.open('rb') as raw, sharding.use_shard(sharding.home_shard(run.created_by)):
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''))
+            reader.fieldnames = [name.strip() for name in reader.fieldnames or []]
+            _check_header(run.resource, reader.fieldnames)
+            position = run.rows_done
+            for chunk in _chunks(islice(_rows(reader), position, None), run.chunk_size):
+                if not _import_chunk(run, importer, chunk, position):
+                    return run
+                position += len(chunk)
+    except Exception as exc:
+        ImportRun.objects.filter(pk=run.pk).update(status=ImportRun.FAILED, last_error=str(exc))
+        raise
+    ImportRun.objects.filter(pk=run.pk).update(status=ImportRun.DONE, finished_at=timezone.now())
+    run.refresh_from_db()
+    return run
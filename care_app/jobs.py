@@ -0,0 +1,306 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in the care_app Job table, so no broker is needed. Register
+work with @task (or @periodic for cron-like schedules), queue it with
+enqueue(), and run `manage.py run_worker --processes N` to execute it.
+
+- Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the database
+  supports it (PostgreSQL, MySQL 8, Oracle). Elsewhere (SQLite) a job is
+  claimed with a conditional UPDATE that only one worker can win.
+- Higher priority runs first, then the earliest run_at.
+- A failing job is retried with exponential backoff up to max_attempts.
+- A running job's lease is renewed every HEARTBEAT_INTERVAL by a thread
+  of its worker, so however long the job runs it is not handed to a
+  second worker. A job whose worker died stops being renewed and is
+  handed out again once its lease expires, or marked failed if that was
+  its last attempt.
+- @task(concurrency=N) caps how many jobs of one task run at once.
+- Periodic jobs are enqueued by every worker under a per-slot unique key,
+  so each slot runs once however many workers are up. The last slot
+  queued of each schedule is kept in the PeriodicSlot table: a worker
+  queues the latest slot due since then, so a cron minute that passed
+  while every worker was busy or the pool was restarting still runs, late
+  and once, rather than waiting for the next day.
+"""
+import os
+import socket
+import threading
+import traceback
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job, PeriodicSlot
+
+RETRY_DELAY = timedelta(seconds=10)
+MAX_RETRY_DELAY = timedelta(hours=1)
+LEASE_TIMEOUT = timedelta(minutes=10)
+HEARTBEAT_INTERVAL = LEASE_TIMEOUT / 4
+CLAIM_CANDIDATES = 10
+
+Task = namedtuple('Task', ['func', 'max_attempts', 'concurrency', 'priority'])
+Schedule = namedtuple('Schedule', ['task', 'cron', 'every'])
+
+TASKS = {}
+SCHEDULES = []
+
+
+def task(name=None, max_attempts=5, concurrency=None, priority=0):
+    """Register ``func`` as a task; it must accept JSON-serializable arguments"""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        TASKS[task_name] = Task(func, max_attempts, concurrency, priority)
+        func.task_name = task_name
+        return func
+    return decorator
+
+
+def periodic(cron=None, every=None, **options):
+    """Register a task and run it on a cron expression or a fixed interval"""
+    if (cron is None) == (every is None):
+        raise ValueError('Give exactly one of cron or every.')
+
+    def decorator(func):
+        func = task(**options)(func)
+        SCHEDULES.append(Schedule(func.task_name, Cron(cron) if cron else None, every))
+        return func
+    return decorator
+
+
+def enqueue(task_name, *args, priority=None, run_at=None, unique_key=None, **kwargs):
+    """Queue a job; with ``unique_key`` returns None if that key was already queued"""
+    registered = TASKS[task_name]
+    job = Job(
+        task=task_name, args=list(args), kwargs=kwargs,
+        priority=registered.priority if priority is None else priority,
+        max_attempts=registered.max_attempts,
+        run_at=run_at or timezone.now(),
+        unique_key=unique_key,
+    )
+    if unique_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return None
+    return job
+
+
+class Cron:
+    """Five-field cron expression (minute hour day month weekday) supporting * , - and /"""
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+    # How far latest() looks back; covers an expression that only matches on 29 February
+    LOOKBACK_DAYS = 366 * 8
+
+    def __init__(self, expression):
+        specs = expression.split()
+        if len(specs) != 5:
+            raise ValueError(f'Cron expression needs five fields: {expression!r}')
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(spec, low, high) for spec, (low, high) in zip(specs, self.RANGES)
+        )
+        # As in cron, a restricted day of month and day of week match if either does
+        self.either_day = specs[2] != '*' and specs[4] != '*'
+        self.times = sorted(time(hour, minute) for hour in self.hours for minute in self.minutes)
+
+    @staticmethod
+    def _parse(spec, low, high):
+        values = set()
+        for part in spec.split(','):
+            span, _, step = part.partition('/')
+            if span == '*':
+                start, end = low, high
+            elif '-' in span:
+                start, end = (int(value) for value in span.split('-'))
+            else:
+                start = end = int(span)
+            if not low <= start <= end <= high:
+                raise ValueError(f'Cron field {spec!r} is out of range {low}-{high}')
+            values.update(range(start, end + 1, int(step or 1)))
+        return values
+
+    def matches(self, moment):
+        if moment.minute not in self.minutes or moment.hour not in self.hours:
+            return False
+        return self._matches_day(moment)
+
+    def _matches_day(self, day):
+        if day.month not in self.months:
+            return False
+        in_month = day.day in self.days
+        in_week = (day.weekday() + 1) % 7 in self.weekdays  # cron counts from Sunday
+        return (in_month or in_week) if self.either_day else (in_month and in_week)
+
+    def latest(self, moment):
+        """The last matching minute at or before ``moment``, in its time zone, or None if there is none lately"""
+        day, now = moment.date(), moment.time().replace(second=0, microsecond=0)
+        for _ in range(self.LOOKBACK_DAYS):
+            if self._matches_day(day):
+                times = [value for value in self.times if value <= now] if day == moment.date() else self.times
+                if times:
+                    return datetime.combine(day, times[-1], tzinfo=moment.tzinfo)
+            day -= timedelta(days=1)
+        return None
+
+
+def _slot(schedule, now):
+    """Start of the latest schedule slot begun by ``now``; None for a cron schedule that never matches"""
+    if schedule.every is not None:
+        period = schedule.every.total_seconds()
+        return datetime.fromtimestamp(now.timestamp() // period * period, tz=dt_timezone.utc)
+    return schedule.cron.latest(timezone.localtime(now))
+
+
+def _take_slot(task_name, slot):
+    """Record ``slot`` as the last queued of ``task_name``; False if it or a later one already is"""
+    if PeriodicSlot.objects.filter(task=task_name, slot__lt=slot).update(slot=slot):
+        return True
+    try:
+        with transaction.atomic():
+            PeriodicSlot.objects.create(task=task_name, slot=slot)
+    except IntegrityError:
+        return False
+    return True
+
+
+def enqueue_due(now, seen):
+    """Enqueue every periodic task whose latest slot has not been queued; ``seen`` is per worker"""
+    for schedule in SCHEDULES:
+        slot = _slot(schedule, now)
+        if slot is None or seen.get(schedule.task) == slot:
+            continue
+        seen[schedule.task] = slot
+        # Slots between the recorded one and this are skipped: one late run catches up
+        with transaction.atomic():
+            if _take_slot(schedule.task, slot):
+                enqueue(schedule.task, run_at=slot, unique_key=f'{schedule.task}@{slot.isoformat()}')
+
+
+def requeue_expired(now):
+    """Hand out jobs again whose worker stopped renewing its lease (crashed or was killed)"""
+    expired = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - LEASE_TIMEOUT)
+    # A job that kills its worker would otherwise be handed out forever
+    expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None, finished_at=now,
+        last_error='The worker stopped renewing its lease on the last attempt.',
+    )
+    return expired.update(status=Job.PENDING, locked_by='', locked_at=None)
+
+
+def renew_lease(job):
+    """Extend ``job``'s lease; False once it is no longer running under this worker"""
+    return bool(Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING).update(
+        locked_at=timezone.now()
+    ))
+
+
+def _keep_lease(job, finished):
+    try:
+        while not finished.wait(HEARTBEAT_INTERVAL.total_seconds()):
+            if not renew_lease(job):
+                break
+    finally:
+        connection.close()
+
+
+def _tasks_at_limit():
+    limited = {name: registered.concurrency for name, registered in TASKS.items() if registered.concurrency}
+    if not limited:
+        return []
+    running = Job.objects.filter(status=Job.RUNNING, task__in=limited).values('task').annotate(count=Count('pk'))
+    return [row['task'] for row in running if row['count'] >= limited[row['task']]]
+
+
+def claim(worker_id):
+    """Lock the next due job for ``worker_id`` and mark it running; None when nothing is due"""
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.PENDING, run_at__lte=now)
+        .exclude(task__in=_tasks_at_limit())
+        .order_by('-priority', 'run_at', 'pk')
+    )
+    claimed = {'status': Job.RUNNING, 'locked_by': worker_id, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    job_id = None
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_id = candidates.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if job_id is not None:
+                Job.objects.filter(pk=job_id).update(**claimed)
+    else:
+        for candidate in candidates.values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+            if Job.objects.filter(pk=candidate, status=Job.PENDING).update(**claimed):
+                job_id = candidate
+                break
+    if job_id is None:
+        return None
+
+    job = Job.objects.get(pk=job_id)
+    registered = TASKS.get(job.task)
+    if registered and registered.concurrency:
+        # Two workers can pass the limit check together; the later one backs off
+        running = Job.objects.filter(task=job.task, status=Job.RUNNING).order_by('locked_at', 'pk')
+        if job_id not in running.values_list('pk', flat=True)[:registered.concurrency]:
+            Job.objects.filter(pk=job_id, locked_by=worker_id).update(
+                status=Job.PENDING, locked_by='', locked_at=None, attempts=F('attempts') - 1
+            )
+            return None
+    return job
+
+
+def execute(job):
+    registered = TASKS.get(job.task)
+    finished = threading.Event()
+    heartbeat = threading.Thread(target=_keep_lease, args=(job, finished), daemon=True)
+    heartbeat.start()
+    try:
+        if registered is None:
+            raise LookupError(f'Unknown task {job.task!r}')
+        registered.func(*job.args, **job.kwargs)
+    except Exception:
+        now = timezone.now()
+        if registered is not None and job.attempts < job.max_attempts:
+            delay = min(RETRY_DELAY * 2 ** (job.attempts - 1), MAX_RETRY_DELAY)
+            outcome = {'status': Job.PENDING, 'run_at': now + delay}
+        else:
+            outcome = {'status': Job.FAILED, 'finished_at': now}
+        outcome['last_error'] = traceback.format_exc()
+    else:
+        outcome = {'status': Job.DONE, 'finished_at': timezone.now(), 'last_error': ''}
+    finally:
+        finished.set()
+        heartbeat.join()
+    # A job whose lease expired may have been claimed by another worker meanwhile
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING).update(
+        locked_by='', locked_at=None, **outcome
+    )
+    return outcome['status']
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def work(stop, interval=1.0, index=0):
+    """Worker loop: schedule periodic jobs, recover expired leases and run due jobs until ``stop`` is set"""
+    worker_id = worker_name(index)
+    seen = {}
+    try:
+        while not stop.is_set():
+            now = timezone.now()
+            enqueue_due(now, seen)
+            requeue_expired(now)
+            job = claim(worker_id)
+            if job is None:
+                stop.wait(interval)
+            else:
+                execute(job)
+    finally:
+        connection.close()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from care_app import archive, sharding
+
+
+class Command(BaseCommand):
+    help = ('Move the vitals and medication log rows and read notifications of every whole month older than '
+            'settings.CARE_ARCHIVE_AFTER_DAYS into the archive files under settings.CARE_ARCHIVE_ROOT')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Archive the months older than this many days instead of CARE_ARCHIVE_AFTER_DAYS')
+
+    def handle(self, *args, **options):
+        after_days = options['days']
+        if after_days is None and archive.archive_after_days() is None:
+            raise CommandError('Set CARE_ARCHIVE_AFTER_DAYS or pass --days.')
+        for alias in sharding.shard_aliases():
+            with sharding.use_shard(alias):
+                archived = archive.archive_old_rows(after_days)
+            counts = ', '.join(f'{rows} {label}' for label, rows in archived.items())
+            self.stdout.write(self.style.SUCCESS(f'{alias}: archived {counts}.'))
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from care_app import sharding
+from care_app.models import CareTask
+from care_app.workload import Assignment, auto_assign
+
+
+class Command(BaseCommand):
+    help = 'Assign unassigned open care tasks to the least loaded caregiver of their elder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Only tasks due within the next N days')
+        parser.add_argument('--elder', type=int, action='append', dest='elder_ids',
+                            help='Only tasks of this elder (may be repeated)')
+
+    def handle(self, *args, **options):
+        tasks = CareTask.objects.filter(due_date__lt=timezone.now() + timedelta(days=options['days']))
+        if options['elder_ids']:
+            tasks = tasks.filter(elder_id__in=options['elder_ids'])
+        results = []
+        for alias in sharding.shard_aliases():
+            with sharding.use_shard(alias):
+                results.append(auto_assign(tasks))
+        result = Assignment(*(sum(counts) for counts in zip(*results)))
+        self.stdout.write(self.style.SUCCESS(
+            f'Assigned {result.assigned} tasks to {result.caregivers} caregivers.'
+        ))
+        if result.unassignable:
+            self.stdout.write(self.style.WARNING(
+                f'{result.unassignable} tasks left unassigned because their elder has no caregivers.'
+            ))
@@ -0,0 +1,81 @@
+import time
+from statistics import mean
+
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from care_app import views
+from care_app.models import ElderProfile
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCAL_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'fragment-benchmark',
+    'OPTIONS': {'MAX_ENTRIES': 100000},
+}}
+
+
+class Command(BaseCommand):
+    help = 'Compare page render times with and without template fragment caching (run seed_synthetic_data first)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--user', default='synthetic_admin', help='Username to render pages as')
+        parser.add_argument('--pages', nargs='*', help='Only benchmark these pages (default: all)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} not found; run seed_synthetic_data first.")
+        elder = ElderProfile.objects.order_by('pk').first()
+        if elder is None:
+            raise CommandError('No elders found; run seed_synthetic_data first.')
+
+        pages = [
+            ('dashboard', views.dashboard, reverse('dashboard'), {}),
+            ('elder_list', views.elder_list, reverse('elder_list'), {}),
+            ('elder_detail', views.elder_detail, reverse('elder_detail', args=[elder.pk]), {'elder_id': elder.pk}),
+            ('vitals_list', views.vitals_list, reverse('vitals_list'), {}),
+        ]
+        if options['pages']:
+            pages = [page for page in pages if page[0] in options['pages']]
+        factory = RequestFactory()
+        iterations = options['iterations']
+
+        self.stdout.write(f"{'page':<14}{'no cache ms':>14}{'cached ms':>12}{'speedup':>10}{'queries':>14}")
+        for name, view, path, kwargs in pages:
+            results = {}
+            for label, cache_settings in [('off', NO_CACHE), ('on', LOCAL_CACHE)]:
+                with override_settings(CACHES=cache_settings, DEBUG=True):
+                    caches['default'].clear()
+                    self._render(factory, user, view, path, kwargs)  # warm-up
+                    timings = []
+                    for _ in range(iterations):
+                        reset_queries()
+                        started = time.perf_counter()
+                        self._render(factory, user, view, path, kwargs)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    results[label] = (mean(timings), len(connection.queries))
+            off_ms, off_queries = results['off']
+            on_ms, on_queries = results['on']
+            self.stdout.write(
+                f"{name:<14}{off_ms:>14.1f}{on_ms:>12.1f}{off_ms / on_ms:>9.1f}x{off_queries:>7} -> {on_queries:<4}"
+            )
+
+    def _render(self, factory, user, view, path, kwargs):
+        request = factory.get(path)
+        request.user = user
+        request._messages = CookieStorage(request)
+        response = view(request, **kwargs)
+        if response.status_code != 200:
+            raise CommandError(f'{path} returned {response.status_code}')
+        if response.streaming:
+            # Streamed pages render while they are sent
+            b''.join(response.streaming_content)
+        return response
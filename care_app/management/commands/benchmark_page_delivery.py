@@ -0,0 +1,88 @@
+import time
+from statistics import median
+
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from care_app import views
+from care_app.middleware import CompressionMiddleware, HtmlMinifyMiddleware, brotli
+from care_app.models import ElderProfile
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = ('Measure page size and time to first byte with and without minification, '
+            'compression and streaming (run seed_synthetic_data first)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--user', default='synthetic_admin', help='Username to render pages as')
+        parser.add_argument('--pages', nargs='*', help='Only benchmark these pages (default: all)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} not found; run seed_synthetic_data first.")
+        if not ElderProfile.objects.exists():
+            raise CommandError('No elders found; run seed_synthetic_data first.')
+
+        pages = [
+            ('dashboard', views.dashboard, reverse('dashboard')),
+            ('elder_list', views.elder_list, reverse('elder_list')),
+            ('vitals_list', views.vitals_list, reverse('vitals_list')),
+        ]
+        if options['pages']:
+            pages = [page for page in pages if page[0] in options['pages']]
+        encodings = ['gzip', 'br'] if brotli is not None else ['gzip']
+        factory = RequestFactory()
+
+        self.stdout.write(
+            f"{'page':<13}{'encoding':<10}{'bytes':>12}{'-> sent':>12}"
+            f"{'first byte ms':>15}{'-> ms':>10}{'last byte ms':>14}"
+        )
+        # Fragment caching is off so every run renders the page from the database
+        with override_settings(CACHES=NO_CACHE):
+            caches['default'].clear()
+            for name, view, path in pages:
+                # Before: the whole page is rendered before anything is sent, uncompressed
+                plain = [self._fetch(factory, user, view, path, None) for _ in range(options['iterations'])]
+                plain_size = plain[0][0]
+                plain_ms = median(last for _, _, last in plain)
+                for encoding in encodings:
+                    runs = [self._fetch(factory, user, view, path, encoding) for _ in range(options['iterations'])]
+                    self.stdout.write(
+                        f"{name:<13}{encoding:<10}{plain_size:>12,}{runs[0][0]:>12,}"
+                        f"{plain_ms:>15.1f}{median(first for _, first, _ in runs):>10.1f}"
+                        f"{median(last for _, _, last in runs):>14.1f}"
+                    )
+
+    def _fetch(self, factory, user, view, path, encoding):
+        """Return (body bytes, first byte ms, last byte ms) for one request"""
+        request = factory.get(path, HTTP_ACCEPT_ENCODING=encoding or 'identity')
+        request.user = user
+        request._messages = CookieStorage(request)
+        started = time.perf_counter()
+        if encoding is None:
+            response = view(request)
+            # Without streaming nothing can be sent until the page has rendered
+            chunks = [b''.join(response.streaming_content)] if response.streaming else [response.content]
+            first_byte = None
+        else:
+            handler = CompressionMiddleware(HtmlMinifyMiddleware(view))
+            response = handler(request)
+            if response.status_code != 200:
+                raise CommandError(f'{path} returned {response.status_code}')
+            chunks = []
+            first_byte = None
+            for chunk in (response.streaming_content if response.streaming else [response.content]):
+                if first_byte is None and chunk:
+                    first_byte = (time.perf_counter() - started) * 1000
+                chunks.append(chunk)
+        last_byte = (time.perf_counter() - started) * 1000
+        return sum(len(chunk) for chunk in chunks), first_byte or last_byte, last_byte
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from care_app import sharding
+from care_app.summary import check_care_summaries
+
+
+class Command(BaseCommand):
+    help = 'Verify elder care summary documents against the live tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--elder', type=int, action='append', dest='elder_ids',
+                            help='Only check this elder (may be repeated)')
+        parser.add_argument('--repair', action='store_true',
+                            help='Rebuild documents that are missing or stale')
+
+    def handle(self, *args, **options):
+        problems = []
+        for alias in sharding.shard_aliases():
+            with sharding.use_shard(alias):
+                problems += check_care_summaries(options['elder_ids'], repair=options['repair'])
+        for elder_id, sections in problems:
+            self.stdout.write(f"Elder #{elder_id}: stale sections {', '.join(sections)}")
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('All care summaries are consistent.'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(problems)} care summaries.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(problems)} care summaries are stale; rerun with --repair.'))
@@ -0,0 +1,67 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from care_app.importer import IMPORTERS, columns, run_import
+from care_app.models import ImportRun
+
+
+class Command(BaseCommand):
+    help = 'Import elders, medications, medication schedules, emergency contacts or vitals history from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', nargs='?', choices=list(IMPORTERS))
+        parser.add_argument('path', nargs='?', help='CSV file with a header row of form field names')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows written per transaction')
+        parser.add_argument('--user', help='Username recorded as the creator of contacts and vitals')
+        parser.add_argument('--resume', type=int, metavar='RUN_ID',
+                            help='Continue a failed import after its last committed chunk')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            run = ImportRun.objects.filter(pk=options['resume']).first()
+            if run is None:
+                raise CommandError(f"Import #{options['resume']} does not exist.")
+        elif options['resource'] and options['path']:
+            run = self._create_run(options)
+        else:
+            raise CommandError('Give a resource and a CSV file, or --resume RUN_ID.')
+
+        try:
+            run = run_import(run.pk)
+        except Exception as exc:
+            run.refresh_from_db()
+            raise CommandError(
+                f'Import #{run.pk} stopped after {run.rows_done} rows: {exc}\n'
+                f'Fix the cause and continue with --resume {run.pk}.'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Import #{run.pk}: {run.rows_imported} rows imported, {run.rows_rejected} rejected.'
+        ))
+        for rejected in run.errors[:20]:
+            problems = '; '.join(
+                f"{name}: {' '.join(messages)}" if name != '__all__' else ' '.join(messages)
+                for name, messages in rejected['errors'].items()
+            )
+            self.stdout.write(self.style.WARNING(f"Line {rejected['line']}: {problems}"))
+        if run.rows_rejected > 20:
+            self.stdout.write(f'See import #{run.pk} in the admin for the other rejected rows.')
+
+    def _create_run(self, options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']} does not exist.")
+        if not 1 <= options['chunk_size'] <= 10000:
+            raise CommandError('--chunk-size must be between 1 and 10000.')
+        required = ', '.join(name for name, required in columns(options['resource']) if required)
+        self.stdout.write(f"Importing {options['resource']} (required columns: {required})")
+        run = ImportRun(resource=options['resource'], chunk_size=options['chunk_size'], created_by=user)
+        # The file is copied to storage so the run can be resumed from anywhere
+        with open(options['path'], 'rb') as source:
+            run.file.save(os.path.basename(options['path']), File(source))
+        return run
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from care_app import sharding
+
+
+class Command(BaseCommand):
+    help = 'Prepare a migrated database in settings.CARE_SHARDS for elder data: copy users and medications, start its id range and record its elders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('shard', help='Database alias listed in settings.CARE_SHARDS')
+
+    def handle(self, *args, **options):
+        alias = options['shard']
+        if alias not in sharding.shard_aliases():
+            raise CommandError(f'{alias} is not listed in settings.CARE_SHARDS.')
+        copied = sharding.copy_reference_data(alias)
+        sharding.seed_sequences(alias)
+        placed = sharding.register_elders(alias)
+        first, _ = sharding.id_range(alias)
+        self.stdout.write(self.style.SUCCESS(
+            f'{alias}: {copied} users and medications copied, {placed} elders recorded; '
+            f'new elder rows get ids from {first}.'
+        ))
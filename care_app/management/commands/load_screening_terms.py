@@ -0,0 +1,55 @@
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from care_app import cache_versions, screening, sharding
+from care_app.models import ScreeningTerm
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / 'data' / 'screening_terms.csv'
+
+
+class Command(BaseCommand):
+    help = 'Load allergen and ingredient synonyms for medication screening from a CSV file, then rescan the active schedules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH,
+                            help='CSV file with term and concept columns (default: the table shipped with the app)')
+        parser.add_argument('--replace', action='store_true', help='Delete the terms the file does not list')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as source:
+                reader = csv.DictReader(source)
+                if not {'term', 'concept'} <= set(reader.fieldnames or []):
+                    raise CommandError('The file needs a header row with term and concept columns.')
+                pairs = {(row['term'].strip(), row['concept'].strip()) for row in reader}
+        except OSError as exc:
+            raise CommandError(exc)
+        pairs = {(term, concept) for term, concept in pairs if term and concept}
+
+        with transaction.atomic():
+            existing = set(ScreeningTerm.objects.values_list('term', 'concept'))
+            if options['replace']:
+                for term, concept in existing - pairs:
+                    ScreeningTerm.objects.filter(term=term, concept=concept).delete()
+            ScreeningTerm.objects.bulk_create(
+                [ScreeningTerm(term=term, concept=concept) for term, concept in pairs - existing],
+                ignore_conflicts=True,
+            )
+            # bulk_create bypasses the signal that recompiles the matchers
+            transaction.on_commit(lambda: cache_versions.bump('screeningterm'))
+        added = len(pairs - existing)
+        removed = len(existing - pairs) if options['replace'] else 0
+        self.stdout.write(f'{added} terms added, {removed} removed.')
+
+        screened = notified = 0
+        for alias in sharding.shard_aliases():
+            with sharding.use_shard(alias):
+                counts = screening.rescan()
+            screened += counts[0]
+            notified += counts[1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Screened {screened} active schedules; {notified} new warnings queued as notifications.'
+        ))
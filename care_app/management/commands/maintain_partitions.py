@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from care_app import partitions, sharding
+
+
+class Command(BaseCommand):
+    help = ('Create the coming months\' partitions of the vitals and medication logs and detach the months '
+            'older than settings.CARE_PARTITION_RETENTION_MONTHS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--detach-before', metavar='YYYY-MM',
+                            help='Detach the months before this one instead of those past the retention period')
+
+    def handle(self, *args, **options):
+        detach_before = None
+        if options['detach_before']:
+            try:
+                detach_before = datetime.datetime.strptime(options['detach_before'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--detach-before takes a month as YYYY-MM.')
+        for alias in sharding.shard_aliases():
+            created, detached = partitions.maintain(alias, detach_before)
+            self.stdout.write(self.style.SUCCESS(f'{alias}: {created} partitions created, {detached} detached.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from care_app import sharding
+from care_app.models import ElderProfile
+
+
+class Command(BaseCommand):
+    help = 'Move elders and all their records to another shard, e.g. when they change facility or to even out shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('shard', help='Database alias listed in settings.CARE_SHARDS')
+        parser.add_argument('elder_ids', nargs='+', type=int, metavar='elder_id')
+
+    def handle(self, *args, **options):
+        target = options['shard']
+        if target not in sharding.shard_aliases():
+            raise CommandError(f'{target} is not listed in settings.CARE_SHARDS.')
+        for elder_id in options['elder_ids']:
+            try:
+                moved = sharding.move_elder(elder_id, target)
+            except (ElderProfile.DoesNotExist, ValueError) as exc:
+                raise CommandError(exc)
+            if not moved:
+                self.stdout.write(f'Elder #{elder_id} is already on {target}.')
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'Moved elder #{elder_id} to {target}: {sum(moved.values())} rows.'
+            ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from care_app.outbox import BATCH_SIZE, process_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending outbox events (notifications) in batches; runs until interrupted unless --once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when no events are due')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the due events and exit')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                claimed = process_batch(options['batch_size'])
+                total += claimed
+                if claimed:
+                    self.stdout.write(f'Processed {claimed} events.')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} outbox events.'))
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from care_app.changelog import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete old sync change log entries; devices holding older tokens will do a full resync'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Keep entries from the last N days')
+
+    def handle(self, *args, **options):
+        deleted = prune(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} change log entries.'))
@@ -0,0 +1,46 @@
+import multiprocessing
+import os
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from care_app import jobs
+
+
+def _run_process(stop, interval, index):
+    django.setup()  # needed under the spawn start method; a no-op after fork
+    jobs.work(stop, interval, index)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue with a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=min(os.cpu_count() or 1, 4),
+                            help='Number of jobs to run at once')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait when no job is due')
+
+    def handle(self, *args, **options):
+        stop = multiprocessing.Event()
+        count = max(options['processes'], 1)
+        self.stdout.write(f"Starting {count} worker processes for {len(jobs.TASKS)} tasks "
+                          f"({len(jobs.SCHEDULES)} periodic).")
+        # Children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_run_process, args=(stop, options['interval'], index), daemon=True)
+            for index in range(count)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current jobs finish...')
+            stop.set()
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,153 @@
+import random
+from datetime import timedelta, time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from care_app import cache_versions, changelog, workload
+from care_app.models import (
+    ElderProfile, Medication, MedicationSchedule, MedicationLog, Appointment,
+    CareTask, EmergencyContact, VitalsLog, IncidentReport, Notification, UserProfile
+)
+
+FIRST_NAMES = ['Amina', 'Rahim', 'Karim', 'Nasrin', 'Farida', 'Jamal', 'Salma', 'Habib', 'Rokeya', 'Anwar']
+LAST_NAMES = ['Hossain', 'Rahman', 'Chowdhury', 'Akter', 'Islam', 'Begum', 'Khan', 'Ahmed', 'Sarkar', 'Das']
+CONDITIONS = ['Hypertension', 'Type 2 diabetes', 'Arthritis', 'COPD', 'Dementia', 'Heart failure', '']
+ALLERGIES = ['Penicillin', 'Sulfa drugs', 'Peanuts', 'Latex', '']
+DRUGS = ['Metformin', 'Amlodipine', 'Atorvastatin', 'Lisinopril', 'Omeprazole', 'Levothyroxine',
+         'Donepezil', 'Furosemide', 'Warfarin', 'Paracetamol']
+TASKS = ['Assist with bathing', 'Morning walk', 'Check blood sugar', 'Change bed linen',
+         'Physiotherapy exercises', 'Prepare meals', 'Medication review']
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Populate the database with a reproducible synthetic dataset for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--elders', type=int, default=200)
+        parser.add_argument('--guardians', type=int, default=20)
+        parser.add_argument('--vitals-per-elder', type=int, default=30)
+        parser.add_argument('--tasks-per-elder', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=370)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        run = now.strftime('%Y%m%d%H%M%S')
+
+        admin, created = User.objects.get_or_create(username='synthetic_admin', defaults={'first_name': 'Synthetic'})
+        if created:
+            admin.set_password('synthetic')
+            admin.save()
+        UserProfile.objects.get_or_create(user=admin, defaults={'user_type': 'ADMIN', 'created_at': now})
+
+        guardians = User.objects.bulk_create([
+            User(username=f'synthetic_{run}_{i}', first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES))
+            for i in range(options['guardians'])
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=guardian, user_type='CAREGIVER', created_at=now) for guardian in guardians
+        ])
+
+        medications = list(Medication.objects.filter(name__in=DRUGS))
+        existing = {medication.name for medication in medications}
+        new_medications = Medication.objects.bulk_create([
+            Medication(name=name, strength=f'{rng.choice([5, 10, 20, 50, 100])}mg') for name in DRUGS if name not in existing
+        ])
+        medications += new_medications
+
+        elders = ElderProfile.objects.bulk_create([
+            ElderProfile(
+                guardian=rng.choice(guardians),
+                full_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                date_of_birth=(now - timedelta(days=rng.randint(65 * 365, 100 * 365))).date(),
+                gender=rng.choice('MFO'),
+                medical_conditions=rng.choice(CONDITIONS),
+                allergies=rng.choice(ALLERGIES),
+                blood_type=rng.choice(['A+', 'B+', 'O+', 'AB+', 'O-']),
+                address=f'{rng.randint(1, 200)} Road {rng.randint(1, 30)}, Dhaka',
+            )
+            for _ in range(options['elders'])
+        ], batch_size=BATCH_SIZE)
+        # Each elder's guardian plus one more caregiver form the care team
+        ElderProfile.caregivers.through.objects.bulk_create([
+            ElderProfile.caregivers.through(elderprofile=elder, user=caregiver)
+            for elder in elders
+            for caregiver in {elder.guardian, rng.choice(guardians)}
+        ], batch_size=BATCH_SIZE)
+
+        schedules, appointments, tasks, contacts, vitals, incidents, notifications = [], [], [], [], [], [], []
+        for elder in elders:
+            for medication in rng.sample(medications, 3):
+                schedules.append(MedicationSchedule(
+                    elder=elder, medication=medication, dosage='1 tablet',
+                    frequency=rng.choice(['DAILY', 'TWICE_DAILY']), start_date=(now - timedelta(days=90)).date(),
+                    time_1=time(8, 0), time_2=time(20, 0), created_at=now,
+                ))
+            for i in range(4):
+                appointments.append(Appointment(
+                    elder=elder, title='Checkup', doctor_name=f'{rng.choice(LAST_NAMES)}',
+                    appointment_date=now + timedelta(days=rng.randint(-60, 60), hours=rng.randint(8, 17)),
+                    duration=rng.choice([15, 30, 45, 60]), created_at=now,
+                ))
+            for i in range(options['tasks_per_elder']):
+                tasks.append(CareTask(
+                    elder=elder, title=rng.choice(TASKS), description='Synthetic task',
+                    task_type=rng.choice(['DAILY', 'WEEKLY', 'ONE_TIME']),
+                    status=rng.choice(['PENDING', 'PENDING', 'IN_PROGRESS', 'COMPLETED']),
+                    priority=rng.choice(['LOW', 'MEDIUM', 'HIGH', 'URGENT']),
+                    assigned_to=elder.guardian, due_date=now + timedelta(days=rng.randint(-7, 14)),
+                    created_at=now - timedelta(days=rng.randint(0, 30)),
+                ))
+            for i in range(2):
+                contacts.append(EmergencyContact(
+                    elder=elder, name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    relation=rng.choice(['CHILD', 'SPOUSE', 'SIBLING']), phone=f'01{rng.randint(100000000, 999999999)}',
+                    is_primary=(i == 0),
+                ))
+            for i in range(options['vitals_per_elder']):
+                # Spread vitals over the last months
+                vitals.append(VitalsLog(
+                    elder=elder, blood_pressure_systolic=rng.randint(100, 170), blood_pressure_diastolic=rng.randint(60, 100),
+                    heart_rate=rng.randint(55, 110), oxygen_saturation=rng.randint(90, 100), logged_by=elder.guardian,
+                    recorded_at=now - timedelta(hours=len(vitals) % (options['vitals_per_elder'] * 24)),
+                ))
+            if rng.random() < 0.3:
+                incidents.append(IncidentReport(
+                    elder=elder, incident_type=rng.choice(['FALL', 'ILLNESS', 'OTHER']), description='Synthetic incident',
+                    incident_date=now - timedelta(days=rng.randint(0, 60)), severity=rng.choice(['LOW', 'MEDIUM', 'HIGH']),
+                ))
+            notifications.append(Notification(elder=elder, message='Synthetic reminder', created_at=now))
+
+        for model, rows in [
+            (MedicationSchedule, schedules), (Appointment, appointments), (CareTask, tasks),
+            (EmergencyContact, contacts), (VitalsLog, vitals), (IncidentReport, incidents),
+            (Notification, notifications),
+        ]:
+            model.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+        logs = MedicationLog.objects.bulk_create([
+            MedicationLog(schedule=schedule, taken_by=schedule.elder.guardian) for schedule in schedules
+        ], batch_size=BATCH_SIZE)
+
+        # bulk_create bypasses the signals that log changes and invalidate cached fragments
+        for model, rows in [
+            (Medication, new_medications), (ElderProfile, elders), (MedicationSchedule, schedules),
+            (MedicationLog, logs), (Appointment, appointments), (CareTask, tasks), (EmergencyContact, contacts),
+            (VitalsLog, vitals), (IncidentReport, incidents), (Notification, notifications),
+        ]:
+            changelog.record_changes(model, [row.pk for row in rows])
+        for model in [ElderProfile, Medication, MedicationSchedule, MedicationLog, Appointment, CareTask,
+                      EmergencyContact, VitalsLog, IncidentReport, Notification, UserProfile]:
+            transaction.on_commit(lambda label=model._meta.model_name: cache_versions.bump(label))
+        transaction.on_commit(lambda: cache_versions.bump('user'))
+        workload.refresh_workloads([guardian.pk for guardian in guardians])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(elders)} elders, {len(schedules)} schedules, {len(tasks)} tasks, '
+            f'{len(vitals)} vitals logs and {len(appointments)} appointments.'
+        ))
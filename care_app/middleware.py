@@ -0,0 +1,208 @@
+"""
+Response middleware that shrinks HTML pages on the wire.
+
+    MIDDLEWARE = [
+        'care_app.middleware.CompressionMiddleware',   # before anything that reads the body
+        ...
+        'care_app.middleware.HtmlMinifyMiddleware',
+    ]
+
+HtmlMinifyMiddleware collapses the indentation the templates carry and drops
+their comments, leaving <pre>, <textarea>, <script> and <style> contents and
+attribute values untouched. CompressionMiddleware then sends brotli or gzip,
+whichever the client prefers (brotli needs the optional brotli package).
+Both handle streamed pages chunk by chunk and flush the compressor after each
+chunk, so streaming (see streaming.py) still reaches the browser as it renders.
+"""
+import codecs
+import re
+import secrets
+from gzip import GzipFile
+from io import BytesIO
+
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # gzip is used when brotli is not installed
+    brotli = None
+
+MIN_COMPRESS_SIZE = 200
+GZIP_LEVEL = 6
+# Dynamic pages favour speed; static files are precompressed at quality 11 (storage.py)
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+# Spans kept as they are: comments (dropped unless conditional), raw-text
+# elements and attribute values that contain a line break
+_PROTECTED = re.compile(
+    r'<!--.*?-->'
+    r'|<(pre|textarea|script|style)\b.*?</\1\s*>'
+    r'|=[ \t]*(?:"[^"\n]*\n[^"]*"|\'[^\'\n]*\n[^\']*\')',
+    re.DOTALL | re.IGNORECASE,
+)
+_OPENER = re.compile(r'<!--|<(?:pre|textarea|script|style)\b', re.IGNORECASE)
+_LINE_BREAK = re.compile(r'[ \t\r\f]*\n[ \t\n\r\f]*')
+_ACCEPT_ENCODING = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q=([0-9.]+))?')
+
+
+def minify_html(html):
+    """
+    Drop comments and collapse every run of whitespace that contains a line
+    break (template indentation) into one newline, which renders the same.
+    Runs without a line break are left alone, as they may sit inside an
+    attribute value.
+    """
+    output = []
+    position = 0
+    for match in _PROTECTED.finditer(html):
+        output.append(_LINE_BREAK.sub('\n', html[position:match.start()]))
+        token = match.group()
+        if not token.startswith('<!--') or token.startswith('<!--[if'):
+            output.append(token)
+        position = match.end()
+    output.append(_LINE_BREAK.sub('\n', html[position:]))
+    return ''.join(output)
+
+
+class HtmlMinifier:
+    """minify_html() fed chunk by chunk; a possibly incomplete tail waits for the next chunk"""
+
+    def __init__(self):
+        self.pending = ''
+
+    def feed(self, text, final=False):
+        text = self.pending + text
+        end = len(text) if final else self._complete_until(text)
+        self.pending = text[end:]
+        return minify_html(text[:end])
+
+    @staticmethod
+    def _complete_until(text):
+        # Markup before the last "<" is complete, except a comment or raw-text
+        # element that is still open there
+        end = max(text.rfind('<'), 0)
+        position = 0
+        for match in _PROTECTED.finditer(text, 0, end):
+            position = match.end()
+        opener = _OPENER.search(text, position, end)
+        return opener.start() if opener else end
+
+
+def _charset(response):
+    return response.charset or 'utf-8'
+
+
+def _minify_stream(chunks, charset):
+    minifier = HtmlMinifier()
+    decoder = codecs.getincrementaldecoder(charset)()
+    for chunk in chunks:
+        text = minifier.feed(decoder.decode(chunk))
+        if text:
+            yield text.encode(charset)
+    tail = minifier.feed(decoder.decode(b'', final=True), final=True)
+    if tail:
+        yield tail.encode(charset)
+
+
+class HtmlMinifyMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not response.get('Content-Type', '').startswith('text/html'):
+            return response
+        charset = _charset(response)
+        if response.streaming:
+            response.streaming_content = _minify_stream(response.streaming_content, charset)
+            return response
+        response.content = minify_html(response.content.decode(charset)).encode(charset)
+        if response.has_header('Content-Length'):
+            response.headers['Content-Length'] = str(len(response.content))
+        return response
+
+
+def _choose_encoding(accept_encoding):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None"""
+    weights = {}
+    for name, quality in _ACCEPT_ENCODING.findall(accept_encoding.lower()):
+        try:
+            weights[name] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    accepted = [name for name in available if weights.get(name, weights.get('*', 0)) > 0]
+    # Ties go to brotli, which compresses HTML better
+    return max(accepted, key=lambda name: weights.get(name, weights.get('*', 0)), default=None)
+
+
+def _gzip_file(buffer):
+    # As in GZipMiddleware, a random-length file name in the header varies the
+    # response size to make BREACH-style length attacks harder
+    filename = secrets.token_urlsafe(secrets.randbelow(75) + 1)
+    return GzipFile(filename=filename, mode='wb', compresslevel=GZIP_LEVEL, fileobj=buffer, mtime=0)
+
+
+def _compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    buffer = BytesIO()
+    with _gzip_file(buffer) as gzip_file:
+        gzip_file.write(content)
+    return buffer.getvalue()
+
+
+def _compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    buffer = BytesIO()
+    with _gzip_file(buffer) as gzip_file:
+        for chunk in chunks:
+            gzip_file.write(chunk)
+            gzip_file.flush()
+            data = buffer.getvalue()
+            if data:
+                yield data
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """GZipMiddleware with brotli support and per-chunk flushing of streamed responses"""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < MIN_COMPRESS_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = _choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = _compress_stream(response.streaming_content, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            compressed = _compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # The compressed body differs byte for byte, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
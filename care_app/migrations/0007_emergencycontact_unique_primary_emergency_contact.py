@@ -0,0 +1,32 @@
+# Generated manually to enforce a single primary emergency contact per elder
+
+from django.db import migrations, models
+
+
+def demote_duplicate_primaries(apps, schema_editor):
+    """Keep the most recently updated primary contact per elder before adding the constraint"""
+    EmergencyContact = apps.get_model('care_app', 'EmergencyContact')
+    seen = set()
+    duplicates = []
+    primaries = EmergencyContact.objects.filter(is_primary=True).order_by('elder_id', '-updated_at', '-pk')
+    for contact_id, elder_id in primaries.values_list('pk', 'elder_id'):
+        if elder_id in seen:
+            duplicates.append(contact_id)
+        seen.add(elder_id)
+    if duplicates:
+        EmergencyContact.objects.filter(pk__in=duplicates).update(is_primary=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0006_alter_emergencycontact_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(demote_duplicate_primaries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='emergencycontact',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('elder',), name='unique_primary_emergency_contact'),
+        ),
+    ]
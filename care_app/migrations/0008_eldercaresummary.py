@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0007_emergencycontact_unique_primary_emergency_contact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElderCareSummary',
+            fields=[
+                ('elder', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='care_summary', serialize=False, to='care_app.elderprofile')),
+                ('document', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:11
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0008_eldercaresummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='caretask',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='vitalslog',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['updated_at'], name='care_app_no_updated_4e1e03_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['elder', 'updated_at'], name='care_app_no_elder_i_e4709a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['updated_at'], name='care_app_vi_updated_164005_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['elder', 'updated_at'], name='care_app_vi_elder_i_34e20f_idx'),
+        ),
+    ]
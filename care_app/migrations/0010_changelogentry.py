@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0009_add_change_tracking_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('resource', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('elder_id', models.IntegerField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('UPSERT', 'Insert or update'), ('DELETE', 'Delete')], default='UPSERT', max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['elder_id', 'id'], name='care_app_ch_elder_i_85cd74_idx'), models.Index(fields=['changed_at'], name='care_app_ch_changed_95b8d7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:43
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0012_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=200, null=True)),
+                ('description', models.TextField()),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('URGENT', 'Urgent')], default='MEDIUM', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('frequency', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly')], default='DAILY', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every N days, weeks or months', validators=[django.core.validators.MinValueValidator(1)])),
+                ('weekdays', models.CharField(blank=True, help_text='Weekly rules: comma-separated weekdays, 0 = Monday; blank repeats on the first weekday', max_length=20, validators=[django.core.validators.RegexValidator('^[0-6](,[0-6])*$', 'Enter weekday numbers from 0 to 6 separated by commas.')])),
+                ('starts_at', models.DateTimeField(help_text='First occurrence; sets the time of day and the day of the month')),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('next_due', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_recurrences', to=settings.AUTH_USER_MODEL)),
+                ('elder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_recurrences', to='care_app.elderprofile')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='caretask',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='care_app.taskrecurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'IN_PROGRESS'])), fields=['due_date'], name='caretask_open_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='caretask',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'due_date'), name='unique_task_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='taskrecurrence',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_due'], name='taskrecurrence_due_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0013_task_recurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caretask',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='URGENT', then=models.Value(0)), models.When(priority='HIGH', then=models.Value(1)), models.When(priority='MEDIUM', then=models.Value(2)), models.When(priority='LOW', then=models.Value(3)), default=models.Value(2)), output_field=models.PositiveSmallIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['elder', 'status', 'priority_rank', 'due_date'], name='caretask_elder_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['status', 'priority_rank', 'due_date'], name='caretask_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, Sum, Value, When
+
+
+def fill_workloads(apps, schema_editor):
+    """Count the open tasks of every caregiver who has any"""
+    CareTask = apps.get_model('care_app', 'CareTask')
+    CaregiverWorkload = apps.get_model('care_app', 'CaregiverWorkload')
+    weight = Case(
+        When(priority='URGENT', then=Value(8)),
+        When(priority='HIGH', then=Value(4)),
+        When(priority='LOW', then=Value(1)),
+        default=Value(2),
+    )
+    loads = CareTask.objects.filter(
+        assigned_to__isnull=False, status__in=['PENDING', 'IN_PROGRESS', 'OVERDUE']
+    ).order_by().values('assigned_to').annotate(open_tasks=Count('pk'), weighted_load=Sum(weight))
+    CaregiverWorkload.objects.bulk_create([
+        CaregiverWorkload(user_id=row['assigned_to'], open_tasks=row['open_tasks'], weighted_load=row['weighted_load'])
+        for row in loads
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('care_app', '0014_caretask_priority_rank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaregiverWorkload',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='workload', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_tasks', models.PositiveIntegerField(default=0)),
+                ('weighted_load', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='elderprofile',
+            name='caregivers',
+            field=models.ManyToManyField(blank=True, related_name='assigned_elders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['assigned_to', 'status'], name='caretask_assignee_idx'),
+        ),
+        migrations.RunPython(fill_workloads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:52
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def cap_durations(apps, schema_editor):
+    """Overlap checks only look back 12 hours, so longer appointments are cut to that"""
+    Appointment = apps.get_model('care_app', 'Appointment')
+    Appointment.objects.filter(duration__gt=12 * 60).update(duration=12 * 60)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0015_caregiver_workload'),
+    ]
+
+    operations = [
+        migrations.RunPython(cap_durations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='duration',
+            field=models.IntegerField(default=30, help_text='Duration in minutes', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(720)]),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['elder', 'appointment_date'], name='appointment_elder_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor_name', 'appointment_date'], name='appointment_doctor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date'], name='appointment_date_idx'),
+        ),
+    ]
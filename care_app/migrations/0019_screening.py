@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:27
+
+import csv
+from pathlib import Path
+
+from django.db import migrations, models
+
+TERMS_FILE = Path(__file__).resolve().parent.parent / 'data' / 'screening_terms.csv'
+
+
+def load_terms(apps, schema_editor):
+    """Start from the synonym table shipped with the app; load_screening_terms loads newer ones"""
+    ScreeningTerm = apps.get_model('care_app', 'ScreeningTerm')
+    with open(TERMS_FILE, newline='', encoding='utf-8') as source:
+        ScreeningTerm.objects.bulk_create(
+            [ScreeningTerm(term=row['term'], concept=row['concept']) for row in csv.DictReader(source)],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0018_import_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicationschedule',
+            name='screening_warnings',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='ScreeningTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(help_text='e.g. amoxil, sulfa drugs, blood thinner', max_length=100)),
+                ('concept', models.CharField(help_text='Ingredient or drug class, e.g. amoxicillin, penicillins', max_length=100)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'concept'), name='unique_screening_term')],
+            },
+        ),
+        migrations.RunPython(load_terms, migrations.RunPython.noop),
+    ]
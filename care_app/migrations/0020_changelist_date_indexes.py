@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0019_screening'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicationlog',
+            index=models.Index(fields=['taken_at'], name='medicationlog_taken_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='notification_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['recorded_at'], name='vitalslog_recorded_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['elder', 'recorded_at'], name='vitalslog_elder_recorded_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0020_changelist_date_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='elderprofile',
+            index=models.Index(fields=['date_of_birth'], name='elder_date_of_birth_idx'),
+        ),
+    ]
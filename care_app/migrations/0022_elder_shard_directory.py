@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0021_elder_date_of_birth_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElderShard',
+            fields=[
+                ('elder_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('shard', models.CharField(max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='shard',
+            field=models.CharField(blank=True, help_text="Database holding the elders of the user's facility", max_length=50),
+        ),
+    ]
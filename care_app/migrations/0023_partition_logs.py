@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:26
+
+from django.db import migrations
+
+from care_app import partitions
+
+
+def partition_logs(apps, schema_editor):
+    """PostgreSQL only; SQLite databases are split after migrate, by partitions.split_tables()"""
+    if schema_editor.connection.vendor == 'postgresql':
+        for label in partitions.PARTITIONED_MODELS:
+            partitions.partition_table(schema_editor.connection, apps.get_model(label))
+
+
+def merge_logs(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for label in partitions.PARTITIONED_MODELS:
+            partitions.merge_table(schema_editor.connection, apps.get_model(label))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0022_elder_shard_directory'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='medicationlog',
+            options={'select_on_save': True},
+        ),
+        migrations.AlterModelOptions(
+            name='vitalslog',
+            options={'select_on_save': True},
+        ),
+        # Every shard's logs are partitioned
+        migrations.RunPython(partition_logs, merge_logs, hints={'all_shards': True}),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from care_app import sharding
+
+
+def seed_ids(apps, schema_editor):
+    """A new sharded table's ids start in each shard's range, as init_shard started the others'"""
+    alias = schema_editor.connection.alias
+    if alias in sharding.shard_aliases():
+        sharding.seed_sequences(alias, ['care_app.ArchivedMonth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0023_partition_logs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('month', models.DateField()),
+                ('path', models.CharField(max_length=255)),
+                ('rows', models.PositiveIntegerField()),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('elder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_months', to='care_app.elderprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('elder', 'model_label', 'month'), name='archivedmonth_unique_month')],
+            },
+        ),
+        migrations.RunPython(seed_ids, migrations.RunPython.noop, hints={'all_shards': True}),
+    ]
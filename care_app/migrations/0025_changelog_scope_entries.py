@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0024_archived_month'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelogentry',
+            name='user_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='changelogentry',
+            name='action',
+            field=models.CharField(choices=[('UPSERT', 'Insert or update'), ('DELETE', 'Delete'), ('GRANT', "Elder added to the user's scope"), ('REVOKE', "Elder removed from the user's scope")], default='UPSERT', max_length=6),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['user_id', 'id'], name='changelog_user_idx'),
+        ),
+    ]
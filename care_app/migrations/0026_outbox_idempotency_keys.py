@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:54
+
+from django.db import migrations, models
+
+
+def clear_content_keys(apps, schema_editor):
+    # Pending events still carry hashes of their content, which would drop genuine repeats
+    OutboxEvent = apps.get_model('care_app', 'OutboxEvent')
+    OutboxEvent.objects.filter(status='PENDING').update(dedupe_key='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0025_changelog_scope_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='outbox_event_id',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+        migrations.RunPython(clear_content_keys, migrations.RunPython.noop),
+    ]
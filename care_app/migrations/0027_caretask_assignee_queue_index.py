@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0026_outbox_idempotency_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='caretask',
+            name='caretask_assignee_idx',
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['assigned_to', 'status', 'priority_rank', 'due_date'], name='caretask_assignee_idx'),
+        ),
+    ]
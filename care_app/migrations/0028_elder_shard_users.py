@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:01
+
+from django.db import migrations, models
+
+from care_app import sharding
+
+
+def record_members(apps, schema_editor):
+    """Fill the directory of guardians and caregivers from the elders on each shard"""
+    alias = schema_editor.connection.alias
+    if len(sharding.shard_aliases()) > 1 and alias in sharding.shard_aliases():
+        ElderProfile = apps.get_model('care_app', 'ElderProfile')
+        elder_ids = list(ElderProfile.objects.using(alias).values_list('pk', flat=True))
+        for start in range(0, len(elder_ids), sharding.COPY_BATCH_SIZE):
+            sharding.record_members(elder_ids[start:start + sharding.COPY_BATCH_SIZE], alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0027_caretask_assignee_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElderShardUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('elder_id', models.BigIntegerField()),
+                ('user_id', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['elder_id'], name='eldershard_user_elder_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'elder_id'), name='unique_elder_shard_user')],
+            },
+        ),
+        migrations.RunPython(record_members, migrations.RunPython.noop, hints={'all_shards': True}),
+    ]
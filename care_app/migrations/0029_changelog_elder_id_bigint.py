@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0028_elder_shard_users'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changelogentry',
+            name='elder_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0029_changelog_elder_id_bigint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodicSlot',
+            fields=[
+                ('task', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('slot', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,6 +1,86 @@
-from django.db import models
+import secrets
+from datetime import date
+
+from django.db import models, transaction
+from django.db.models import Case, Count, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, ExtractYear
 from django.contrib.auth.models import User
-from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator, RegexValidator
+
+from .partitions import PartitionedQuerySet
+from .sharding import ShardedQuerySet
+
+
+def related_count(model, **filters):
+    """Correlated COUNT of ``model`` rows pointing at the outer elder, usable in annotate()"""
+    counts = (
+        model.objects.filter(elder=OuterRef('pk'), **filters)
+        .order_by()
+        .values('elder')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+def years_before(day, years):
+    """The date ``years`` years before ``day``; February 29 becomes February 28"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def _birth_date_range(min_age, max_age, today):
+    """date_of_birth lookups for an age of ``min_age`` to ``max_age`` years on ``today``"""
+    lookups = {}
+    if min_age is not None:
+        lookups['date_of_birth__lte'] = years_before(today, min_age)
+    if max_age is not None:
+        lookups['date_of_birth__gt'] = years_before(today, max_age + 1)
+    return lookups
+
+
+class ElderProfileQuerySet(ShardedQuerySet):
+    def with_summary_counts(self):
+        """Annotate the per-elder counts shown on elder cards in the same SELECT"""
+        return self.annotate(
+            medication_count=related_count(MedicationSchedule),
+            task_count=related_count(CareTask),
+            appointment_count=related_count(Appointment),
+        )
+
+    def with_age(self, today=None):
+        """Annotate age_years, the age in whole years computed by the database (None without a birth date)"""
+        today = today or date.today()
+        birthday_to_come = Q(date_of_birth__month__gt=today.month) | Q(
+            date_of_birth__month=today.month, date_of_birth__day__gt=today.day
+        )
+        return self.annotate(age_years=(
+            Value(today.year) - ExtractYear('date_of_birth')
+            - Case(When(birthday_to_come, then=Value(1)), default=Value(0))
+        ))
+
+    def age_between(self, min_age=None, max_age=None, today=None):
+        """
+        Elders aged ``min_age`` to ``max_age`` years inclusive, either bound
+        optional; the ages become a date_of_birth range, so the index answers it
+        """
+        return self.filter(**_birth_date_range(min_age, max_age, today or date.today()))
+
+    def age_band_counts(self, today=None):
+        """(band label, elders) for each of ElderProfile.AGE_BANDS, then 'Unknown', from one GROUP BY"""
+        today = today or date.today()
+        band = Case(
+            When(date_of_birth__isnull=True, then=Value('Unknown')),
+            *[When(then=Value(label), **_birth_date_range(min_age, max_age, today))
+              for label, min_age, max_age in ElderProfile.AGE_BANDS],
+            output_field=models.CharField(),
+        )
+        counts = dict(self.order_by().annotate(band=band).values_list('band').annotate(count=Count('pk')))
+        return [(label, counts.get(label, 0)) for label, _, _ in ElderProfile.AGE_BANDS] + [('Unknown', counts.get('Unknown', 0))]
+
 
 class ElderProfile(models.Model):
     GENDER_CHOICES = [
@@ -8,8 +88,18 @@ class ElderProfile(models.Model):
         ('F', 'Female'),
         ('O', 'Other'),
     ]
+    # (label, youngest, oldest) of the bands population reports count; None leaves a band open
+    AGE_BANDS = [
+        ('Under 65', None, 64),
+        ('65-74', 65, 74),
+        ('75-84', 75, 84),
+        ('85-94', 85, 94),
+        ('95+', 95, None),
+    ]
     
     guardian = models.ForeignKey(User, on_delete=models.CASCADE, related_name='elders')
+    # Staff who look after the elder; auto-assignment only hands their tasks to these users
+    caregivers = models.ManyToManyField(User, blank=True, related_name='assigned_elders')
     full_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True)
@@ -23,8 +113,23 @@ class ElderProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ElderProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Age filters and band reports become date_of_birth ranges; see ElderProfileQuerySet
+            models.Index(fields=['date_of_birth'], name='elder_date_of_birth_idx'),
+        ]
+
     def __str__(self):
         return self.full_name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored guardian so a handover tells the previous guardian's devices (see changelog.py)
+        instance._loaded_guardian_id = instance.__dict__.get('guardian_id')
+        return instance
     
     @property
     def name(self):
@@ -34,7 +139,6 @@ class ElderProfile(models.Model):
     @property
     def age(self):
         if self.date_of_birth:
-            from datetime import date
             today = date.today()
             return today.year - self.date_of_birth.year - ((today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day))
         return None
@@ -81,6 +185,10 @@ class MedicationSchedule(models.Model):
     instructions = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(null=True, blank=True)
+    # Messages of the last allergy and duplicate therapy screening (see screening.py)
+    screening_warnings = models.JSONField(default=list, blank=True)
+
+    objects = ShardedQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.medication.name} for {self.elder.full_name}"
@@ -93,9 +201,19 @@ class MedicationLog(models.Model):
     was_skipped = models.BooleanField(default=False)
     skip_reason = models.TextField(blank=True)
 
+    # Partitioned by month of taken_at; see partitions.py
+    objects = PartitionedQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.schedule.medication.name} taken at {self.taken_at}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['taken_at'], name='medicationlog_taken_at_idx'),
+        ]
+        # Updates through the SQLite view of the month tables report no rows
+        select_on_save = True
+
 class Appointment(models.Model):
     APPOINTMENT_TYPE_CHOICES = [
         ('DOCTOR', 'Doctor Visit'),
@@ -113,12 +231,17 @@ class Appointment(models.Model):
         ('CANCELLED', 'Cancelled'),
         ('RESCHEDULED', 'Rescheduled'),
     ]
+    # Bounds how far back an overlap search has to look; see scheduling.py
+    MAX_DURATION_MINUTES = 12 * 60
     
     elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='appointments')
     title = models.CharField(max_length=100)
     appointment_type = models.CharField(max_length=20, choices=APPOINTMENT_TYPE_CHOICES, default='DOCTOR')
     appointment_date = models.DateTimeField()
-    duration = models.IntegerField(help_text='Duration in minutes', default=30)
+    duration = models.IntegerField(
+        help_text='Duration in minutes', default=30,
+        validators=[MinValueValidator(1), MaxValueValidator(MAX_DURATION_MINUTES)]
+    )
     location = models.TextField(blank=True)
     doctor_name = models.CharField(max_length=100, blank=True)
     phone = models.CharField(max_length=20, blank=True)
@@ -126,10 +249,21 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SCHEDULED')
     reminder_sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ShardedQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.title} - {self.elder.full_name}"
 
+    class Meta:
+        indexes = [
+            # Range scans for calendars and overlap checks per elder, per doctor and overall
+            models.Index(fields=['elder', 'appointment_date'], name='appointment_elder_date_idx'),
+            models.Index(fields=['doctor_name', 'appointment_date'], name='appointment_doctor_date_idx'),
+            models.Index(fields=['appointment_date'], name='appointment_date_idx'),
+        ]
+
 class CareTask(models.Model):
     TASK_TYPE_CHOICES = [
         ('DAILY', 'Daily'),
@@ -153,6 +287,8 @@ class CareTask(models.Model):
         ('HIGH', 'High'),
         ('URGENT', 'Urgent'),
     ]
+    # Sort key of each priority, most urgent first
+    PRIORITY_RANKS = {'URGENT': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
     
     elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='care_tasks')
     title = models.CharField(max_length=200, null=True, blank=True)
@@ -162,15 +298,110 @@ class CareTask(models.Model):
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_tasks')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='MEDIUM')
+    # Computed by the database from priority, so bulk writes keep it in step; order by this, not priority
+    priority_rank = models.GeneratedField(
+        expression=Case(
+            *[When(priority=priority, then=Value(rank)) for priority, rank in PRIORITY_RANKS.items()],
+            default=Value(PRIORITY_RANKS['MEDIUM']),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
     due_date = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     completed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='completed_tasks')
     notes = models.TextField(blank=True)
+    # Set on occurrences generated from a recurring series; see recurrence.py
+    recurrence = models.ForeignKey(
+        'TaskRecurrence', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences'
+    )
     created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ShardedQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.title or 'Untitled Task'} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored assignee so a reassignment also refreshes the previous caregiver's workload
+        instance._loaded_assigned_to_id = instance.__dict__.get('assigned_to_id')
+        return instance
+
+    class Meta:
+        indexes = [
+            # Open tasks only, so the overdue sweep never reads completed history
+            models.Index(
+                fields=['due_date'],
+                condition=Q(status__in=['PENDING', 'IN_PROGRESS']),
+                name='caretask_open_due_idx',
+            ),
+            # Task queues (most urgent, then soonest due) per elder, and across all elders
+            models.Index(fields=['elder', 'status', 'priority_rank', 'due_date'], name='caretask_elder_queue_idx'),
+            models.Index(fields=['status', 'priority_rank', 'due_date'], name='caretask_queue_idx'),
+            # A caregiver's own queue ("assigned to me" with a status), also serving the workload counts
+            models.Index(fields=['assigned_to', 'status', 'priority_rank', 'due_date'], name='caretask_assignee_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recurrence', 'due_date'], name='unique_task_occurrence'),
+        ]
+
+class TaskRecurrence(models.Model):
+    """Rule generating CareTask occurrences of a recurring task ahead of time; see recurrence.py"""
+    FREQUENCY_CHOICES = [
+        ('DAILY', 'Daily'),
+        ('WEEKLY', 'Weekly'),
+        ('MONTHLY', 'Monthly'),
+    ]
+
+    elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='task_recurrences')
+    # Copied onto every occurrence
+    title = models.CharField(max_length=200, null=True, blank=True)
+    description = models.TextField()
+    priority = models.CharField(max_length=20, choices=CareTask.PRIORITY_CHOICES, default='MEDIUM')
+    assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='task_recurrences')
+    notes = models.TextField(blank=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='DAILY')
+    interval = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1)], help_text='Repeat every N days, weeks or months'
+    )
+    weekdays = models.CharField(
+        max_length=20, blank=True,
+        validators=[RegexValidator(r'^[0-6](,[0-6])*$', 'Enter weekday numbers from 0 to 6 separated by commas.')],
+        help_text='Weekly rules: comma-separated weekdays, 0 = Monday; blank repeats on the first weekday'
+    )
+    starts_at = models.DateTimeField(help_text='First occurrence; sets the time of day and the day of the month')
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    # Due date of the next occurrence still to be generated; null once the series has ended
+    next_due = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.title or 'Untitled Task'} ({self.get_frequency_display()}, every {self.interval})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_due'], condition=Q(is_active=True), name='taskrecurrence_due_idx'),
+        ]
+
+class EmergencyContactQuerySet(ShardedQuerySet):
+    def primary_for(self, elder):
+        """Single-row lookup served by the partial unique index on (elder) WHERE is_primary"""
+        return self.filter(elder=elder, is_primary=True).order_by().first()
+
+    def summary(self, since):
+        """Total, primary and recently updated counts in one conditional-aggregation query"""
+        return self.order_by().aggregate(
+            total_contacts=Count('pk'),
+            primary_contacts=Count('pk', filter=Q(is_primary=True)),
+            recent_updates=Count('pk', filter=Q(updated_at__gte=since)),
+        )
+
 class EmergencyContact(models.Model):
     RELATION_CHOICES = [
         ('SPOUSE', 'Spouse'),
@@ -196,24 +427,55 @@ class EmergencyContact(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_emergency_contacts')
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='updated_emergency_contacts')
 
+    objects = EmergencyContactQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} - {self.relation}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored flag so save() can tell a promotion from a plain re-save
+        instance._loaded_is_primary = instance.is_primary
+        return instance
+    
     def save(self, *args, **kwargs):
-        # If this contact is being set as primary, unset other primary contacts for this elder
-        if self.is_primary:
-            EmergencyContact.objects.filter(
-                elder=self.elder, 
-                is_primary=True
-            ).exclude(pk=self.pk).update(is_primary=False)
-        super().save(*args, **kwargs)
+        # Uniqueness of the primary contact is enforced by the database constraint below;
+        # the previous primary only needs demoting when this contact is being promoted.
+        if self.is_primary and not getattr(self, '_loaded_is_primary', False):
+            from .changelog import record_changes
+            with transaction.atomic():
+                demoted = EmergencyContact.objects.filter(
+                    elder_id=self.elder_id,
+                    is_primary=True
+                ).exclude(pk=self.pk)
+                record_changes(EmergencyContact, demoted.values_list('pk', flat=True))
+                demoted.update(is_primary=False, updated_at=timezone.now())
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        self._loaded_is_primary = self.is_primary
+    
+    def validate_constraints(self, exclude=None):
+        # save() hands the primary flag over from the current primary contact, so a
+        # second primary for the same elder is not a form error
+        exclude = set(exclude or ()) | {'elder'}
+        super().validate_constraints(exclude=exclude)
     
     class Meta:
         ordering = ['-is_primary', 'name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['elder'],
+                condition=Q(is_primary=True),
+                name='unique_primary_emergency_contact',
+            ),
+        ]
 
 class VitalsLog(models.Model):
     elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='vitals_logs')
-    recorded_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so imported history keeps its own times
+    recorded_at = models.DateTimeField(default=timezone.now, editable=False)
     blood_pressure_systolic = models.IntegerField(validators=[MinValueValidator(50), MaxValueValidator(300)], null=True, blank=True)
     blood_pressure_diastolic = models.IntegerField(validators=[MinValueValidator(30), MaxValueValidator(200)], null=True, blank=True)
     heart_rate = models.IntegerField(validators=[MinValueValidator(30), MaxValueValidator(200)], null=True, blank=True)
@@ -223,6 +485,10 @@ class VitalsLog(models.Model):
     blood_sugar = models.IntegerField(validators=[MinValueValidator(20), MaxValueValidator(600)], null=True, blank=True)
     notes = models.TextField(blank=True)
     logged_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Partitioned by month of recorded_at; see partitions.py
+    objects = PartitionedQuerySet.as_manager()
 
     def __str__(self):
         return f"Vitals {self.elder.full_name} @ {self.recorded_at}"
@@ -233,6 +499,16 @@ class VitalsLog(models.Model):
             return f"{self.blood_pressure_systolic}/{self.blood_pressure_diastolic}"
         return "N/A"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['elder', 'updated_at']),
+            models.Index(fields=['recorded_at'], name='vitalslog_recorded_at_idx'),
+            models.Index(fields=['elder', 'recorded_at'], name='vitalslog_elder_recorded_idx'),
+        ]
+        # Updates through the SQLite view of the month tables report no rows
+        select_on_save = True
+
 class IncidentReport(models.Model):
     SEVERITY_CHOICES = [
         ('LOW', 'Low'),
@@ -267,6 +543,8 @@ class IncidentReport(models.Model):
     resolved_date = models.DateTimeField(null=True, blank=True)
     resolved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_incidents')
 
+    objects = ShardedQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.incident_type}: {self.elder.full_name}"
 
@@ -289,10 +567,22 @@ class Notification(models.Model):
     read_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='read_notifications')
     priority = models.CharField(max_length=20, choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], default='MEDIUM')
     expires_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # OutboxEvent this was delivered from; a plain integer, since events stay on the default database
+    outbox_event_id = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+
+    objects = ShardedQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.notification_type}: {self.message[:20]}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['elder', 'updated_at']),
+            models.Index(fields=['created_at'], name='notification_created_at_idx'),
+        ]
+
 class UserProfile(models.Model):
     USER_TYPE_CHOICES = [
         ('ADMIN', 'Administrator'),
@@ -308,8 +598,290 @@ class UserProfile(models.Model):
     address = models.TextField(blank=True)
     emergency_contact = models.CharField(max_length=100, blank=True)
     emergency_phone = models.CharField(max_length=20, blank=True)
+    # Database alias (settings.CARE_SHARDS) of the user's facility; see sharding.py
+    shard = models.CharField(max_length=50, blank=True, help_text='Database holding the elders of the user\'s facility')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.user_type}"
+
+class ElderShard(models.Model):
+    """Where an elder's rows live when elder data is sharded; see sharding.py"""
+    # No foreign key: the elder is on another database
+    elder_id = models.BigIntegerField(primary_key=True)
+    shard = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Elder #{self.elder_id} on {self.shard}"
+
+class ElderShardUser(models.Model):
+    """The guardian or a caregiver of an elder, so their lists find the shards of their elders; see sharding.py"""
+    # No foreign keys, like ElderShard: the elder is on another database
+    elder_id = models.BigIntegerField()
+    user_id = models.IntegerField()
+
+    def __str__(self):
+        return f"User #{self.user_id} of elder #{self.elder_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'elder_id'], name='unique_elder_shard_user'),
+        ]
+        indexes = [
+            models.Index(fields=['elder_id'], name='eldershard_user_elder_idx'),
+        ]
+
+class ElderCareSummary(models.Model):
+    """Denormalized copy of everything the elder detail page shows, kept current by signals"""
+    elder = models.OneToOneField(ElderProfile, on_delete=models.CASCADE, primary_key=True, related_name='care_summary')
+    document = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Care summary for elder #{self.elder_id}"
+
+class CaregiverWorkload(models.Model):
+    """Open tasks assigned to a caregiver, kept current by signals; see workload.py"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='workload')
+    open_tasks = models.PositiveIntegerField(default=0)
+    # Open tasks weighted by priority (workload.PRIORITY_WEIGHTS)
+    weighted_load = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Workload of user #{self.user_id}: {self.open_tasks} open tasks"
+
+def new_feed_token():
+    return secrets.token_urlsafe(32)
+
+class CalendarFeed(models.Model):
+    """Secret iCalendar feed URL of a user, for one elder or for all their elders; see ics.py"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='calendar_feeds')
+    # Null for the feed covering every elder the user can see
+    elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='calendar_feeds')
+    token = models.CharField(max_length=64, unique=True, default=new_feed_token)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Calendar feed of {self.user} ({self.elder or 'all elders'})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'elder'], name='unique_elder_calendar_feed'),
+            models.UniqueConstraint(fields=['user'], condition=Q(elder__isnull=True), name='unique_user_calendar_feed'),
+        ]
+
+class ArchivedMonth(models.Model):
+    """One elder's rows of one model and month, moved out of the live table into a file; see archive.py"""
+    elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='archived_months')
+    model_label = models.CharField(max_length=100)
+    # First day of the (UTC) month
+    month = models.DateField()
+    # Relative to settings.CARE_ARCHIVE_ROOT
+    path = models.CharField(max_length=255)
+    rows = models.PositiveIntegerField()
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    size = models.PositiveBigIntegerField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.model_label} of elder #{self.elder_id}, {self.month:%Y-%m}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['elder', 'model_label', 'month'], name='archivedmonth_unique_month'),
+        ]
+
+class ChangeLogEntry(models.Model):
+    """One insert, update or delete of a synced row, or one elder entering or leaving a user's scope; the id is the offline sync token"""
+    UPSERT = 'UPSERT'
+    DELETE = 'DELETE'
+    GRANT = 'GRANT'
+    REVOKE = 'REVOKE'
+    ACTION_CHOICES = [
+        (UPSERT, 'Insert or update'),
+        (DELETE, 'Delete'),
+        (GRANT, 'Elder added to the user\'s scope'),
+        (REVOKE, 'Elder removed from the user\'s scope'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    resource = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    # Plain integer rather than a foreign key: entries must outlive the elder they describe
+    elder_id = models.BigIntegerField(null=True, blank=True)
+    # Set on GRANT and REVOKE entries, which only go to this user's devices
+    user_id = models.IntegerField(null=True, blank=True)
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES, default=UPSERT)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.resource}:{self.object_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['elder_id', 'id']),
+            models.Index(fields=['changed_at']),
+            models.Index(fields=['user_id', 'id'], name='changelog_user_idx'),
+        ]
+
+class OutboxEvent(models.Model):
+    """Side effect written in the same transaction as the change that caused it; see outbox.py"""
+    NOTIFICATION = 'NOTIFICATION'
+    EVENT_TYPE_CHOICES = [
+        (NOTIFICATION, 'Create notification'),
+    ]
+
+    PENDING = 'PENDING'
+    DONE = 'DONE'
+    SKIPPED = 'SKIPPED'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (SKIPPED, 'Skipped (duplicate or obsolete)'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    payload = models.JSONField(default=dict)
+    # Idempotency key of the originating action; blank events are never deduplicated
+    dedupe_key = models.CharField(max_length=128, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.event_type} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['dedupe_key', 'processed_at']),
+        ]
+
+class Job(models.Model):
+    """Background work stored in the database and run by the run_worker command; see jobs.py"""
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    CANCELLED = 'CANCELLED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0, help_text='Higher runs first')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # Set for periodic runs so each schedule slot is enqueued once across all workers
+    unique_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.task} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at']),
+            models.Index(fields=['task', 'status']),
+        ]
+
+class PeriodicSlot(models.Model):
+    """The last slot of a periodic task queued by any worker, so a slot no worker was free for is caught up; see jobs.py"""
+    task = models.CharField(max_length=100, primary_key=True)
+    slot = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.task} queued up to {self.slot:%Y-%m-%d %H:%M}"
+
+class ImportRun(models.Model):
+    """
+    A CSV import of one resource; see importer.py. rows_done advances in the
+    same transaction as each chunk's rows, so a failed run resumes after the
+    last chunk it committed.
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    RESOURCE_CHOICES = [
+        ('elders', 'Elders'),
+        ('medications', 'Medications'),
+        ('schedules', 'Medication schedules'),
+        ('contacts', 'Emergency contacts'),
+        ('vitals', 'Vitals history'),
+    ]
+
+    resource = models.CharField(max_length=20, choices=RESOURCE_CHOICES)
+    file = models.FileField(
+        upload_to='imports/%Y/%m/', validators=[FileExtensionValidator(['csv'])],
+        help_text='CSV with a header row of form field names'
+    )
+    chunk_size = models.PositiveIntegerField(
+        default=1000, validators=[MinValueValidator(1), MaxValueValidator(10000)],
+        help_text='Rows written per transaction'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    rows_done = models.PositiveIntegerField(default=0, help_text='Rows read up to the last committed chunk')
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    # Line numbers and form errors of the first rejected rows
+    errors = models.JSONField(default=list, blank=True)
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_runs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_resource_display()} import ({self.status})"
+
+class ScreeningTerm(models.Model):
+    """
+    One row of the synonym table behind allergy and duplicate therapy
+    screening (see screening.py): a word or phrase as written in allergy
+    notes or medication names, and an ingredient or drug class it stands for
+    """
+    term = models.CharField(max_length=100, help_text='e.g. amoxil, sulfa drugs, blood thinner')
+    concept = models.CharField(max_length=100, help_text='Ingredient or drug class, e.g. amoxicillin, penicillins')
+
+    def __str__(self):
+        return f"{self.term} → {self.concept}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'concept'], name='unique_screening_term'),
+        ]
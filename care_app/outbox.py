@@ -0,0 +1,179 @@
+"""
+Transactional outbox for side effects of user actions.
+
+Views record follow-up work (currently: notifications) as OutboxEvent rows
+inside the same transaction as the change itself, so the request does one
+insert however many notifications the action fans out to, and an event
+exists if and only if the change committed. The deliver_outbox background
+job (tasks.py), or the process_outbox management command, delivers pending
+events in batches:
+
+- events are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+  workers can run side by side;
+- an event's side effects and its DONE status commit together, so a crash
+  or retry never delivers an event twice;
+- an event enqueued with the same idempotency key as one delivered within
+  DEDUPE_WINDOW is skipped. The key names the originating action (see
+  action_key()), never the notification text: two falls reported for the
+  same elder read the same but must both be delivered;
+- each notification records the event it came from, so an event whose
+  notifications reached a shard but whose DONE status never committed on
+  the default database is not delivered again;
+- a failing batch is retried event by event with exponential backoff, and
+  an event that keeps failing is parked as FAILED after MAX_ATTEMPTS.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache_versions, sharding
+from .changelog import record_changes
+from .models import OutboxEvent, Notification, ElderProfile
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+DEDUPE_WINDOW = timedelta(minutes=10)
+
+
+def action_key(instance, action):
+    """Idempotency key of ``action`` done to ``instance``; each save of the row is a separate action"""
+    key = f'{instance._meta.label_lower}:{instance.pk}:{action}'
+    version = getattr(instance, 'updated_at', None)
+    return f'{key}@{version.isoformat()}' if version else key
+
+
+def enqueue(event_type, payload, key=''):
+    """Record an event; call inside the transaction making the change it follows from"""
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload, dedupe_key=key)
+
+
+def _notification(elder_id, message, notification_type, priority):
+    return {
+        'elder_id': elder_id,
+        'notification_type': notification_type,
+        'message': message,
+        'priority': priority,
+    }
+
+
+def enqueue_notification(elder, message, notification_type='GENERAL', priority='MEDIUM', key=''):
+    return enqueue(OutboxEvent.NOTIFICATION, _notification(
+        elder.pk if elder else None, message, notification_type, priority
+    ), key=key)
+
+
+def enqueue_notifications(notices, notification_type='GENERAL', priority='MEDIUM'):
+    """enqueue_notification() for many (elder id, message) pairs in one INSERT"""
+    payloads = [_notification(elder_id, message, notification_type, priority) for elder_id, message in notices]
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(event_type=OutboxEvent.NOTIFICATION, payload=payload) for payload in payloads
+    ])
+
+
+def _deliver_notifications(events):
+    """Create one notification per event, in a single INSERT per shard; returns events that became obsolete"""
+    by_shard = defaultdict(list)
+    for event in events:
+        by_shard[sharding.shard_of_elder(event.payload['elder_id'])].append(event)
+    obsolete = []
+    for alias, group in by_shard.items():
+        with sharding.use_shard(alias), sharding.atomic():
+            obsolete += _create_notifications(group)
+    return obsolete
+
+
+def _create_notifications(events):
+    elder_ids = {event.payload['elder_id'] for event in events} - {None}
+    existing = set(ElderProfile.objects.filter(pk__in=elder_ids).values_list('pk', flat=True))
+    # The elder may have been deleted since the event was written
+    obsolete = [event for event in events if event.payload['elder_id'] not in existing | {None}]
+    # An earlier attempt may have created them and then failed to mark the event DONE
+    delivered = set(Notification.objects.filter(
+        outbox_event_id__in=[event.pk for event in events]
+    ).values_list('outbox_event_id', flat=True))
+    notifications = Notification.objects.bulk_create([
+        Notification(created_at=event.created_at, outbox_event_id=event.pk, **event.payload)
+        for event in events if event not in obsolete and event.pk not in delivered
+    ])
+    # bulk_create bypasses the signals that log changes and invalidate cached fragments
+    record_changes(Notification, [notification.pk for notification in notifications])
+    for elder_id in {notification.elder_id for notification in notifications}:
+        transaction.on_commit(lambda elder_id=elder_id: cache_versions.bump('notification', elder_id))
+    return obsolete
+
+
+HANDLERS = {
+    OutboxEvent.NOTIFICATION: _deliver_notifications,
+}
+
+
+def _split_duplicates(events, now):
+    delivered = set(OutboxEvent.objects.filter(
+        status=OutboxEvent.DONE,
+        processed_at__gte=now - DEDUPE_WINDOW,
+        dedupe_key__in={event.dedupe_key for event in events} - {''},
+    ).values_list('dedupe_key', flat=True))
+    fresh, duplicates = [], []
+    for event in events:
+        if not event.dedupe_key:
+            fresh.append(event)
+        elif event.dedupe_key in delivered:
+            duplicates.append(event)
+        else:
+            delivered.add(event.dedupe_key)
+            fresh.append(event)
+    return fresh, duplicates
+
+
+def _handle(handler, events, now):
+    """Run ``handler`` in a savepoint; on failure retry one event at a time to isolate the bad one"""
+    try:
+        with transaction.atomic():
+            obsolete = handler(events)
+    except Exception as error:
+        if len(events) > 1:
+            for event in events:
+                _handle(handler, [event], now)
+            return
+        event = events[0]
+        event.attempts += 1
+        event.last_error = f'{type(error).__name__}: {error}'
+        if event.attempts >= MAX_ATTEMPTS:
+            event.status = OutboxEvent.FAILED
+        else:
+            event.available_at = now + RETRY_DELAY * 2 ** (event.attempts - 1)
+        return
+    for event in events:
+        event.status = OutboxEvent.SKIPPED if event in obsolete else OutboxEvent.DONE
+        event.processed_at = now
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Deliver up to ``batch_size`` due events; returns how many events were claimed"""
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.PENDING, available_at__lte=now)
+            .order_by('pk')[:batch_size]
+        )
+        if not events:
+            return 0
+        fresh, duplicates = _split_duplicates(events, now)
+        for event in duplicates:
+            event.status = OutboxEvent.SKIPPED
+            event.processed_at = now
+
+        by_type = {}
+        for event in fresh:
+            by_type.setdefault(event.event_type, []).append(event)
+        for event_type, group in by_type.items():
+            _handle(HANDLERS[event_type], group, now)
+
+        OutboxEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'available_at', 'processed_at', 'last_error']
+        )
+    return len(events)
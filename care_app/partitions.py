@@ -0,0 +1,583 @@
+"""
+Monthly partitions of the vitals and medication logs.
+
+Both logs only grow, and nearly every query wants their last few weeks.
+Each is split by the calendar month (UTC) of its time column
+(PARTITIONED_MODELS) into a table per month, so "recent vitals" searches
+the indexes of the last month or two, which stay the same size however much
+history builds up.
+
+On PostgreSQL, migration 0023 turns both tables into tables partitioned by
+range of the time column, with a partition <table>_pYYYYMM for every month
+that has rows and the old table's indexes. Their primary key becomes (id,
+time column), as partitioning requires; ids still come from the one
+sequence. The planner skips the partitions a condition on the time column
+rules out, and ORDER BY time DESC LIMIT reads the newest partition first and
+stops once it has its rows.
+
+SQLite has no partitioning. There the month tables sit behind a view named
+like the table, the UNION ALL of the months, whose INSTEAD OF triggers put
+each written row in the table of its month. Conditions and ORDER BY ...
+LIMIT reach each month's indexes; a month outside a time condition costs
+one index probe. A view differs from a table in two ways the models allow
+for: it cannot hand back generated ids, so rows get theirs from a counter
+table, <table>_ids, before the insert (prepare_rows); and an UPDATE or
+DELETE through it reports no rows, so the models set Meta.select_on_save
+and PartitionedQuerySet counts the rows of .update() and .delete() itself
+(see there for what it cannot count). Migrations
+cannot alter a view either: migrate folds the months back into one table
+before it applies any migration and splits it again afterwards (see
+signals.py).
+
+A row needs the partition of its month. maintain(), run daily by the
+maintain_partitions job and by the command of that name, creates them
+PARTITIONS_AHEAD months ahead, and inserts through the ORM, bulk_create
+included, create the partition of any other month first (back-dated
+entries, imports, moved elders). A queryset .update() of the time column
+does not; PostgreSQL then refuses the row.
+
+With CARE_PARTITION_RETENTION_MONTHS set, maintain() also detaches the
+months older than that: their rows leave the log, and every page, export
+and count with it, and stay in the database as a table of their own,
+<table>_detachedYYYYMM, to archive or drop. A row written later to a
+detached month gets a new partition, which the next run adds to the same
+table.
+
+Other databases keep plain tables.
+"""
+import datetime
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils import timezone
+
+from .sharding import ShardedQuerySet
+
+# Model label -> the time field its rows are partitioned by
+PARTITIONED_MODELS = {
+    'care_app.VitalsLog': 'recorded_at',
+    'care_app.MedicationLog': 'taken_at',
+}
+PARTITIONS_AHEAD = 2
+# The SQLite layout follows this migration; see split_tables()
+PARTITIONING_MIGRATION = ('care_app', '0023_partition_logs')
+
+# (alias, table) -> the months with a partition, or None for a plain table, as this process knows them
+_attached = {}
+
+
+def retention_months():
+    return getattr(settings, 'CARE_PARTITION_RETENTION_MONTHS', None)
+
+
+def partitioned_models():
+    return [apps.get_model(label) for label in PARTITIONED_MODELS]
+
+
+def month_of(value):
+    """The first day of the UTC month of ``value``"""
+    if timezone.is_aware(value):
+        value = value.astimezone(datetime.timezone.utc)
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def upcoming_months():
+    current = month_of(timezone.now())
+    return [add_months(current, count) for count in range(PARTITIONS_AHEAD + 1)]
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def detached_name(table, month):
+    return f'{table}_detached{month:%Y%m}'
+
+
+def _time_column(model):
+    return model._meta.get_field(PARTITIONED_MODELS[model._meta.label]).column
+
+
+def _bound(connection, month):
+    # The way each backend stores the UTC midnight starting ``month``
+    suffix = '+00:00' if connection.vendor == 'postgresql' else ''
+    return f'{month:%Y-%m-%d} 00:00:00{suffix}'
+
+
+def _months_of(names, table):
+    pattern = re.compile(rf'{re.escape(table)}_p(\d{{4}})(\d{{2}})$')
+    matches = (pattern.match(name) for name in names)
+    return {datetime.date(int(match[1]), int(match[2]), 1) for match in matches if match}
+
+
+def _exists(cursor, connection, name):
+    if connection.vendor == 'postgresql':
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [connection.ops.quote_name(name)])
+        return cursor.fetchone()[0]
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [name])
+    return cursor.fetchone() is not None
+
+
+def _load(connection, table):
+    """The months of ``table``'s partitions, or None when it is a plain table"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [connection.ops.quote_name(table)])
+            row = cursor.fetchone()
+            if row is None or row[0] != 'p':
+                return None
+            cursor.execute(
+                'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass',
+                [connection.ops.quote_name(table)],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = %s", [table])
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB %s", [f'{table}_p*'])
+        else:
+            return None
+        return _months_of([name for (name,) in cursor.fetchall()], table)
+
+
+def attached_months(model, using):
+    """The months ``model``'s table has partitions for on ``using``, or None when it is not partitioned"""
+    connection = connections[using]
+    key = (connection.alias, model._meta.db_table)
+    if key not in _attached:
+        _attached[key] = _load(connection, model._meta.db_table)
+    return _attached[key]
+
+
+def ensure_partitions(model, months, using):
+    """Create the partitions of ``months`` (first days) that ``model``'s table lacks on ``using``; returns them"""
+    attached = attached_months(model, using)
+    if attached is None:
+        return []
+    missing = sorted(set(months) - attached)
+    if not missing:
+        return []
+    connection = connections[using]
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Another process creating the same month waits here, then finds it made
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [table])
+            for month in missing:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {qn(partition_name(table, month))} PARTITION OF {qn(table)} '
+                    f"FOR VALUES FROM ('{_bound(connection, month)}') TO ('{_bound(connection, add_months(month, 1))}')"
+                )
+        else:
+            # Another process may have added some since this one looked
+            present = _load(connection, table)
+            template = partition_name(table, max(present))
+            for month in missing:
+                if month not in present:
+                    _create_month(cursor, connection, template, table, month)
+            _route(cursor, connection, model, present | set(missing))
+    # Known only once committed; a rolled back transaction takes the partitions with it
+    transaction.on_commit(lambda: attached.update(missing), using=using)
+    return missing
+
+
+def prepare_rows(model, objs, using):
+    """
+    Get the partitions of the months of ``objs``, which are about to be
+    saved on ``using``, and on SQLite ids for the new ones
+    """
+    if model._meta.label not in PARTITIONED_MODELS or attached_months(model, using) is None:
+        return
+    attname = model._meta.get_field(PARTITIONED_MODELS[model._meta.label]).attname
+    now = timezone.now()
+    months = set()
+    for obj in objs:
+        value = getattr(obj, attname)
+        if value is None:
+            # auto_now_add fills it in later, maybe after midnight at the turn of a month
+            months.update([month_of(now), add_months(month_of(now), 1)])
+        else:
+            months.add(month_of(value))
+    ensure_partitions(model, months, using)
+    if connections[using].vendor == 'sqlite':
+        new = [obj for obj in objs if obj.pk is None]
+        if new:
+            for obj, pk in zip(new, allocate_ids(model, len(new), using)):
+                obj.pk = pk
+
+
+def allocate_ids(model, count, using):
+    """``count`` ids for rows to insert through the SQLite view of ``model``'s months"""
+    connection = connections[using]
+    counter = connection.ops.quote_name(f'{model._meta.db_table}_ids')
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {counter} SET value = value + %s RETURNING value', [count])
+        last = cursor.fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def set_last_id(model, value, using):
+    """Make ``value`` the last id given out by the SQLite view of ``model``'s months; False for a plain table"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or attached_months(model, using) is None:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {connection.ops.quote_name(model._meta.db_table + "_ids")} SET value = %s', [value])
+    return True
+
+
+def detach_partitions(model, before, using):
+    """Take the months before ``before`` out of ``model``'s table on ``using``; returns them"""
+    attached = attached_months(model, using)
+    if attached is None:
+        return []
+    old = sorted(month for month in attached if month < before)
+    if not old:
+        return []
+    connection = connections[using]
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for month in old:
+                cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(partition_name(table, month))}')
+        else:
+            remaining = attached - set(old)
+            if not remaining:
+                # The view needs a month; it gets the current one
+                current = month_of(timezone.now())
+                _create_month(cursor, connection, partition_name(table, old[-1]), table, current)
+                remaining = {current}
+            _route(cursor, connection, model, remaining)
+        for month in old:
+            partition, detached = partition_name(table, month), detached_name(table, month)
+            if _exists(cursor, connection, detached):
+                cursor.execute(f'INSERT INTO {qn(detached)} SELECT * FROM {qn(partition)}')
+                cursor.execute(f'DROP TABLE {qn(partition)}')
+            elif connection.vendor == 'postgresql':
+                cursor.execute(f'ALTER TABLE {qn(partition)} RENAME TO {qn(detached)}')
+            else:
+                # SQLite index names are global and cannot be renamed, and the month may come back
+                cursor.execute(f'CREATE TABLE {qn(detached)} AS SELECT * FROM {qn(partition)}')
+                cursor.execute(f'DROP TABLE {qn(partition)}')
+    transaction.on_commit(lambda: attached.difference_update(old), using=using)
+    return old
+
+
+def maintain(using, detach_before=None):
+    """
+    Create the coming months' partitions on ``using`` and detach the months
+    before ``detach_before``, by default the retention period ago; returns
+    the numbers of partitions created and detached
+    """
+    current = month_of(timezone.now())
+    if detach_before is None and retention_months():
+        detach_before = add_months(current, -retention_months())
+    created = detached = 0
+    for model in partitioned_models():
+        created += len(ensure_partitions(model, upcoming_months(), using))
+        if detach_before is not None:
+            # Never the month being written
+            detached += len(detach_partitions(model, min(detach_before, current), using))
+    return created, detached
+
+
+class PartitionedQuerySet(ShardedQuerySet):
+    """
+    Through the SQLite view the triggers do the writing, and the database
+    counts none of it: .update() and .delete() here count the rows they are
+    about to change first, in the same transaction. Counts that come from
+    elsewhere stay 0 on SQLite, those of Model.delete() and of cascades and
+    updates through _base_manager among them; nothing in care_app reads them.
+    """
+
+    def _through_view(self):
+        return connections[self.db].vendor == 'sqlite' and attached_months(self.model, self.db) is not None
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        # As bulk_create itself picks the database
+        self._for_write = True
+        prepare_rows(self.model, objs, self.db)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        self._for_write = True
+        if not self._through_view():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            rows = self.count()
+            super().update(**kwargs)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        self._for_write = True
+        if not self._through_view():
+            return super().delete()
+        label = self.model._meta.label
+        with transaction.atomic(using=self.db):
+            rows = self.count()
+            deleted, per_model = super().delete()
+        return deleted - per_model.get(label, 0) + rows, {**per_model, label: rows}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+# PostgreSQL: conversion by migration 0023
+
+def _convert(connection, model, partitioned):
+    """Rebuild ``model``'s table as a partitioned table or, with partitioned False, a plain one"""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    column = _time_column(model)
+    pk = model._meta.pk.column
+    old = f'{table}_old'
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old)}')
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [qn(old)],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid '
+            'WHERE x.indrelid = %s::regclass AND NOT x.indisprimary',
+            [qn(old)],
+        )
+        indexes = cursor.fetchall()
+        # Index and constraint names are unique per schema: the new table takes them over
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [qn(old)])
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {qn(old)} DROP CONSTRAINT {qn(name)}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {qn(name)}')
+
+        # Serial columns keep their sequence; an identity column's goes with its table, so it becomes one
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [qn(old), pk])
+        sequence = cursor.fetchone()[0]
+        cursor.execute('SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = %s', [qn(old), pk])
+        identity = cursor.fetchone()[0]
+        if identity:
+            cursor.execute(f'SELECT last_value + CASE WHEN is_called THEN 1 ELSE 0 END FROM {sequence}')
+            next_id = cursor.fetchone()[0]
+            cursor.execute(f'ALTER TABLE {qn(old)} ALTER COLUMN {qn(pk)} DROP IDENTITY')
+            sequence = f'{table}_{pk}_seq'
+            cursor.execute(f'CREATE SEQUENCE {qn(sequence)} START WITH {next_id}')
+
+        partitioning = f' PARTITION BY RANGE ({qn(column)})' if partitioned else ''
+        cursor.execute(f'CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){partitioning}')
+        if identity:
+            cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN {qn(pk)} SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {qn(table)}.{qn(pk)}')
+        key = f'{qn(pk)}, {qn(column)}' if partitioned else qn(pk)
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY ({key})')
+
+        if partitioned:
+            cursor.execute(f"SELECT DISTINCT date_trunc('month', {qn(column)} AT TIME ZONE 'UTC')::date FROM {qn(old)}")
+            months = {month for (month,) in cursor.fetchall()} | set(upcoming_months())
+            for month in sorted(months):
+                cursor.execute(
+                    f'CREATE TABLE {qn(partition_name(table, month))} PARTITION OF {qn(table)} '
+                    f"FOR VALUES FROM ('{_bound(connection, month)}') TO ('{_bound(connection, add_months(month, 1))}')"
+                )
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old)}')
+        for name, definition in indexes:
+            cursor.execute(re.sub(r' ON (ONLY )?\S+ USING ', f' ON {qn(table)} USING ', definition, count=1))
+        # Only now: Django's foreign keys are deferred, and the checks the copy would queue
+        # make PostgreSQL refuse the CREATE INDEX in the same transaction; added last, each
+        # is checked with one scan of the table
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+        cursor.execute(f'DROP TABLE {qn(old)}')
+        cursor.execute(f'ANALYZE {qn(table)}')
+    _attached.pop((connection.alias, table), None)
+
+
+def partition_table(connection, model):
+    _convert(connection, model, partitioned=True)
+
+
+def merge_table(connection, model):
+    """Undo partition_table(); detached months stay as they are"""
+    _convert(connection, model, partitioned=False)
+
+
+# SQLite: month tables behind a view
+
+def _definition(cursor, table):
+    """The CREATE TABLE statement of ``table`` and its (index name, CREATE INDEX statement)s"""
+    cursor.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = %s AND type IN ('table', 'index') "
+        'AND sql IS NOT NULL ORDER BY type DESC', [table]
+    )
+    rows = cursor.fetchall()
+    return rows[0][2], [(name, sql) for kind, name, sql in rows[1:]]
+
+
+def _create_table(cursor, connection, definition, source, target, index_name):
+    qn = connection.ops.quote_name
+    table_sql, indexes = definition
+    cursor.execute(table_sql.replace(qn(source), qn(target), 1))
+    return [
+        sql.replace(qn(name), qn(index_name(name)), 1).replace(qn(source), qn(target), 1)
+        for name, sql in indexes
+    ]
+
+
+def _create_month(cursor, connection, template, table, month):
+    """An empty table for ``month`` of ``table`` built like the month table ``template``"""
+    suffix = f'_p{month:%Y%m}'
+    for sql in _create_table(cursor, connection, _definition(cursor, template), template, partition_name(table, month),
+                             lambda name: name[:-len(suffix)] + suffix):
+        cursor.execute(sql)
+
+
+def _runs(months):
+    """Consecutive ``months`` as (first, after last) pairs"""
+    runs = []
+    for month in sorted(months):
+        if runs and runs[-1][1] == month:
+            runs[-1][1] = add_months(month, 1)
+        else:
+            runs.append([month, add_months(month, 1)])
+    return runs
+
+
+def _route(cursor, connection, model, months):
+    """(Re)create the view of ``model``'s table over its ``months`` and the triggers writing through it"""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    time = qn(_time_column(model))
+    pk = qn(model._meta.pk.column)
+    counter = qn(f'{table}_ids')
+    months = sorted(months)
+    cursor.execute(f'PRAGMA table_info({qn(partition_name(table, months[0]))})')
+    columns = [qn(row[1]) for row in cursor.fetchall()]
+
+    def within(row, first, end):
+        return f"{row}.{time} >= '{_bound(connection, first)}' AND {row}.{time} < '{_bound(connection, end)}'"
+
+    values = ', '.join(f'COALESCE(NEW.{pk}, (SELECT value FROM {counter}))' if name == pk else f'NEW.{name}'
+                       for name in columns)
+    inserts = ''.join(
+        f'INSERT INTO {qn(partition_name(table, month))} ({", ".join(columns)}) '
+        f'SELECT {values} WHERE {within("NEW", month, add_months(month, 1))}; '
+        for month in months
+    )
+    deletes = ''.join(
+        f'DELETE FROM {qn(partition_name(table, month))} '
+        f'WHERE {pk} = OLD.{pk} AND {within("OLD", month, add_months(month, 1))}; '
+        for month in months
+    )
+    covered = ' OR '.join(within('NEW', first, end) for first, end in _runs(months))
+    refuse = f"SELECT RAISE(ABORT, 'no partition of {table} for the month of the row') WHERE NOT ({covered}); "
+    count = (f'UPDATE {counter} SET value = CASE WHEN NEW.{pk} IS NULL THEN value + 1 '
+             f'ELSE max(value, NEW.{pk}) END; ')
+
+    # Dropping the view drops its triggers
+    cursor.execute(f'DROP VIEW IF EXISTS {qn(table)}')
+    cursor.execute(f'CREATE VIEW {qn(table)} AS ' + ' UNION ALL '.join(
+        f'SELECT * FROM {qn(partition_name(table, month))}' for month in months
+    ))
+    cursor.execute(f'CREATE TRIGGER {qn(table + "_insert")} INSTEAD OF INSERT ON {qn(table)} '
+                   f'BEGIN {refuse}{count}{inserts}END')
+    cursor.execute(f'CREATE TRIGGER {qn(table + "_update")} INSTEAD OF UPDATE ON {qn(table)} '
+                   f'BEGIN {refuse}{count}{deletes}{inserts}END')
+    cursor.execute(f'CREATE TRIGGER {qn(table + "_delete")} INSTEAD OF DELETE ON {qn(table)} BEGIN {deletes}END')
+
+
+def _split(connection, model):
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    time = qn(_time_column(model))
+    pk = qn(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        definition = _definition(cursor, table)
+        cursor.execute(f'SELECT DISTINCT substr({time}, 1, 7) FROM {qn(table)}')
+        months = {datetime.date(int(value[:4]), int(value[5:7]), 1) for (value,) in cursor.fetchall()}
+        months |= set(upcoming_months())
+        for month in sorted(months):
+            partition = partition_name(table, month)
+            indexes = _create_table(cursor, connection, definition, table, partition, lambda name: f'{name}_p{month:%Y%m}')
+            cursor.execute(
+                f'INSERT INTO {qn(partition)} SELECT * FROM {qn(table)} WHERE {time} >= %s AND {time} < %s',
+                [_bound(connection, month), _bound(connection, add_months(month, 1))],
+            )
+            for sql in indexes:
+                cursor.execute(sql)
+        # Ids are never reused, as with AUTOINCREMENT
+        cursor.execute(
+            f'SELECT max(coalesce((SELECT MAX({pk}) FROM {qn(table)}), 0), '
+            f'coalesce((SELECT seq FROM sqlite_sequence WHERE name = %s), 0))',
+            [table],
+        )
+        last = cursor.fetchone()[0]
+        cursor.execute(f'CREATE TABLE {qn(table + "_ids")} (value integer NOT NULL)')
+        cursor.execute(f'INSERT INTO {qn(table + "_ids")} (value) VALUES (%s)', [last])
+        cursor.execute(f'DROP TABLE {qn(table)}')
+        cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s', [table])
+        _route(cursor, connection, model, months)
+
+
+def _fold(connection, model, months):
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    template = partition_name(table, max(months))
+    suffix = len(f'_p{max(months):%Y%m}')
+    with connection.cursor() as cursor:
+        definition = _definition(cursor, template)
+        cursor.execute(f'SELECT value FROM {qn(table + "_ids")}')
+        last = cursor.fetchone()[0]
+        cursor.execute(f'DROP VIEW {qn(table)}')
+        indexes = _create_table(cursor, connection, definition, template, table, lambda name: name[:-suffix])
+        for month in sorted(months):
+            cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(partition_name(table, month))}')
+            cursor.execute(f'DROP TABLE {qn(partition_name(table, month))}')
+        for sql in indexes:
+            cursor.execute(sql)
+        cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s', [table])
+        cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, last])
+        cursor.execute(f'DROP TABLE {qn(table + "_ids")}')
+
+
+def split_tables(using):
+    """Split the logs on the SQLite database ``using`` into months, once their migration has been applied"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if PARTITIONING_MIGRATION not in MigrationRecorder(connection).applied_migrations():
+        return
+    # Views are not listed, so a split table is not split again
+    tables = set(connection.introspection.table_names())
+    with transaction.atomic(using=using):
+        for model in partitioned_models():
+            if model._meta.db_table in tables and router.allow_migrate_model(using, model):
+                _split(connection, model)
+            _attached.pop((using, model._meta.db_table), None)
+
+
+def fold_tables(using):
+    """Turn the SQLite views of month tables on ``using`` back into plain tables, for migrations"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with transaction.atomic(using=using):
+        for model in partitioned_models():
+            _attached.pop((using, model._meta.db_table), None)
+            months = attached_months(model, using)
+            if months:
+                _fold(connection, model, months)
+            _attached.pop((using, model._meta.db_table), None)
@@ -0,0 +1,177 @@
+"""
+Recurring care tasks and the overdue sweep.
+
+A TaskRecurrence row is the rule of a series (daily, weekly on some weekdays,
+or monthly, every N periods). generate_occurrences() creates the CareTask
+rows of every active series up to HORIZON ahead, in batches of rules taken
+from the partial index on next_due, so the work per run depends on the
+series due for extension and never on the tasks already done. Each rule
+remembers the due date of the next occurrence to create, which makes runs
+idempotent; the unique (recurrence, due_date) constraint backs that up.
+
+sweep_overdue() marks PENDING and IN_PROGRESS tasks whose due date has
+passed as OVERDUE, one UPDATE per batch of primary keys read from the
+partial index on open tasks.
+
+Both write in bulk, so they log changes and invalidate cached fragments and
+care summaries themselves (signals do not fire).
+"""
+import calendar
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache_versions, sharding, workload
+from .changelog import record_changes
+from .models import CareTask, TaskRecurrence
+from .summary import schedule_refresh
+
+HORIZON = timedelta(days=14)
+# After an outage, occurrences older than this are skipped rather than created late
+MAX_CATCH_UP = timedelta(days=1)
+RULE_BATCH_SIZE = 500
+SWEEP_BATCH_SIZE = 5000
+OPEN_STATUSES = ['PENDING', 'IN_PROGRESS']
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def _weekdays(rule, first):
+    if not rule.weekdays.strip():
+        return [first.weekday()]
+    return sorted({int(day) for day in rule.weekdays.split(',') if day.strip()})
+
+
+def _dates(rule, first, floor):
+    """Candidate local dates of ``rule`` in order, starting near ``floor`` instead of at the first occurrence"""
+    interval = rule.interval
+    if rule.frequency == 'DAILY':
+        period = max(0, (floor - first).days // interval)
+        while True:
+            yield first + timedelta(days=period * interval)
+            period += 1
+    elif rule.frequency == 'WEEKLY':
+        monday = first - timedelta(days=first.weekday())
+        weekdays = _weekdays(rule, first)
+        period = max(0, (floor - monday).days // 7 // interval)
+        while True:
+            week = monday + timedelta(weeks=period * interval)
+            for weekday in weekdays:
+                yield week + timedelta(days=weekday)
+            period += 1
+    else:
+        origin = first.year * 12 + first.month - 1
+        period = max(0, (floor.year * 12 + floor.month - 1 - origin) // interval)
+        while True:
+            year, month = divmod(origin + period * interval, 12)
+            # The 31st falls on the last day of shorter months
+            day = min(first.day, calendar.monthrange(year, month + 1)[1])
+            yield date(year, month + 1, day)
+            period += 1
+
+
+def occurrences(rule, start):
+    """Due datetimes of ``rule`` at or after ``start``, in order, until the rule ends"""
+    first = timezone.localtime(rule.starts_at)
+    start = max(start, rule.starts_at)
+    # Occurrences keep their wall-clock time across daylight saving changes
+    for day in _dates(rule, first.date(), timezone.localtime(start).date()):
+        due = timezone.make_aware(datetime.combine(day, first.time().replace(tzinfo=None)))
+        if rule.ends_at and due > rule.ends_at:
+            return
+        if due >= start:
+            yield due
+
+
+def describe(rule):
+    unit = {'DAILY': 'day', 'WEEKLY': 'week', 'MONTHLY': 'month'}[rule.frequency]
+    text = f'Every {unit}' if rule.interval == 1 else f'Every {rule.interval} {unit}s'
+    if rule.frequency == 'WEEKLY':
+        first = timezone.localtime(rule.starts_at)
+        text += ' on ' + ', '.join(WEEKDAY_NAMES[day] for day in _weekdays(rule, first))
+    return text
+
+
+def _bulk_written(tasks):
+    """Do what the CareTask signals would have done for ``tasks`` (pk, elder_id pairs)"""
+    elder_ids = {elder_id for _, elder_id in tasks}
+    record_changes(CareTask, [pk for pk, _ in tasks])
+    schedule_refresh(elder_ids, ['care_tasks'])
+    for elder_id in elder_ids:
+        transaction.on_commit(lambda elder_id=elder_id: cache_versions.bump('caretask', elder_id))
+
+
+def _extend(rules, until, now):
+    tasks = []
+    for rule in rules:
+        due_dates = occurrences(rule, max(rule.next_due, now - MAX_CATCH_UP))
+        rule.next_due = None
+        frequency = describe(rule)
+        for due in due_dates:
+            if due > until:
+                rule.next_due = due
+                break
+            tasks.append(CareTask(
+                elder_id=rule.elder_id, title=rule.title, description=rule.description,
+                task_type=rule.frequency, frequency=frequency, assigned_to_id=rule.assigned_to_id,
+                priority=rule.priority, notes=rule.notes, due_date=due, recurrence=rule, created_at=now,
+            ))
+    created = CareTask.objects.bulk_create(tasks, batch_size=1000)
+    TaskRecurrence.objects.bulk_update(rules, ['next_due'])
+    _bulk_written([(task.pk, task.elder_id) for task in created])
+    workload.schedule_refresh({task.assigned_to_id for task in created})
+    return len(created)
+
+
+def generate_occurrences(horizon=HORIZON, rule_ids=None, batch_size=RULE_BATCH_SIZE):
+    """Create the occurrences of active series due within ``horizon``; returns how many were created"""
+    now = timezone.now()
+    until = now + horizon
+    due_rules = TaskRecurrence.objects.filter(is_active=True, next_due__lte=until)
+    if rule_ids is not None:
+        due_rules = due_rules.filter(pk__in=rule_ids)
+    created = 0
+    while True:
+        with sharding.atomic():
+            rules = list(due_rules.select_for_update(skip_locked=True).order_by('next_due')[:batch_size])
+            if not rules:
+                return created
+            created += _extend(rules, until, now)
+
+
+def start_series(task, interval=1, ends_at=None, weekdays=''):
+    """
+    Turn ``task`` (daily, weekly or monthly, with a due date) into the first
+    occurrence of a new series and create the upcoming occurrences
+    """
+    rule = TaskRecurrence(
+        elder_id=task.elder_id, title=task.title, description=task.description, priority=task.priority,
+        assigned_to_id=task.assigned_to_id, notes=task.notes, frequency=task.task_type,
+        interval=interval, weekdays=weekdays, starts_at=task.due_date, ends_at=ends_at,
+    )
+    rule.next_due = next((due for due in occurrences(rule, task.due_date) if due > task.due_date), None)
+    rule.save()
+    task.recurrence = rule
+    task.frequency = task.frequency or describe(rule)
+    task.save(update_fields=['recurrence', 'frequency', 'updated_at'])
+    generate_occurrences(rule_ids=[rule.pk])
+    return rule
+
+
+def sweep_overdue(batch_size=SWEEP_BATCH_SIZE):
+    """Mark open tasks past their due date as OVERDUE; returns how many were marked"""
+    now = timezone.now()
+    overdue = CareTask.objects.filter(status__in=OPEN_STATUSES, due_date__lt=now)
+    swept = 0
+    while True:
+        with sharding.atomic():
+            # Locked, so none is completed between the read and the update; one being edited waits for the next run
+            tasks = list(
+                overdue.select_for_update(skip_locked=True).order_by('due_date').values_list('pk', 'elder_id')[:batch_size]
+            )
+            if not tasks:
+                return swept
+            swept += CareTask.objects.filter(pk__in=[pk for pk, _ in tasks], status__in=OPEN_STATUSES).update(
+                status='OVERDUE', updated_at=now
+            )
+            _bulk_written(tasks)
@@ -0,0 +1,249 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+    DATABASES = {
+        'default': {...},                       # the primary
+        'replica': {..., 'TEST': {'MIRROR': 'default'}},
+    }
+    DATABASE_ROUTERS = ['care_app.replicas.ReplicaRouter']
+    CARE_READ_REPLICAS = ['replica']
+    CARE_REPLICA_MAX_LAG = 10                   # seconds; optional
+    MIDDLEWARE = [
+        ...
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'care_app.replicas.ReplicaMiddleware',
+        ...
+    ]
+
+Only views decorated with @replica_reads (list pages, search, admin
+changelists and exports) read from a replica, and only on GET and HEAD.
+Everything else, every write and the sync API, whose tokens must never be
+newer than the lists a device fetched, stays on the primary.
+
+A decorated view reads from the primary instead when:
+- the user wrote anything in the last CARE_REPLICA_PIN_SECONDS (by default
+  CARE_REPLICA_MAX_LAG), so they always see their own changes; the
+  middleware notices writes through the router and pins the user in the
+  cache;
+- the view itself writes; reads after the first write go to the primary;
+- no replica is usable: each process checks a replica at most every
+  HEALTH_CHECK_INTERVAL and skips it while it is unreachable or more than
+  CARE_REPLICA_MAX_LAG seconds behind (PostgreSQL's replay timestamp,
+  MySQL's Seconds_Behind_Source). A view that fails with a database error
+  on a replica is run again on the primary, and the replica is skipped
+  until its next check.
+
+Writes to the session table do not pin: the messages framework and logins
+touch it on plain page views.
+
+To try it locally, copy the SQLite file and open the copy read-only
+('NAME': 'file:replica.sqlite3?mode=ro', 'OPTIONS': {'uri': True}), or
+point 'replica' at a second local PostgreSQL database restored from a dump
+of the first. Neither reports any lag, so the copy is used until it is
+deleted or broken; new writes show up there only when it is copied again.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = 5
+# Apps whose writes are bookkeeping rather than user data
+UNPINNED_APPS = {'sessions'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class _RequestState:
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('care_replica_state', default=None)
+# Replica alias -> (monotonic time of the next check, usable)
+_health = {}
+_health_lock = threading.Lock()
+
+
+def replica_aliases():
+    return list(getattr(settings, 'CARE_READ_REPLICAS', ()))
+
+
+def max_lag():
+    return getattr(settings, 'CARE_REPLICA_MAX_LAG', 10)
+
+
+def pin_seconds():
+    return getattr(settings, 'CARE_REPLICA_PIN_SECONDS', max_lag())
+
+
+def _pin_key(user_id):
+    return f'care:replica-pin:{user_id}'
+
+
+def lag(alias):
+    """Seconds ``alias`` is behind its primary; 0 for a database that is not replicating"""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+                'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+            )
+            return float(cursor.fetchone()[0] or 0)
+        if connection.vendor == 'mysql':
+            cursor.execute('SHOW REPLICA STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                return 0
+            behind = dict(zip((column[0] for column in cursor.description), row)).get('Seconds_Behind_Source')
+            # NULL means replication is stopped
+            return float('inf') if behind is None else float(behind)
+        # Fails on a missing or empty copy, as queries against it would
+        cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+        return 0
+
+
+def _check(alias):
+    try:
+        behind = lag(alias)
+    except DatabaseError as exc:
+        logger.warning('Read replica %s is unavailable: %s', alias, exc)
+        return False
+    if behind > max_lag():
+        logger.warning('Read replica %s is %.1f seconds behind', alias, behind)
+        return False
+    return True
+
+
+def is_usable(alias):
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked is None or checked[0] <= now:
+        with _health_lock:
+            checked = _health.get(alias)
+            if checked is None or checked[0] <= now:
+                checked = _health[alias] = (now + HEALTH_CHECK_INTERVAL, _check(alias))
+    return checked[1]
+
+
+def mark_unusable(alias):
+    _health[alias] = (time.monotonic() + HEALTH_CHECK_INTERVAL, False)
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+
+def choose_replica(request):
+    """A usable replica for this GET or HEAD request's reads, or None for the primary"""
+    if request.method not in SAFE_METHODS:
+        return None
+    return replica_for(request.user)
+
+
+def replica_for(user):
+    """A usable replica for ``user``'s reads, or None for the primary; for reads a POST makes, like exports"""
+    if is_pinned(user):
+        return None
+    state = _state.get()
+    if state is not None and state.wrote:
+        return None
+    usable = [alias for alias in replica_aliases() if is_usable(alias)]
+    return random.choice(usable) if usable else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None:
+            return None
+        # Read-your-writes inside the request too
+        return DEFAULT_DB_ALIAS if state.wrote else state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label not in UNPINNED_APPS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaMiddleware:
+    """Tracks the request's writes and pins a user who wrote to the primary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        user = getattr(request, 'user', None)
+        if state.wrote and user is not None and user.is_authenticated and replica_aliases():
+            cache.set(_pin_key(user.pk), True, pin_seconds())
+        return response
+
+
+def _stream_from(state, replica, chunks):
+    """Streamed content rendered with the view's reads still going to ``replica``"""
+    iterator = iter(chunks)
+    while True:
+        token = _state.set(state)
+        state.replica = replica
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            state.replica = None
+            _state.reset(token)
+        yield chunk
+
+
+def replica_reads(view_func):
+    """Run a read-only view's queries, including its template's, against a replica when one is usable"""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        replica = choose_replica(request)
+        if replica is None:
+            return view_func(request, *args, **kwargs)
+        state = _state.get()
+        if state is None:
+            # Without the middleware there is no write tracking beyond this view
+            state = _RequestState()
+        token = _state.set(state)
+        state.replica = replica
+        try:
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                # Lazy template responses would otherwise query the primary while rendering
+                response.render()
+        except DatabaseError as exc:
+            if state.wrote:
+                raise
+            mark_unusable(replica)
+            logger.warning('Read replica %s failed (%s); reading %s from the primary', replica, exc, request.path)
+            state.replica = None
+            return view_func(request, *args, **kwargs)
+        finally:
+            state.replica = None
+            _state.reset(token)
+        if response.streaming:
+            response.streaming_content = _stream_from(state, replica, response.streaming_content)
+        return response
+    return _wrapped_view
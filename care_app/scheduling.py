@@ -0,0 +1,122 @@
+"""
+Appointment calendar ranges, conflict detection and free-slot search.
+
+An appointment occupies [appointment_date, appointment_date + duration).
+Durations are capped at Appointment.MAX_DURATION_MINUTES, so everything
+overlapping a window [start, end) begins in (start - MAX_DURATION, end).
+That is one range scan on the (elder, appointment_date) or (doctor_name,
+appointment_date) index, reading only the appointments near the window
+however many there are in total; the exact overlap test runs on those rows.
+
+The conflict check in AppointmentForm is advisory: two bookings saved at the
+same moment can still overlap.
+"""
+from datetime import datetime, time, timedelta
+from itertools import chain
+
+from django.utils import timezone
+
+from .models import Appointment
+
+MAX_DURATION = timedelta(minutes=Appointment.MAX_DURATION_MINUTES)
+# Cancelled, completed and rescheduled appointments free their slot
+BLOCKING_STATUSES = ['SCHEDULED', 'CONFIRMED']
+CALENDAR_VIEWS = ['day', 'week', 'month']
+DAY_START = time(8, 0)
+DAY_END = time(18, 0)
+SLOT_MINUTES = 15
+SEARCH_DAYS = 60
+
+
+def ends_at(appointment):
+    return appointment.appointment_date + timedelta(minutes=appointment.duration)
+
+
+def overlapping(appointments, start, end):
+    """Appointments of the ``appointments`` queryset overlapping [start, end), in start order"""
+    candidates = appointments.filter(
+        appointment_date__gt=start - MAX_DURATION, appointment_date__lt=end
+    ).order_by('appointment_date')
+    return [appointment for appointment in candidates if ends_at(appointment) > start]
+
+
+def _blocking(elder_id, doctor_name, exclude_pk=None):
+    """Querysets of the blocking appointments of the elder and of the doctor"""
+    blocking = Appointment.objects.filter(status__in=BLOCKING_STATUSES)
+    if exclude_pk is not None:
+        blocking = blocking.exclude(pk=exclude_pk)
+    querysets = [blocking.filter(elder_id=elder_id)]
+    if doctor_name:
+        querysets.append(blocking.filter(doctor_name=doctor_name))
+    return querysets
+
+
+def conflicts(appointment):
+    """Blocking appointments of the same elder or the same doctor that overlap ``appointment``"""
+    start, end = appointment.appointment_date, ends_at(appointment)
+    found = {}
+    for queryset in _blocking(appointment.elder_id, appointment.doctor_name, appointment.pk):
+        for other in overlapping(queryset, start, end):
+            found[other.pk] = other
+    return sorted(found.values(), key=lambda other: other.appointment_date)
+
+
+def _merged(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _round_up(moment):
+    """``moment`` rounded up to the next SLOT_MINUTES boundary of local time"""
+    local = timezone.localtime(moment)
+    rounded = local.replace(second=0, microsecond=0)
+    if rounded < local:
+        rounded += timedelta(minutes=1)
+    return rounded + timedelta(minutes=-rounded.minute % SLOT_MINUTES)
+
+
+def next_free_slot(elder_id, doctor_name, duration, after, exclude_pk=None, search_days=SEARCH_DAYS):
+    """
+    Earliest start at or after ``after``, within working hours, where
+    ``duration`` minutes are free for both the elder and the doctor, or None
+    if there is none in the next ``search_days`` days
+    """
+    length = timedelta(minutes=duration)
+    until = after + timedelta(days=search_days)
+    busy = _merged(
+        (appointment.appointment_date, ends_at(appointment))
+        for appointment in chain.from_iterable(
+            overlapping(queryset, after, until) for queryset in _blocking(elder_id, doctor_name, exclude_pk)
+        )
+    )
+    position = 0
+    day = timezone.localtime(after).date()
+    while day <= timezone.localtime(until).date():
+        opens = timezone.make_aware(datetime.combine(day, DAY_START))
+        closes = timezone.make_aware(datetime.combine(day, DAY_END))
+        start = _round_up(max(after, opens))
+        while start + length <= closes:
+            while position < len(busy) and busy[position][1] <= start:
+                position += 1
+            if position == len(busy) or busy[position][0] >= start + length:
+                return start
+            start = _round_up(busy[position][1])
+        day += timedelta(days=1)
+    return None
+
+
+def calendar_range(view, day):
+    """(first day, day after the last, previous page's day, next page's day) of a calendar page"""
+    if view == 'day':
+        return day, day + timedelta(days=1), day - timedelta(days=1), day + timedelta(days=1)
+    if view == 'week':
+        first = day - timedelta(days=day.weekday())
+        return first, first + timedelta(days=7), day - timedelta(days=7), day + timedelta(days=7)
+    first = day.replace(day=1)
+    after = (first + timedelta(days=31)).replace(day=1)
+    return first, after, (first - timedelta(days=1)).replace(day=1), after
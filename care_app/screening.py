@@ -0,0 +1,226 @@
+"""
+Allergy and duplicate therapy screening of medication schedules.
+
+The ScreeningTerm table maps the words and phrases found in allergy notes
+and medication names (amoxil, sulfa, blood thinner) to the ingredients and
+drug classes they stand for (amoxicillin, penicillins, sulfonamides,
+anticoagulants). Each process compiles the table into one Aho-Corasick
+automaton on first use and again when the 'screeningterm' version changes
+(see signals.py), so reading a medication name or an elder's allergy notes
+is a single pass over its characters however many terms there are.
+
+Text is lower-cased and stripped of accents and punctuation the way the
+medication catalog does it, and every term is matched as whole words, with
+an optional plural "s": "sulfa" finds "Sulfa drugs" but not "sulfasalazine",
+which has a row of its own.
+
+A schedule is flagged when a concept of its medication's name
+- is also a concept of the elder's allergies, or
+- is shared with the medication of another active schedule of the elder
+  (two brands of one drug, or two drugs of one class).
+
+MedicationScheduleForm shows the findings and asks for confirmation, and the
+schedule keeps their messages in screening_warnings. rescan() screens the
+active schedules again, in batches of elders, after the table or an elder's
+allergies change, and notifies only about findings that are new for the
+elder.
+"""
+import threading
+from collections import defaultdict, deque, namedtuple
+
+from . import cache_versions, outbox, sharding
+from .catalog import words
+from .models import ElderProfile, MedicationSchedule, ScreeningTerm
+
+ALLERGY = 'ALLERGY'
+DUPLICATE = 'DUPLICATE'
+RESCAN_BATCH_SIZE = 500
+# Medication names seen by this process's matcher, and the concepts they matched
+NAME_CACHE_SIZE = 50000
+
+Finding = namedtuple('Finding', ['kind', 'concept', 'message'])
+
+_NONE = frozenset()
+
+
+def normalize(text):
+    return ' '.join(words(text))
+
+
+class Matcher:
+    """Aho-Corasick automaton reporting the concepts of the terms found in a text"""
+
+    def __init__(self, terms, version=None):
+        """``terms`` is an iterable of (term, concept) pairs"""
+        self.version = version
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [_NONE]
+        for term, concept in terms:
+            term, concept = normalize(term), normalize(concept)
+            if term and concept:
+                # Surrounding spaces make every match a run of whole words
+                self._add(f' {term} ', concept)
+                self._add(f' {term}s ', concept)
+        self._link()
+        self._names = {}
+
+    def _add(self, pattern, concept):
+        state = 0
+        for char in pattern:
+            following = self.goto[state].get(char)
+            if following is None:
+                following = len(self.goto)
+                self.goto[state][char] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(_NONE)
+            state = following
+        self.output[state] = self.output[state] | {concept}
+
+    def _link(self):
+        """Fail links, breadth first; a state also reports what its fail state reports"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(char, 0)
+                self.output[following] = self.output[following] | self.output[self.fail[following]]
+                queue.append(following)
+
+    @classmethod
+    def load(cls, version=None):
+        return cls(ScreeningTerm.objects.values_list('term', 'concept').iterator(chunk_size=5000), version)
+
+    def concepts(self, text):
+        """Concepts of the terms in ``text``"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for char in f' {normalize(text)} ':
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def name_concepts(self, name):
+        """concepts() of a medication name, remembered: the same few names come up again and again"""
+        found = self._names.get(name)
+        if found is None:
+            if len(self._names) >= NAME_CACHE_SIZE:
+                self._names.clear()
+            found = self._names[name] = frozenset(self.concepts(name))
+        return found
+
+
+_matcher = None
+_lock = threading.Lock()
+
+
+def get_matcher():
+    """This process's matcher, recompiled if the synonym table changed since it was built"""
+    global _matcher
+    version = cache_versions.get_version('screeningterm')
+    if _matcher is None or _matcher.version != version:
+        with _lock:
+            if _matcher is None or _matcher.version != version:
+                _matcher = Matcher.load(version)
+    return _matcher
+
+
+def _findings(matcher, allergies, medication_id, name, others):
+    """
+    Findings for a schedule of medication ``medication_id`` called ``name``;
+    ``others`` holds (medication id, name) of the elder's other active schedules
+    """
+    concepts = matcher.name_concepts(name)
+    findings = []
+    if concepts and allergies:
+        for concept in sorted(concepts & matcher.concepts(allergies)):
+            findings.append(Finding(ALLERGY, concept, f'{name} matches the recorded allergy to {concept}.'))
+    reported = set()
+    for other_id, other_name in others:
+        if other_id == medication_id:
+            finding = Finding(DUPLICATE, name, f'{name} is scheduled more than once.')
+        else:
+            shared = concepts & matcher.name_concepts(other_name)
+            if not shared:
+                continue
+            shared = ', '.join(sorted(shared))
+            # Worded the same from either schedule, so the pair is notified once
+            first, second = sorted([name, other_name])
+            finding = Finding(
+                DUPLICATE, shared, f'Possible duplicate therapy: {first} and {second} are both {shared}.'
+            )
+        if finding.message not in reported:
+            reported.add(finding.message)
+            findings.append(finding)
+    return findings
+
+
+def screen(elder, medication, exclude_pk=None):
+    """Findings for an active schedule of ``medication`` for ``elder``; ``exclude_pk`` is the schedule itself"""
+    others = MedicationSchedule.objects.filter(elder=elder, is_active=True)
+    if exclude_pk is not None:
+        others = others.exclude(pk=exclude_pk)
+    return _findings(
+        get_matcher(), elder.allergies, medication.pk, medication.name,
+        others.values_list('medication_id', 'medication__name'),
+    )
+
+
+def notify(notices):
+    """Queue a notification per (elder id, message); call inside the transaction saving the schedules"""
+    return outbox.enqueue_notifications(notices, notification_type='MEDICATION', priority='HIGH')
+
+
+def rescan(elder_ids=None, batch_size=RESCAN_BATCH_SIZE):
+    """
+    Screen the active schedules of ``elder_ids`` (every elder by default) again,
+    store their warnings and notify about new ones; returns (schedules screened,
+    notifications queued)
+    """
+    matcher = get_matcher()
+    elders = ElderProfile.objects.order_by('pk')
+    if elder_ids is not None:
+        elders = elders.filter(pk__in=list(elder_ids))
+    screened = notified = 0
+    last_pk = 0
+    while True:
+        batch = list(elders.filter(pk__gt=last_pk).values_list('pk', 'allergies')[:batch_size])
+        if not batch:
+            return screened, notified
+        last_pk = batch[-1][0]
+        allergies = dict(batch)
+        schedules = defaultdict(list)
+        for row in MedicationSchedule.objects.filter(elder_id__in=allergies, is_active=True).values_list(
+            'pk', 'elder_id', 'medication_id', 'medication__name', 'screening_warnings', named=True
+        ):
+            schedules[row.elder_id].append(row)
+
+        changed, new = [], []
+        for elder_id, rows in schedules.items():
+            known = {message for row in rows for message in row.screening_warnings}
+            for row in rows:
+                others = [(other.medication_id, other.medication__name) for other in rows if other is not row]
+                warnings = [finding.message for finding in _findings(
+                    matcher, allergies[elder_id], row.medication_id, row.medication__name, others
+                )]
+                if warnings != row.screening_warnings:
+                    changed.append(MedicationSchedule(pk=row.pk, screening_warnings=warnings))
+                for message in warnings:
+                    if message not in known:
+                        known.add(message)
+                        new.append((elder_id, message))
+            screened += len(rows)
+
+        with sharding.atomic():
+            # Warnings are not part of the synced or cached schedule data, so nothing else needs to know
+            MedicationSchedule.objects.bulk_update(changed, ['screening_warnings'], batch_size=batch_size)
+            notify(new)
+        notified += len(new)
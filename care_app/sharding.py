@@ -0,0 +1,704 @@
+"""
+Horizontal sharding of elder data by facility.
+
+    DATABASES = {
+        'default': {...},                       # global tables, and the first facility's elders
+        'north': {...},
+        'south': {...},
+    }
+    DATABASE_ROUTERS = ['care_app.sharding.ShardRouter']
+    CARE_SHARDS = ['default', 'north', 'south']
+    MIDDLEWARE = [
+        ...
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'care_app.sharding.ShardMiddleware',
+        ...
+    ]
+
+Every alias has the whole schema (run migrate on 'default' first, then with
+--database for each shard, then manage.py init_shard on each new shard).
+Data migrations only run on 'default'; one that must fix elder rows on
+every shard works on schema_editor.connection.alias and passes
+hints={'all_shards': True}.
+An elder and every row hanging off it (SHARDED_MODELS) live together on one
+shard, so an elder's pages, summaries and joins stay single-database. The
+rest stays on 'default': jobs, the outbox, the change log, workloads,
+imports, screening terms and user profiles. Users and medications, which
+elder rows point at, are written to 'default' and copied to every shard by
+signals (see signals.py), so foreign keys hold on each shard.
+
+A new elder goes to the shard of the facility of whoever creates it
+(UserProfile.shard, or the first shard), and the ElderShard table on
+'default' records where each elder is; ElderShardUser records who the
+elder's guardian and caregivers are. The router sends a query for an
+elder's rows to that shard when it can tell the elder from the instance
+(related managers, saves, foreign keys), and otherwise to the shard active
+in the current context:
+- ShardMiddleware activates, per request, the shard of the elder or record
+  named in the URL (elder_id=..., task_id=..., an API object, an admin
+  object id, or ?elder_id=), else the user's facility shard; admin
+  changelists take ?shard= (ShardFilter) to browse another facility;
+- background work loops over shard_aliases() inside use_shard().
+
+An elder can live on another shard than their guardian's facility (after
+move_elder, or when a caregiver looks after elders of two facilities), so
+the lists, search, dashboard and sync API of guardians read user_shards():
+the current shard plus every shard the directory places one of their
+elders on (see conditional.across_scope()). Those queries, and any that must
+see every facility, go through ShardedQuerySet.across_shards(), which runs
+the query on each shard and merges the results.
+
+Primary keys of sharded tables come from a range per shard (shard number
+times SHARD_ID_SPAN, set by init_shard), so ids stay unique when elders are
+moved between shards with manage.py move_elder. The move keeps the ids, so
+the change log and devices never see the rows change.
+
+This is an alternative to read replicas (replicas.py) rather than an
+addition: a shard that needs read scaling has to do it in the database.
+transaction.atomic() without using= covers 'default' only.
+
+To try it locally, point a second alias at another SQLite file.
+"""
+import contextvars
+import heapq
+import itertools
+import operator
+from contextlib import contextmanager
+from functools import cmp_to_key, partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models.expressions import OrderBy
+from django.db.models.query import FlatValuesListIterable, ModelIterable, ValuesIterable
+from django.utils import timezone
+
+# Elder rows; they live on the shard of their elder
+SHARDED_MODELS = {
+    'care_app.ElderProfile', 'care_app.ElderProfile_caregivers', 'care_app.MedicationSchedule',
+    'care_app.MedicationLog', 'care_app.Appointment', 'care_app.CareTask', 'care_app.TaskRecurrence',
+    'care_app.EmergencyContact', 'care_app.VitalsLog', 'care_app.IncidentReport', 'care_app.Notification',
+    'care_app.ElderCareSummary', 'care_app.CalendarFeed', 'care_app.ArchivedMonth',
+}
+# Written to 'default' and copied to every shard
+REFERENCE_MODELS = {'auth.User', 'care_app.Medication'}
+# Ids of shard n start above n * SHARD_ID_SPAN
+SHARD_ID_SPAN = 10 ** 12
+# URL keyword argument -> model whose row picks the request's shard
+SCOPE_KWARGS = {
+    'elder_id': 'care_app.ElderProfile',
+    'schedule_id': 'care_app.MedicationSchedule',
+    'appointment_id': 'care_app.Appointment',
+    'task_id': 'care_app.CareTask',
+    'contact_id': 'care_app.EmergencyContact',
+    'vital_id': 'care_app.VitalsLog',
+    'incident_id': 'care_app.IncidentReport',
+    'notification_id': 'care_app.Notification',
+}
+# URL keyword arguments naming an API resource and one of its rows (/api/v1/<resource_name>/<pk>/)
+API_SCOPE_KWARGS = ('resource_name', 'pk')
+DIRECTORY_CACHE_TIMEOUT = 3600
+# Query parameter of the admin changelists' shard filter
+SHARD_PARAMETER = 'shard'
+
+_current = contextvars.ContextVar('care_shard', default=None)
+
+
+def shard_aliases():
+    return list(getattr(settings, 'CARE_SHARDS', None) or [DEFAULT_DB_ALIAS])
+
+
+def is_sharded(model):
+    """Whether rows of ``model`` (a model class or instance) live on the shard of their elder"""
+    # Labels rather than classes, so the historical models of migrations route too
+    return model._meta.label in SHARDED_MODELS
+
+
+def current_shard():
+    """The shard of this context's queries that name no elder"""
+    return _current.get() or shard_aliases()[0]
+
+
+@contextmanager
+def use_shard(alias):
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+
+def for_elder(elder_id):
+    """Context manager running the block against ``elder_id``'s shard"""
+    return use_shard(shard_of_elder(elder_id))
+
+
+@contextmanager
+def atomic():
+    """
+    transaction.atomic() on 'default' and on the current shard, for blocks
+    writing elder rows along with the outbox, the change log or on_commit
+    hooks; the shard commits right before 'default'
+    """
+    alias = current_shard()
+    with transaction.atomic():
+        if alias == DEFAULT_DB_ALIAS:
+            yield
+        else:
+            with transaction.atomic(using=alias):
+                yield
+
+
+def activate(alias):
+    """Switch the rest of the request to ``alias``; ShardMiddleware undoes it when the request ends"""
+    _current.set(alias)
+
+
+def home_shard(user):
+    """The shard of ``user``'s facility"""
+    aliases = shard_aliases()
+    profile = getattr(user, 'profile', None) if user is not None and user.is_authenticated else None
+    alias = getattr(profile, 'shard', '')
+    return alias if alias in aliases else aliases[0]
+
+
+def id_range(alias):
+    """(first, last) id of the sharded rows created on ``alias``"""
+    start = shard_aliases().index(alias) * SHARD_ID_SPAN
+    return start + 1, start + SHARD_ID_SPAN
+
+
+def _directory_key(elder_id):
+    return f'care:elder-shard:{elder_id}'
+
+
+def _directory_lookup(elder_id):
+    alias = cache.get(_directory_key(elder_id))
+    if alias is None:
+        ElderShard = apps.get_model('care_app', 'ElderShard')
+        alias = ElderShard.objects.filter(elder_id=elder_id).values_list('shard', flat=True).first()
+        if alias is not None:
+            cache.set(_directory_key(elder_id), alias, DIRECTORY_CACHE_TIMEOUT)
+    return alias
+
+
+def shard_of_elder(elder_id):
+    """The shard holding ``elder_id``, from the ElderShard directory"""
+    if elder_id is None:
+        return current_shard()
+    # An elder not placed yet is being created in the current context
+    return locate(apps.get_model('care_app', 'ElderProfile'), elder_id) or current_shard()
+
+
+def place_elders(elder_ids, alias):
+    """Record that the elders ``elder_ids`` live on ``alias``"""
+    ElderShard = apps.get_model('care_app', 'ElderShard')
+    ElderShard.objects.bulk_create(
+        [ElderShard(elder_id=elder_id, shard=alias, updated_at=timezone.now()) for elder_id in elder_ids],
+        update_conflicts=True, unique_fields=['elder_id'], update_fields=['shard', 'updated_at'],
+    )
+    cache.delete_many([_directory_key(elder_id) for elder_id in elder_ids])
+
+
+def forget_elder(elder_id):
+    ElderShard = apps.get_model('care_app', 'ElderShard')
+    ElderShardUser = apps.get_model('care_app', 'ElderShardUser')
+    ElderShard.objects.filter(elder_id=elder_id).delete()
+    ElderShardUser.objects.filter(elder_id=elder_id).delete()
+    cache.delete(_directory_key(elder_id))
+
+
+def record_members(elder_ids, alias):
+    """Record the guardian and caregivers of the elders ``elder_ids`` on ``alias`` in the directory"""
+    ElderProfile = apps.get_model('care_app', 'ElderProfile')
+    ElderShardUser = apps.get_model('care_app', 'ElderShardUser')
+    members = set(ElderProfile._base_manager.using(alias).filter(pk__in=elder_ids).values_list('pk', 'guardian_id'))
+    members.update(
+        ElderProfile.caregivers.through._base_manager.using(alias)
+        .filter(elderprofile_id__in=elder_ids).values_list('elderprofile_id', 'user_id')
+    )
+    with transaction.atomic():
+        ElderShardUser.objects.filter(elder_id__in=elder_ids).delete()
+        ElderShardUser.objects.bulk_create(
+            [ElderShardUser(elder_id=elder_id, user_id=user_id) for elder_id, user_id in members]
+        )
+
+
+def user_shards(user):
+    """The current shard plus every shard holding an elder ``user`` is the guardian or a caregiver of"""
+    aliases = shard_aliases()
+    if len(aliases) == 1:
+        return aliases
+    ElderShard = apps.get_model('care_app', 'ElderShard')
+    ElderShardUser = apps.get_model('care_app', 'ElderShardUser')
+    found = set(ElderShard.objects.filter(
+        elder_id__in=ElderShardUser.objects.filter(user_id=user.pk).values('elder_id')
+    ).values_list('shard', flat=True).distinct())
+    found.add(current_shard())
+    return [alias for alias in aliases if alias in found]
+
+
+def locate(model, pk):
+    """The shard holding the ``model`` row ``pk``, or None; tries the shard whose id range holds it first"""
+    aliases = shard_aliases()
+    if len(aliases) == 1:
+        return aliases[0]
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if model._meta.label == 'care_app.ElderProfile':
+        alias = _directory_lookup(pk)
+        if alias is not None:
+            return alias
+    guess = pk // SHARD_ID_SPAN
+    if 0 <= guess < len(aliases):
+        aliases.insert(0, aliases.pop(guess))
+    for alias in aliases:
+        if model._base_manager.using(alias).filter(pk=pk).exists():
+            return alias
+    return None
+
+
+class ShardRouter:
+    def _shard_for(self, model, hints):
+        instance = hints.get('instance')
+        if instance is None or not is_sharded(instance):
+            return current_shard()
+        if instance._state.db:
+            return instance._state.db
+        label = instance._meta.label
+        if label == 'care_app.ElderProfile':
+            return shard_of_elder(instance.pk)
+        if label == 'care_app.MedicationLog':
+            schedule = instance._state.fields_cache.get('schedule')
+            if schedule is not None and schedule._state.db:
+                return schedule._state.db
+            if instance.schedule_id is not None:
+                return locate(apps.get_model('care_app', 'MedicationSchedule'), instance.schedule_id) or current_shard()
+            return current_shard()
+        return shard_of_elder(getattr(instance, 'elder_id', None))
+
+    def db_for_read(self, model, **hints):
+        return self._shard_for(model, hints) if is_sharded(model) else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Reference rows read through a shard's foreign keys are still saved to 'default' and copied out
+        return self._shard_for(model, hints) if is_sharded(model) else DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded(obj1) and is_sharded(obj2):
+            return obj1._state.db == obj2._state.db
+        # Reference rows exist on every shard
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every alias has every table, but data migrations (RunPython, RunSQL) fill and fix
+        # the rows on 'default': a shard starts empty and gets its rows from move_elder
+        if model_name is None and db != DEFAULT_DB_ALIAS and not hints.get('all_shards'):
+            return False
+        return None
+
+
+def shard_for_request(request, view_func, view_kwargs):
+    """The shard of the record the request is about, else of the user's facility"""
+    aliases = shard_aliases()
+    if len(aliases) == 1:
+        return aliases[0]
+    for kwarg, label in SCOPE_KWARGS.items():
+        if kwarg in view_kwargs:
+            alias = locate(apps.get_model(label), view_kwargs[kwarg])
+            if alias is not None:
+                return alias
+    if all(kwarg in view_kwargs for kwarg in API_SCOPE_KWARGS):
+        from .api import RESOURCES
+        resource = RESOURCES.get(view_kwargs['resource_name'])
+        if resource is not None and is_sharded(resource.model):
+            alias = locate(resource.model, view_kwargs['pk'])
+            if alias is not None:
+                return alias
+    model_admin = getattr(view_func, 'model_admin', None)
+    if model_admin is not None and is_sharded(model_admin.model) and request.user.is_staff:
+        if 'object_id' in view_kwargs:
+            alias = locate(model_admin.model, view_kwargs['object_id'])
+            if alias is not None:
+                return alias
+        if request.GET.get(SHARD_PARAMETER) in aliases:
+            return request.GET[SHARD_PARAMETER]
+    elder_id = request.GET.get('elder_id')
+    if elder_id and elder_id.isdigit():
+        alias = locate(apps.get_model('care_app', 'ElderProfile'), elder_id)
+        if alias is not None:
+            return alias
+    return home_shard(request.user)
+
+
+def _stream_from(alias, chunks):
+    """Streamed content rendered against the request's shard"""
+    iterator = iter(chunks)
+    while True:
+        with use_shard(alias):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+class ShardMiddleware:
+    """Runs each request against the shard it is about; goes after AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current.set(None)
+        try:
+            response = self.get_response(request)
+            alias = _current.get()
+        finally:
+            _current.reset(token)
+        if response.streaming and alias is not None:
+            response.streaming_content = _stream_from(alias, response.streaming_content)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        activate(shard_for_request(request, view_func, view_kwargs))
+
+
+def _compare(terms, row, other):
+    for value_of, descending, nulls_last in terms:
+        value, other_value = value_of(row), value_of(other)
+        if value == other_value:
+            continue
+        # NULLs are never compared with values
+        if value is None:
+            return 1 if nulls_last else -1
+        if other_value is None:
+            return -1 if nulls_last else 1
+        earlier = value < other_value
+        return (1 if earlier else -1) if descending else (-1 if earlier else 1)
+    return 0
+
+
+class CrossShardQuerySet:
+    """
+    A query run on every shard, with the results merged in its order_by
+    order; for reports, admin lookups, finding a row by a unique key and the
+    lists of users whose elders are on several shards. Filters and other
+    queryset methods apply to every shard; slices take that many rows from
+    each. Ordering by related fields or by expressions other than F()
+    leaves the rows grouped by shard; NULLs sort first unless the ordering
+    says otherwise.
+    """
+    _CHAINED = {
+        'filter', 'exclude', 'order_by', 'select_related', 'prefetch_related', 'only', 'defer',
+        'annotate', 'alias', 'values', 'values_list', 'distinct',
+    }
+
+    def __init__(self, querysets):
+        self.querysets = list(querysets)
+
+    @property
+    def model(self):
+        return self.querysets[0].model
+
+    def __getattr__(self, name):
+        if name not in self._CHAINED:
+            raise AttributeError(name)
+
+        def chained(*args, **kwargs):
+            return CrossShardQuerySet(getattr(queryset, name)(*args, **kwargs) for queryset in self.querysets)
+        return chained
+
+    def using(self, alias):
+        """The query on one shard only"""
+        return self.querysets[0].using(alias)
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def exists(self):
+        return any(queryset.exists() for queryset in self.querysets)
+
+    def aggregate(self, **aggregates):
+        """Count, Sum, Min and Max over every shard"""
+        combine = {models.Count: sum, models.Sum: sum, models.Min: min, models.Max: max}
+        results = [queryset.aggregate(**aggregates) for queryset in self.querysets]
+        merged = {}
+        for name, aggregate in aggregates.items():
+            if type(aggregate) not in combine:
+                raise TypeError(f'{type(aggregate).__name__} cannot be combined across shards.')
+            values = [result[name] for result in results if result[name] is not None]
+            merged[name] = combine[type(aggregate)](values) if values else None
+        return merged
+
+    def get(self, *args, **kwargs):
+        found = [obj for queryset in self.querysets for obj in queryset.filter(*args, **kwargs)[:2]]
+        if not found:
+            raise self.model.DoesNotExist(f'{self.model._meta.object_name} matching query does not exist.')
+        if len(found) > 1:
+            raise self.model.MultipleObjectsReturned(f'get() returned more than one {self.model._meta.object_name}.')
+        return found[0]
+
+    def first(self):
+        rows = self[:1]
+        return rows[0] if rows else None
+
+    def _sort_key(self):
+        """Key putting rows in the query's order, or None when they cannot be merged"""
+        queryset = self.querysets[0]
+        ordering = queryset.query.order_by or (
+            queryset.model._meta.ordering if queryset.query.default_ordering else ()
+        )
+        fields = list(getattr(queryset, '_fields', None) or ())
+        terms = []
+        for spec in ordering:
+            if isinstance(spec, str) and spec != '?':
+                name, descending, nulls_last = spec.lstrip('-'), spec.startswith('-'), None
+            elif isinstance(spec, OrderBy) and isinstance(spec.expression, models.F):
+                name, descending = spec.expression.name, spec.descending
+                nulls_last = True if spec.nulls_last else False if spec.nulls_first else None
+            else:
+                return None
+            if '__' in name:
+                return None
+            try:
+                attname = 'pk' if name == 'pk' else queryset.model._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                attname = name  # an annotation
+            if issubclass(queryset._iterable_class, ModelIterable):
+                value_of = operator.attrgetter(attname)
+            elif issubclass(queryset._iterable_class, ValuesIterable):
+                value_of = operator.itemgetter(name if name in fields else attname)
+            elif name not in fields:
+                return None
+            elif issubclass(queryset._iterable_class, FlatValuesListIterable):
+                value_of = lambda row: row
+            else:
+                value_of = operator.itemgetter(fields.index(name))
+            # By default NULLs come first ascending, last descending
+            terms.append((value_of, descending, descending if nulls_last is None else nulls_last))
+        return cmp_to_key(partial(_compare, terms))
+
+    def _merge(self, results):
+        rows = [row for result in results for row in result]
+        key = self._sort_key()
+        if key is not None:
+            rows.sort(key=key)
+        return rows
+
+    def iterator(self, chunk_size=None):
+        """The rows of every shard read in chunks, merged as they arrive"""
+        streams = [queryset.iterator(chunk_size=chunk_size) for queryset in self.querysets]
+        key = self._sort_key()
+        if key is None:
+            return itertools.chain.from_iterable(streams)
+        return heapq.merge(*streams, key=key)
+
+    def __iter__(self):
+        return iter(self._merge(self.querysets))
+
+    def __len__(self):
+        return len(self._merge(self.querysets))
+
+    def __bool__(self):
+        return self.exists()
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            rows = self[key:key + 1]
+            if not rows:
+                raise IndexError('CrossShardQuerySet index out of range')
+            return rows[0]
+        if key.step is not None:
+            raise TypeError('CrossShardQuerySet slices take no step.')
+        if key.stop is None:
+            return self._merge(self.querysets)[key]
+        return self._merge(queryset[:key.stop] for queryset in self.querysets)[key]
+
+
+def across_shards(queryset, aliases=None):
+    """``queryset`` run on every shard (or on ``aliases``)"""
+    return CrossShardQuerySet(queryset.using(alias) for alias in aliases or shard_aliases())
+
+
+class ShardedQuerySet(models.QuerySet):
+    def across_shards(self, aliases=None):
+        return across_shards(self, aliases)
+
+
+def seed_sequences(alias, labels=None):
+    """Point the id sequences of the sharded tables (of ``labels``, else all) on ``alias`` at the next id of its range"""
+    first, last = id_range(alias)
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for label in sorted(labels or SHARDED_MODELS):
+            model = apps.get_model(label)
+            if not isinstance(model._meta.pk, models.AutoField):
+                continue
+            table = model._meta.db_table
+            quoted = connection.ops.quote_name(table)
+            column = connection.ops.quote_name(model._meta.pk.column)
+            cursor.execute(f'SELECT MAX({column}) FROM {quoted} WHERE {column} BETWEEN %s AND %s', [first, last])
+            highest = cursor.fetchone()[0] or first - 1
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT setval(pg_get_serial_sequence(%s, %s), %s, false)', [table, model._meta.pk.column, highest + 1]
+                )
+            elif connection.vendor == 'mysql':
+                # Never below the largest id in the table, so rows moved in from a later shard push it on
+                cursor.execute(f'ALTER TABLE {quoted} AUTO_INCREMENT = {highest + 1}')
+            elif connection.vendor == 'sqlite':
+                from .partitions import set_last_id
+                if set_last_id(model, highest, alias):
+                    continue
+                cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s', [table])
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, highest])
+
+
+def copy_reference_row(instance, aliases=None):
+    """Write ``instance`` (a user or medication saved on 'default') to the other shards as it is"""
+    model = type(instance)
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key and not field.generated]
+    values = {field.attname: getattr(instance, field.attname) for field in fields}
+    for alias in aliases or shard_aliases():
+        if alias == DEFAULT_DB_ALIAS:
+            continue
+        # Updates and raw inserts skip auto_now and the model's signals
+        if not model._base_manager.using(alias).filter(pk=instance.pk).update(**values):
+            _insert_rows(model, [instance], alias)
+
+
+def delete_reference_row(model, pk):
+    for alias in shard_aliases():
+        if alias != DEFAULT_DB_ALIAS:
+            model._base_manager.using(alias).filter(pk=pk).delete()
+
+
+# An elder's rows in the order they can be inserted, with the lookup selecting them
+ELDER_ROWS = [
+    ('care_app.ElderProfile', 'pk'),
+    ('care_app.ElderProfile_caregivers', 'elderprofile_id'),
+    ('care_app.TaskRecurrence', 'elder_id'),
+    ('care_app.MedicationSchedule', 'elder_id'),
+    ('care_app.MedicationLog', 'schedule__elder_id'),
+    ('care_app.Appointment', 'elder_id'),
+    ('care_app.CareTask', 'elder_id'),
+    ('care_app.EmergencyContact', 'elder_id'),
+    ('care_app.VitalsLog', 'elder_id'),
+    ('care_app.IncidentReport', 'elder_id'),
+    ('care_app.Notification', 'elder_id'),
+    ('care_app.ElderCareSummary', 'elder_id'),
+    ('care_app.CalendarFeed', 'elder_id'),
+    ('care_app.ArchivedMonth', 'elder_id'),
+]
+COPY_BATCH_SIZE = 1000
+
+
+def _insert_rows(model, objs, alias):
+    from .partitions import prepare_rows
+    # Raw inserts keep ids and timestamps and send no signals: the rows are not changing, only moving
+    fields = [field for field in model._meta.concrete_fields if not field.generated]
+    prepare_rows(model, objs, alias)
+    model._base_manager._insert(objs, fields=fields, using=alias, raw=True)
+
+
+def _elder_rows(elder_id, alias):
+    for label, lookup in ELDER_ROWS:
+        model = apps.get_model(label)
+        yield model, model._base_manager.using(alias).filter(**{lookup: elder_id}).order_by()
+
+
+def _snapshot(elder_id, alias):
+    """Row count and latest update of each kind of the elder's rows on ``alias``"""
+    snapshot = {}
+    for model, rows in _elder_rows(elder_id, alias):
+        aggregates = {'count': models.Count('pk'), 'highest': models.Max('pk')}
+        if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+            aggregates['latest'] = models.Max('updated_at')
+        snapshot[model._meta.label] = rows.aggregate(**aggregates)
+    return snapshot
+
+
+def _delete_rows(elder_id, alias):
+    with transaction.atomic(using=alias):
+        for model, rows in reversed(list(_elder_rows(elder_id, alias))):
+            # Without signals: the rows still exist, on the other shard
+            rows._raw_delete(alias)
+
+
+def move_elder(elder_id, target):
+    """
+    Move an elder and every row of theirs to the shard ``target``, keeping
+    their ids; returns {model label: rows moved}. Rows added or edited on
+    the old shard while the copy runs make it raise ValueError and leave the
+    elder where it was, so run it while the elder's facility is quiet. Except
+    on PostgreSQL, rows can only move to a shard whose id range is not below
+    theirs.
+    """
+    ElderProfile = apps.get_model('care_app', 'ElderProfile')
+    source = locate(ElderProfile, elder_id)
+    if source is None:
+        raise ElderProfile.DoesNotExist(f'Elder #{elder_id} is on no shard.')
+    if source == target:
+        return {}
+    before = _snapshot(elder_id, source)
+    highest = max((counts['highest'] or 0 for counts in before.values()), default=0)
+    if highest > id_range(target)[1] and connections[target].vendor != 'postgresql':
+        # SQLite and MySQL never hand out an id below the largest in the table
+        raise ValueError(f'Elder #{elder_id} has ids beyond the range of {target}, which would carry on from them.')
+    with transaction.atomic(using=target):
+        for model, rows in _elder_rows(elder_id, source):
+            batch = []
+            for obj in rows.order_by('pk').iterator(chunk_size=COPY_BATCH_SIZE):
+                batch.append(obj)
+                if len(batch) == COPY_BATCH_SIZE:
+                    _insert_rows(model, batch, target)
+                    batch = []
+            if batch:
+                _insert_rows(model, batch, target)
+        # Rows from a later shard's range must not move this shard's next ids
+        seed_sequences(target)
+    place_elders([elder_id], target)
+    if _snapshot(elder_id, source) != before:
+        place_elders([elder_id], source)
+        _delete_rows(elder_id, target)
+        raise ValueError(f'Elder #{elder_id} changed on {source} during the move; nothing was moved.')
+    _delete_rows(elder_id, source)
+    return {label: counts['count'] for label, counts in before.items()}
+
+
+def copy_reference_data(alias):
+    """Copy every user and medication on 'default' to ``alias``; returns the rows copied"""
+    copied = 0
+    if alias == DEFAULT_DB_ALIAS:
+        return copied
+    for label in sorted(REFERENCE_MODELS):
+        model = apps.get_model(label)
+        existing = set(model._base_manager.using(alias).values_list('pk', flat=True))
+        batch = []
+        for obj in model._base_manager.using(DEFAULT_DB_ALIAS).order_by('pk').iterator(chunk_size=COPY_BATCH_SIZE):
+            if obj.pk in existing:
+                copy_reference_row(obj, [alias])
+                continue
+            batch.append(obj)
+            if len(batch) == COPY_BATCH_SIZE:
+                _insert_rows(model, batch, alias)
+                batch = []
+            copied += 1
+        if batch:
+            _insert_rows(model, batch, alias)
+    return copied
+
+
+def register_elders(alias):
+    """Record every elder on ``alias``, with their guardian and caregivers, in the directory; returns how many there are"""
+    ElderProfile = apps.get_model('care_app', 'ElderProfile')
+    elder_ids = list(ElderProfile._base_manager.using(alias).values_list('pk', flat=True))
+    for start in range(0, len(elder_ids), COPY_BATCH_SIZE):
+        place_elders(elder_ids[start:start + COPY_BATCH_SIZE], alias)
+        record_members(elder_ids[start:start + COPY_BATCH_SIZE], alias)
+    return len(elder_ids)
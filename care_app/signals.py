@@ -0,0 +1,215 @@
+"""
+Signal handlers that keep denormalized per-elder data, fragment cache
+versions, the sync change log and the screening matcher in sync with the
+live tables, that give the monthly partitions of the logs their months
+(see partitions.py) and that remove the files of deleted archived months
+(see archive.py).
+
+Queryset .update() and bulk_create() bypass these handlers; code doing bulk
+writes should call cache_versions.bump() and changelog.record_changes()
+itself, and the check_care_summaries management command detects and repairs
+any summary drift.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_migrate, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import archive, cache_versions, jobs, partitions, sharding, tasks, workload
+from .changelog import SYNCED_MODELS, record_change, record_scope_change
+from .models import (
+    ElderProfile, MedicationSchedule, Medication, MedicationLog, Appointment,
+    CareTask, EmergencyContact, VitalsLog, IncidentReport, Notification, UserProfile,
+    ChangeLogEntry, ScreeningTerm, ArchivedMonth
+)
+from .summary import schedule_refresh
+
+SCREENING_RESCAN_DELAY = timedelta(minutes=1)
+
+# Child model -> summary section holding its rows
+SUMMARY_SECTIONS = {
+    MedicationSchedule: 'medications',
+    Appointment: 'appointments',
+    CareTask: 'care_tasks',
+    EmergencyContact: 'emergency_contacts',
+    VitalsLog: 'recent_vitals',
+    IncidentReport: 'recent_incidents',
+}
+
+# Models whose writes bump the fragment cache versions read by templates
+FRAGMENT_CACHED_MODELS = [
+    ElderProfile, Medication, MedicationSchedule, MedicationLog, Appointment,
+    CareTask, EmergencyContact, VitalsLog, IncidentReport, Notification, UserProfile,
+]
+
+
+@receiver(post_save, sender=ElderProfile)
+def elder_saved(sender, instance, created, **kwargs):
+    # A new elder gets a full document; an edit only touches the profile section
+    schedule_refresh([instance.pk], None if created else ['elder'])
+    previous = getattr(instance, '_loaded_guardian_id', None)
+    handed_over = not created and previous is not None and previous != instance.guardian_id
+    if handed_over:
+        record_scope_change(instance.pk, previous, ChangeLogEntry.REVOKE)
+        record_scope_change(instance.pk, instance.guardian_id, ChangeLogEntry.GRANT)
+    if len(sharding.shard_aliases()) > 1:
+        if created:
+            sharding.place_elders([instance.pk], instance._state.db)
+        if created or handed_over:
+            sharding.record_members([instance.pk], instance._state.db)
+    instance._loaded_guardian_id = instance.guardian_id
+
+
+@receiver(post_delete, sender=ElderProfile)
+def elder_deleted(sender, instance, **kwargs):
+    # The elder's own DELETE entries are out of the guardian's scope once it is gone
+    record_scope_change(instance.pk, instance.guardian_id, ChangeLogEntry.REVOKE)
+    if len(sharding.shard_aliases()) > 1:
+        sharding.forget_elder(instance.pk)
+
+
+@receiver(m2m_changed, sender=ElderProfile.caregivers.through)
+def caregivers_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if len(sharding.shard_aliases()) == 1:
+        return
+    if reverse and action == 'pre_clear':
+        # Which elders lose the caregiver is only known before the clear
+        instance._cleared_elder_ids = list(instance.assigned_elders.using(using).values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        elder_ids = [instance.pk]
+    elif action == 'post_clear':
+        elder_ids = instance.__dict__.pop('_cleared_elder_ids', [])
+    else:
+        elder_ids = list(pk_set)
+    sharding.record_members(elder_ids, using)
+
+
+def _child_changed(sender, instance, **kwargs):
+    schedule_refresh([instance.elder_id], [SUMMARY_SECTIONS[sender]])
+
+
+for _model in SUMMARY_SECTIONS:
+    post_save.connect(_child_changed, sender=_model, dispatch_uid=f'care_summary_save_{_model.__name__}')
+    post_delete.connect(_child_changed, sender=_model, dispatch_uid=f'care_summary_delete_{_model.__name__}')
+
+
+@receiver(post_save, sender=Medication)
+def medication_saved(sender, instance, **kwargs):
+    elder_ids = MedicationSchedule.objects.filter(
+        medication=instance, is_active=True
+    ).values_list('elder_id', flat=True).distinct()
+    schedule_refresh(list(elder_ids), ['medications'])
+
+
+def _bump_fragment_versions(sender, instance, **kwargs):
+    if sender is ElderProfile:
+        elder_id = instance.pk
+    else:
+        elder_id = getattr(instance, 'elder_id', None)
+    # Bumping before commit would let a concurrent request cache old rows under the new version
+    transaction.on_commit(lambda: cache_versions.bump(sender._meta.model_name, elder_id))
+
+
+for _model in FRAGMENT_CACHED_MODELS:
+    post_save.connect(_bump_fragment_versions, sender=_model, dispatch_uid=f'fragment_version_save_{_model.__name__}')
+    post_delete.connect(_bump_fragment_versions, sender=_model, dispatch_uid=f'fragment_version_delete_{_model.__name__}')
+
+
+def _log_save(sender, instance, **kwargs):
+    record_change(instance, ChangeLogEntry.UPSERT)
+
+
+def _log_delete(sender, instance, **kwargs):
+    record_change(instance, ChangeLogEntry.DELETE)
+
+
+for _model in SYNCED_MODELS:
+    post_save.connect(_log_save, sender=_model, dispatch_uid=f'change_log_save_{_model.__name__}')
+    post_delete.connect(_log_delete, sender=_model, dispatch_uid=f'change_log_delete_{_model.__name__}')
+
+
+def _task_assignment_changed(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_assigned_to_id', None)
+    workload.schedule_refresh([instance.assigned_to_id, previous])
+    instance._loaded_assigned_to_id = instance.assigned_to_id
+
+
+post_save.connect(_task_assignment_changed, sender=CareTask, dispatch_uid='caregiver_workload_save')
+post_delete.connect(_task_assignment_changed, sender=CareTask, dispatch_uid='caregiver_workload_delete')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login, which nothing renders
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(lambda: cache_versions.bump('user'))
+    if created:
+        return
+    guarded = ElderProfile.objects.filter(guardian=instance).values_list('pk', flat=True)
+    schedule_refresh(list(guarded), ['elder'])
+    assigned = CareTask.objects.filter(assigned_to=instance).values_list('elder_id', flat=True).distinct()
+    schedule_refresh(list(assigned), ['care_tasks'])
+
+
+def _reference_saved(sender, instance, update_fields=None, **kwargs):
+    if len(sharding.shard_aliases()) == 1 or instance._state.db != DEFAULT_DB_ALIAS:
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    sharding.copy_reference_row(instance)
+
+
+def _reference_deleted(sender, instance, **kwargs):
+    if len(sharding.shard_aliases()) > 1 and instance._state.db == DEFAULT_DB_ALIAS:
+        sharding.delete_reference_row(sender, instance.pk)
+
+
+# Elder rows on every shard point at users and medications
+for _model in (User, Medication):
+    post_save.connect(_reference_saved, sender=_model, dispatch_uid=f'shard_copy_save_{_model.__name__}')
+    post_delete.connect(_reference_deleted, sender=_model, dispatch_uid=f'shard_copy_delete_{_model.__name__}')
+
+
+@receiver(pre_save, sender=VitalsLog)
+@receiver(pre_save, sender=MedicationLog)
+def partitioned_row_saving(sender, instance, using, **kwargs):
+    partitions.prepare_rows(sender, [instance], using)
+
+
+@receiver(post_delete, sender=ArchivedMonth)
+def archived_month_deleted(sender, instance, **kwargs):
+    # With its elder, or by hand; replaced versions of a file are removed by the archiver
+    transaction.on_commit(lambda: archive.remove_file(instance.path))
+
+
+@receiver(pre_migrate)
+def before_migrate(sender, using, plan=None, **kwargs):
+    # Migrations cannot alter the SQLite views over the month tables
+    if sender.name == 'care_app' and plan:
+        partitions.fold_tables(using)
+
+
+@receiver(post_migrate)
+def after_migrate(sender, using, **kwargs):
+    if sender.name == 'care_app':
+        partitions.split_tables(using)
+
+
+def _screening_terms_changed():
+    cache_versions.bump('screeningterm')
+    # Terms are edited a row at a time; one rescan at the next full minute covers a whole batch of edits
+    run_at = timezone.now().replace(second=0, microsecond=0) + SCREENING_RESCAN_DELAY
+    task_name = tasks.rescan_medication_screening.task_name
+    jobs.enqueue(task_name, run_at=run_at, unique_key=f'{task_name}@{run_at.isoformat()}')
+
+
+@receiver(post_save, sender=ScreeningTerm)
+@receiver(post_delete, sender=ScreeningTerm)
+def screening_term_changed(sender, **kwargs):
+    transaction.on_commit(_screening_terms_changed)
@@ -0,0 +1,18 @@
+// Changelist autocomplete filters (see admin_tools.AutocompleteFilter): picking an object reloads the list filtered by it
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', '.autocomplete-filter select', function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete(this.dataset.clearParameters);
+        // The current page may not exist in the filtered list
+        params.delete('p');
+        if (this.value) {
+            params.set(this.dataset.filterParameter, this.value);
+        } else {
+            params.delete(this.dataset.filterParameter);
+        }
+        window.location.search = params.toString();
+    });
+}
@@ -0,0 +1,43 @@
+const freeSlotUrl = document.currentScript.dataset.freeSlotUrl;
+const appointmentId = document.currentScript.dataset.appointment;
+
+// Fill in the first time both the elder and the doctor are free
+document.addEventListener('DOMContentLoaded', function() {
+    const button = document.getElementById('findFreeSlot');
+    const result = document.getElementById('freeSlotResult');
+    const dateField = document.getElementById('id_appointment_date');
+
+    button.addEventListener('click', function() {
+        const elder = document.getElementById('id_elder').value;
+        if (!elder) {
+            result.textContent = 'Choose an elder first.';
+            return;
+        }
+        const params = new URLSearchParams({
+            elder: elder,
+            doctor: document.getElementById('id_doctor_name').value,
+            duration: document.getElementById('id_duration').value || '30',
+        });
+        if (dateField.value) {
+            params.set('after', dateField.value);
+        }
+        if (appointmentId) {
+            params.set('appointment', appointmentId);
+        }
+        fetch(`${freeSlotUrl}?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    result.textContent = data.error;
+                } else if (data.start) {
+                    dateField.value = data.start;
+                    result.textContent = `Free from ${data.start.replace('T', ' ')} to ${data.end.replace('T', ' ')}.`;
+                } else {
+                    result.textContent = 'No free slot in the next 60 days.';
+                }
+            })
+            .catch(() => {
+                result.textContent = 'Could not search for a free slot.';
+            });
+    });
+});
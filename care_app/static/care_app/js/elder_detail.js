@@ -0,0 +1,19 @@
+// Initialize tabs
+document.addEventListener('DOMContentLoaded', function() {
+    // Add smooth scrolling to tabs
+    const tabLinks = document.querySelectorAll('[data-bs-toggle="tab"]');
+    tabLinks.forEach(function(tabLink) {
+        tabLink.addEventListener('click', function(e) {
+            e.preventDefault();
+            const target = this.getAttribute('data-bs-target');
+            const tab = new bootstrap.Tab(this);
+            tab.show();
+
+            // Smooth scroll to tab content
+            document.querySelector(target).scrollIntoView({
+                behavior: 'smooth',
+                block: 'start'
+            });
+        });
+    });
+});
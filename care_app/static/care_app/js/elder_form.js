@@ -0,0 +1,64 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Form validation
+    const form = document.querySelector('.needs-validation');
+    const inputs = form.querySelectorAll('input, select, textarea');
+
+    inputs.forEach(function(input) {
+        input.addEventListener('blur', function() {
+            if (this.checkValidity()) {
+                this.classList.remove('is-invalid');
+                this.classList.add('is-valid');
+            } else {
+                this.classList.remove('is-valid');
+                this.classList.add('is-invalid');
+            }
+        });
+    });
+
+    // Form submission
+    form.addEventListener('submit', function(event) {
+        if (!form.checkValidity()) {
+            event.preventDefault();
+            event.stopPropagation();
+        }
+        form.classList.add('was-validated');
+    });
+
+    // Auto-save draft functionality
+    let autoSaveTimer;
+    inputs.forEach(function(input) {
+        input.addEventListener('input', function() {
+            clearTimeout(autoSaveTimer);
+            autoSaveTimer = setTimeout(function() {
+                // Save form data to localStorage
+                const formData = new FormData(form);
+                const data = {};
+                for (let [key, value] of formData.entries()) {
+                    data[key] = value;
+                }
+                localStorage.setItem('elderFormDraft', JSON.stringify(data));
+            }, 1000);
+        });
+    });
+
+    // Load draft on page load
+    const savedDraft = localStorage.getItem('elderFormDraft');
+    if (savedDraft && !form.querySelector('input[name="full_name"]').value) {
+        try {
+            const data = JSON.parse(savedDraft);
+            Object.keys(data).forEach(function(key) {
+                const input = form.querySelector(`[name="${key}"]`);
+                if (input) {
+                    input.value = data[key];
+                }
+            });
+        } catch (e) {
+            console.log('Could not load saved draft');
+        }
+    }
+
+    // Clear draft on successful submission
+    form.addEventListener('submit', function() {
+        localStorage.removeItem('elderFormDraft');
+    });
+});
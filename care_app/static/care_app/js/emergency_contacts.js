@@ -0,0 +1,7 @@
+function deleteContact(contactId, contactName) {
+    document.getElementById('contactName').textContent = contactName;
+    document.getElementById('deleteForm').action = `/emergency-contacts/${contactId}/delete/`;
+
+    const modal = new bootstrap.Modal(document.getElementById('deleteModal'));
+    modal.show();
+}
@@ -0,0 +1,93 @@
+// Search functionality
+document.getElementById('searchInput').addEventListener('input', function() {
+    filterMedications();
+});
+
+// Filter by elder
+document.getElementById('elderFilter').addEventListener('change', function() {
+    filterMedications();
+});
+
+// Filter by type
+document.getElementById('typeFilter').addEventListener('change', function() {
+    filterMedications();
+});
+
+// Filter by status
+document.getElementById('statusFilter').addEventListener('change', function() {
+    filterMedications();
+});
+
+function filterMedications() {
+    const searchTerm = document.getElementById('searchInput').value.toLowerCase();
+    const elderFilter = document.getElementById('elderFilter').value;
+    const typeFilter = document.getElementById('typeFilter').value;
+    const statusFilter = document.getElementById('statusFilter').value;
+
+    const medications = document.querySelectorAll('.medication-item');
+
+    medications.forEach(item => {
+        const name = item.querySelector('.card-header h6').textContent.toLowerCase();
+        const elder = item.dataset.elder;
+        const type = item.dataset.type;
+        const status = item.dataset.status;
+
+        let show = true;
+
+        // Search filter
+        if (searchTerm && !name.includes(searchTerm)) show = false;
+
+        // Elder filter
+        if (elderFilter && elder !== elderFilter) show = false;
+
+        // Type filter
+        if (typeFilter && type !== typeFilter) show = false;
+
+        // Status filter
+        if (statusFilter && status !== statusFilter) show = false;
+
+        item.style.display = show ? '' : 'none';
+    });
+}
+
+function deleteMedication(medicationId) {
+    const modal = new bootstrap.Modal(document.getElementById('deleteModal'));
+    modal.show();
+
+    document.getElementById('confirmDelete').onclick = function() {
+        fetch(`/medications/${medicationId}/delete/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Content-Type': 'application/json',
+            },
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();
+            } else {
+                alert('Error deleting medication: ' + data.error);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error deleting medication');
+        });
+    };
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
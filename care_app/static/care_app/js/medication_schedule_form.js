@@ -0,0 +1,94 @@
+// Medication search box: suggestions come from the in-process catalog as you type
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.medication-autocomplete').forEach(function(box) {
+        const input = box.querySelector('input[type="search"]');
+        const value = box.querySelector('input[type="hidden"]');
+        const menu = box.querySelector('.dropdown-menu');
+        let timer = null;
+        let active = -1;
+        let controller = null;
+
+        function close() {
+            menu.classList.remove('show');
+            input.setAttribute('aria-expanded', 'false');
+            active = -1;
+        }
+
+        function choose(item) {
+            value.value = item.dataset.id;
+            input.value = item.textContent;
+            close();
+        }
+
+        function highlight(index) {
+            const items = menu.querySelectorAll('.dropdown-item');
+            if (!items.length) {
+                return;
+            }
+            active = (index + items.length) % items.length;
+            items.forEach((item, position) => item.classList.toggle('active', position === active));
+        }
+
+        function show(results) {
+            menu.replaceChildren();
+            results.forEach(function(result) {
+                const item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'dropdown-item';
+                item.dataset.id = result.id;
+                item.textContent = result.label;
+                item.addEventListener('mousedown', event => event.preventDefault());
+                item.addEventListener('click', () => choose(item));
+                menu.appendChild(item);
+            });
+            if (!results.length) {
+                const empty = document.createElement('span');
+                empty.className = 'dropdown-item-text text-muted';
+                empty.textContent = 'No matching medication';
+                menu.appendChild(empty);
+            }
+            menu.classList.add('show');
+            input.setAttribute('aria-expanded', 'true');
+            active = -1;
+        }
+
+        input.addEventListener('input', function() {
+            // Typing invalidates the previous choice until a suggestion is picked
+            value.value = '';
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (query.length < 2) {
+                close();
+                return;
+            }
+            timer = setTimeout(function() {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                const params = new URLSearchParams({q: query});
+                fetch(`${box.dataset.url}?${params}`, {signal: controller.signal})
+                    .then(response => response.json())
+                    .then(data => show(data.results))
+                    .catch(() => {});
+            }, 150);
+        });
+
+        input.addEventListener('keydown', function(event) {
+            if (!menu.classList.contains('show')) {
+                return;
+            }
+            if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight(active + (event.key === 'ArrowDown' ? 1 : -1));
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                choose(menu.querySelectorAll('.dropdown-item')[active]);
+            } else if (event.key === 'Escape') {
+                close();
+            }
+        });
+
+        input.addEventListener('blur', close);
+    });
+});
@@ -0,0 +1,121 @@
+// Search functionality
+document.getElementById('searchInput').addEventListener('input', function() {
+    const searchTerm = this.value.toLowerCase();
+    const notifications = document.querySelectorAll('.notification-item');
+
+    notifications.forEach(item => {
+        const title = item.querySelector('h6').textContent.toLowerCase();
+        const message = item.querySelector('p').textContent.toLowerCase();
+
+        if (title.includes(searchTerm) || message.includes(searchTerm)) {
+            item.style.display = '';
+        } else {
+            item.style.display = 'none';
+        }
+    });
+});
+
+// Filter by type
+document.getElementById('typeFilter').addEventListener('change', function() {
+    filterNotifications();
+});
+
+// Filter by priority
+document.getElementById('priorityFilter').addEventListener('change', function() {
+    filterNotifications();
+});
+
+function filterNotifications(status = 'all') {
+    const typeFilter = document.getElementById('typeFilter').value;
+    const priorityFilter = document.getElementById('priorityFilter').value;
+    const notifications = document.querySelectorAll('.notification-item');
+
+    notifications.forEach(item => {
+        const type = item.dataset.type;
+        const priority = item.dataset.priority;
+        const readStatus = item.dataset.read;
+
+        let show = true;
+
+        // Status filter
+        if (status === 'unread' && readStatus === 'read') show = false;
+        if (status === 'read' && readStatus === 'unread') show = false;
+
+        // Type filter
+        if (typeFilter && type !== typeFilter) show = false;
+
+        // Priority filter
+        if (priorityFilter && priority !== priorityFilter) show = false;
+
+        item.style.display = show ? '' : 'none';
+    });
+}
+
+function markAsRead(notificationId) {
+    fetch(`/notifications/${notificationId}/mark-read/`, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'Content-Type': 'application/json',
+        },
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        }
+    });
+}
+
+function markAllAsRead() {
+    fetch('/notifications/mark-all-read/', {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'Content-Type': 'application/json',
+        },
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        }
+    });
+}
+
+function deleteNotification(notificationId) {
+    if (confirm('Are you sure you want to delete this notification?')) {
+        fetch(`/notifications/${notificationId}/delete/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Content-Type': 'application/json',
+            },
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();
+            }
+        });
+    }
+}
+
+function viewDetails(notificationId) {
+    window.location.href = `/notifications/${notificationId}/`;
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
@@ -0,0 +1,74 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Form validation
+    const forms = document.querySelectorAll('.needs-validation');
+
+    forms.forEach(function(form) {
+        const inputs = form.querySelectorAll('input, select, textarea');
+
+        inputs.forEach(function(input) {
+            input.addEventListener('blur', function() {
+                if (this.checkValidity()) {
+                    this.classList.remove('is-invalid');
+                    this.classList.add('is-valid');
+                } else {
+                    this.classList.remove('is-valid');
+                    this.classList.add('is-invalid');
+                }
+            });
+        });
+
+        // Form submission
+        form.addEventListener('submit', function(event) {
+            if (!form.checkValidity()) {
+                event.preventDefault();
+                event.stopPropagation();
+            }
+            form.classList.add('was-validated');
+        });
+    });
+
+
+
+    // Auto-save profile form
+    const profileForm = document.querySelector('form[method="post"]:not([action*="change_password"])');
+    if (profileForm) {
+        let autoSaveTimer;
+        const inputs = profileForm.querySelectorAll('input, select, textarea');
+
+        inputs.forEach(function(input) {
+            input.addEventListener('input', function() {
+                clearTimeout(autoSaveTimer);
+                autoSaveTimer = setTimeout(function() {
+                    // Save form data to localStorage
+                    const formData = new FormData(profileForm);
+                    const data = {};
+                    for (let [key, value] of formData.entries()) {
+                        data[key] = value;
+                    }
+                    localStorage.setItem('profileFormDraft', JSON.stringify(data));
+                }, 1000);
+            });
+        });
+
+        // Load draft on page load
+        const savedDraft = localStorage.getItem('profileFormDraft');
+        if (savedDraft) {
+            try {
+                const data = JSON.parse(savedDraft);
+                Object.keys(data).forEach(function(key) {
+                    const input = profileForm.querySelector(`[name="${key}"]`);
+                    if (input && !input.value) {
+                        input.value = data[key];
+                    }
+                });
+            } catch (e) {
+                console.log('Could not load saved draft');
+            }
+        }
+
+        // Clear draft on successful submission
+        profileForm.addEventListener('submit', function() {
+            localStorage.removeItem('profileFormDraft');
+        });
+    }
+});
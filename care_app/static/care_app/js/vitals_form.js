@@ -0,0 +1,15 @@
+const recordedAtId = document.currentScript.dataset.recordedAt;
+
+// Auto-fill current date and time
+document.addEventListener('DOMContentLoaded', function() {
+    const recordedAtField = document.getElementById(recordedAtId);
+    if (recordedAtField && !recordedAtField.value) {
+        const now = new Date();
+        const year = now.getFullYear();
+        const month = String(now.getMonth() + 1).padStart(2, '0');
+        const day = String(now.getDate()).padStart(2, '0');
+        const hours = String(now.getHours()).padStart(2, '0');
+        const minutes = String(now.getMinutes()).padStart(2, '0');
+        recordedAtField.value = `${year}-${month}-${day}T${hours}:${minutes}`;
+    }
+});
@@ -0,0 +1,89 @@
+// Search functionality
+document.getElementById('searchInput').addEventListener('input', function() {
+    filterVitals();
+});
+
+// Filter by elder
+document.getElementById('elderFilter').addEventListener('change', function() {
+    filterVitals();
+});
+
+// Filter by date
+document.getElementById('dateFilter').addEventListener('change', function() {
+    filterVitals();
+});
+
+// Filter by vital type
+document.getElementById('vitalTypeFilter').addEventListener('change', function() {
+    filterVitals();
+});
+
+function filterVitals() {
+    const searchTerm = document.getElementById('searchInput').value.toLowerCase();
+    const elderFilter = document.getElementById('elderFilter').value;
+    const dateFilter = document.getElementById('dateFilter').value;
+    const vitalTypeFilter = document.getElementById('vitalTypeFilter').value;
+
+    const vitals = document.querySelectorAll('.vital-item');
+
+    vitals.forEach(item => {
+        const elder = item.dataset.elder;
+        const date = item.dataset.date;
+        const type = item.dataset.type;
+
+        let show = true;
+
+        // Elder filter
+        if (elderFilter && elder !== elderFilter) show = false;
+
+        // Date filter
+        if (dateFilter && date !== dateFilter) show = false;
+
+        // Type filter
+        if (vitalTypeFilter && type !== vitalTypeFilter) show = false;
+
+        item.style.display = show ? '' : 'none';
+    });
+}
+
+function deleteVital(vitalId) {
+    const modal = new bootstrap.Modal(document.getElementById('deleteModal'));
+    modal.show();
+
+    document.getElementById('confirmDelete').onclick = function() {
+        fetch(`/vitals/${vitalId}/delete/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Content-Type': 'application/json',
+            },
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();
+            } else {
+                alert('Error deleting vital signs record: ' + data.error);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error deleting vital signs record');
+        });
+    };
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
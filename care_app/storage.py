@@ -0,0 +1,63 @@
+"""
+Static files storage that hashes and precompresses assets at build time.
+
+collectstatic gives every file a content-hashed name (as Django's
+ManifestStaticFilesStorage does) and then writes a .gz copy, plus a .br copy
+when the optional brotli package is installed, next to each hashed text
+asset. The web server can send those files as they are (nginx gzip_static /
+brotli_static) and cache the hashed names for a year, since any change to
+a file changes its name; see static/README.txt.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are optional; gzip is always written
+    brotli = None
+
+# Fonts in woff2 and images are already compressed
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.ttf', '.txt', '.json')
+MIN_COMPRESS_SIZE = 256
+
+
+def _gzip(content):
+    # A fixed mtime keeps the output identical between builds
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        encoders = [('.gz', _gzip)]
+        if brotli is not None:
+            encoders.append(('.br', _brotli))
+        for name in sorted(set(self.hashed_files.values())):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            for suffix, encode in encoders:
+                if self._compress(name, suffix, encode):
+                    yield name + suffix, name + suffix, True
+
+    def _compress(self, name, suffix, encode):
+        """Write ``name + suffix`` unless the file is tiny or compressing does not pay off"""
+        with self.open(name) as source:
+            content = source.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return False
+        compressed = encode(content)
+        if len(compressed) >= len(content):
+            return False
+        if self.exists(name + suffix):
+            self.delete(name + suffix)
+        self._save(name + suffix, ContentFile(compressed))
+        return True
@@ -0,0 +1,177 @@
+"""
+Streaming rendering for long list pages.
+
+stream_render() renders the page up front, except for {% streamed %}
+regions, and returns a StreamingHttpResponse that sends everything before a
+region at once and then the region itself as it renders. Inside a region,
+{% streamfor %} loops are sent every STREAM_CHUNK_SIZE items and read
+querysets (also queries across shards) with .iterator(), so the browser
+paints the page chrome and the first table rows while the rest is still
+being produced.
+
+    {% load care_stream %}
+    {% streamed %}
+        {% cache 3600 rows version %}
+        {% if rows.exists %}{% streamfor row in rows %}...{% endstreamfor %}{% endif %}
+        {% endcache %}
+    {% endstreamed %}
+
+Regions render after the middleware has finished with the response, so they
+must not use {% csrf_token %}, messages or the session. A {% cache %} block
+in a region is sent as it renders on a miss and stored once complete.
+Rendered with plain render(), both tags behave like their ordinary
+counterparts.
+"""
+import re
+import secrets
+from copy import copy
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.template import Node, NodeList, VariableDoesNotExist
+from django.template.defaulttags import IfNode
+from django.template.loader import render_to_string
+from django.templatetags.cache import CacheNode
+
+from .sharding import CrossShardQuerySet
+
+STREAM_CHUNK_SIZE = 50
+COLLECTOR_KEY = '_stream_regions'
+
+
+class _Regions:
+    """Deferred {% streamed %} regions of one response"""
+
+    def __init__(self):
+        self.token = secrets.token_hex(8)
+        self.pending = []
+
+    def defer(self, nodelist, context):
+        # The context is copied because rendering carries on and pops it
+        self.pending.append((nodelist, copy(context)))
+        return f'<!--stream:{self.token}:{len(self.pending) - 1}-->'
+
+    def stream(self, page):
+        parts = re.split(f'<!--stream:{self.token}:(\\d+)-->', page)
+        for position, part in enumerate(parts):
+            if position % 2 == 0:
+                if part:
+                    yield part
+                continue
+            nodelist, context = self.pending[int(part)]
+            for chunk in _iter_nodelist(nodelist, context):
+                if chunk:
+                    yield chunk
+
+
+def stream_render(request, template_name, context=None):
+    """Like render(), but {% streamed %} regions are sent while they render"""
+    regions = _Regions()
+    page = render_to_string(template_name, {**(context or {}), COLLECTOR_KEY: regions}, request)
+    return StreamingHttpResponse(regions.stream(page), content_type='text/html; charset=utf-8')
+
+
+def _streams(node):
+    return isinstance(node, StreamForNode) or bool(node.get_nodes_by_type(StreamForNode))
+
+
+def _iter_nodelist(nodelist, context):
+    for node in nodelist:
+        if isinstance(node, StreamForNode):
+            yield from node.iter_render(context)
+        elif isinstance(node, CacheNode) and _streams(node):
+            yield from _iter_cache(node, context)
+        elif isinstance(node, IfNode) and _streams(node):
+            yield from _iter_if(node, context)
+        else:
+            yield node.render_annotated(context)
+
+
+def _iter_if(node, context):
+    # Same branch selection as IfNode.render
+    for condition, nodelist in node.conditions_nodelists:
+        if condition is None:
+            match = True
+        else:
+            try:
+                match = condition.eval(context)
+            except VariableDoesNotExist:
+                match = None
+        if match:
+            yield from _iter_nodelist(nodelist, context)
+            return
+
+
+def _iter_cache(node, context):
+    # Same key and timeout as CacheNode.render; the fragment is stored once it has been sent
+    expire_time = node.expire_time_var.resolve(context)
+    if expire_time is not None:
+        expire_time = int(expire_time)
+    if node.cache_name:
+        fragment_cache = caches[node.cache_name.resolve(context)]
+    else:
+        try:
+            fragment_cache = caches['template_fragments']
+        except InvalidCacheBackendError:
+            fragment_cache = caches['default']
+    cache_key = make_template_fragment_key(node.fragment_name, [var.resolve(context) for var in node.vary_on])
+    value = fragment_cache.get(cache_key)
+    if value is not None:
+        yield value
+        return
+    parts = []
+    for chunk in _iter_nodelist(node.nodelist, context):
+        parts.append(chunk)
+        yield chunk
+    fragment_cache.set(cache_key, ''.join(parts), expire_time)
+
+
+class StreamedNode(Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        regions = context.get(COLLECTOR_KEY)
+        if regions is None:
+            return self.nodelist.render(context)
+        return regions.defer(self.nodelist, context)
+
+
+class StreamForNode(Node):
+    """
+    A {% for %} over one variable that renders in chunks. forloop offers
+    counter, counter0 and first only, since the length is not known up front.
+    """
+    child_nodelists = ('nodelist_loop', 'nodelist_empty')
+
+    def __init__(self, loopvar, sequence, nodelist_loop, nodelist_empty=None):
+        self.loopvar = loopvar
+        self.sequence = sequence
+        self.nodelist_loop = nodelist_loop
+        self.nodelist_empty = nodelist_empty or NodeList()
+
+    def render(self, context):
+        return ''.join(self.iter_render(context))
+
+    def iter_render(self, context):
+        sequence = self.sequence.resolve(context, ignore_failures=True)
+        if sequence is None:
+            sequence = []
+        elif isinstance(sequence, (QuerySet, CrossShardQuerySet)):
+            sequence = sequence.iterator(chunk_size=STREAM_CHUNK_SIZE * 4)
+        parts = []
+        counter = 0
+        with context.push():
+            for counter, item in enumerate(sequence, 1):
+                context[self.loopvar] = item
+                context['forloop'] = {'counter': counter, 'counter0': counter - 1, 'first': counter == 1}
+                parts.append(self.nodelist_loop.render(context))
+                if len(parts) == STREAM_CHUNK_SIZE:
+                    yield ''.join(parts)
+                    parts = []
+        if counter == 0:
+            yield self.nodelist_empty.render(context)
+        elif parts:
+            yield ''.join(parts)
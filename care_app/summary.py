@@ -0,0 +1,225 @@
+"""
+Per-elder care summary documents.
+
+The elder detail page needs the profile plus six related lists. Instead of
+querying them on every request, each elder has one ElderCareSummary row whose
+JSON document holds every section the page renders. Signals (see signals.py)
+rebuild only the section whose rows changed, and the page is served from a
+single primary-key read.
+"""
+from collections import namedtuple
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import sharding
+from .models import (
+    ElderProfile, MedicationSchedule, Medication, Appointment, CareTask,
+    EmergencyContact, VitalsLog, IncidentReport, ElderCareSummary
+)
+
+# Bump when the document layout changes so stale documents get rebuilt in full
+DOCUMENT_VERSION = 1
+
+CHECK_BATCH_SIZE = 500
+
+USER_FIELDS = ['id', 'username', 'first_name', 'last_name']
+
+Section = namedtuple('Section', ['model', 'fields', 'related', 'queryset'])
+
+SECTIONS = {
+    'elder': Section(
+        model=ElderProfile,
+        fields=[
+            'id', 'full_name', 'date_of_birth', 'gender', 'address', 'phone', 'email',
+            'medical_conditions', 'allergies', 'blood_type', 'emergency_notes',
+            'created_at', 'updated_at',
+        ],
+        related={'guardian': (User, USER_FIELDS)},
+        queryset=lambda elder_id: ElderProfile.objects.filter(pk=elder_id).select_related('guardian'),
+    ),
+    'medications': Section(
+        model=MedicationSchedule,
+        fields=[
+            'id', 'dosage', 'frequency', 'start_date', 'end_date',
+            'time_1', 'time_2', 'time_3', 'instructions', 'is_active',
+        ],
+        related={'medication': (Medication, ['id', 'name', 'strength'])},
+        queryset=lambda elder_id: MedicationSchedule.objects.filter(
+            elder_id=elder_id, is_active=True
+        ).select_related('medication').order_by('pk'),
+    ),
+    'appointments': Section(
+        model=Appointment,
+        fields=[
+            'id', 'title', 'appointment_type', 'appointment_date', 'duration',
+            'location', 'doctor_name', 'status',
+        ],
+        related={},
+        queryset=lambda elder_id: Appointment.objects.filter(
+            elder_id=elder_id
+        ).order_by('-appointment_date')[:10],
+    ),
+    'care_tasks': Section(
+        model=CareTask,
+        fields=['id', 'title', 'description', 'task_type', 'status', 'priority', 'due_date'],
+        related={'assigned_to': (User, USER_FIELDS)},
+        queryset=lambda elder_id: CareTask.objects.filter(
+            elder_id=elder_id
+        ).select_related('assigned_to').order_by('-created_at')[:10],
+    ),
+    'emergency_contacts': Section(
+        model=EmergencyContact,
+        fields=['id', 'name', 'relation', 'phone', 'phone_2', 'email', 'address', 'is_primary'],
+        related={},
+        queryset=lambda elder_id: EmergencyContact.objects.filter(elder_id=elder_id),
+    ),
+    'recent_vitals': Section(
+        model=VitalsLog,
+        fields=[
+            'id', 'recorded_at', 'blood_pressure_systolic', 'blood_pressure_diastolic',
+            'heart_rate', 'temperature', 'weight', 'oxygen_saturation', 'blood_sugar', 'notes',
+        ],
+        related={},
+        queryset=lambda elder_id: VitalsLog.objects.filter(
+            elder_id=elder_id
+        ).order_by('-recorded_at')[:5],
+    ),
+    'recent_incidents': Section(
+        model=IncidentReport,
+        fields=['id', 'incident_type', 'incident_date', 'description', 'severity', 'location', 'is_resolved'],
+        related={},
+        queryset=lambda elder_id: IncidentReport.objects.filter(
+            elder_id=elder_id
+        ).order_by('-incident_date')[:5],
+    ),
+}
+
+_encoder = DjangoJSONEncoder()
+
+
+def _encode(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return _encoder.default(value)
+
+
+def _dump(obj, model, fields, related):
+    row = {}
+    for name in fields:
+        row[name] = _encode(getattr(obj, model._meta.get_field(name).attname))
+    for name, (related_model, related_fields) in related.items():
+        related_obj = getattr(obj, name)
+        row[name] = None if related_obj is None else _dump(related_obj, related_model, related_fields, {})
+    return row
+
+
+def _hydrate(model, row, related):
+    """Rebuild an unsaved model instance from a document row so templates keep working"""
+    values = {}
+    for name, value in row.items():
+        if name in related:
+            continue
+        field = model._meta.get_field(name)
+        values[field.attname] = field.to_python(value)
+    obj = model(**values)
+    obj._state.adding = False
+    for name, (related_model, _) in related.items():
+        if row.get(name) is not None:
+            setattr(obj, name, _hydrate(related_model, row[name], {}))
+    return obj
+
+
+def build_section(elder_id, name):
+    section = SECTIONS[name]
+    rows = [_dump(obj, section.model, section.fields, section.related) for obj in section.queryset(elder_id)]
+    if name == 'elder':
+        return rows[0] if rows else None
+    return rows
+
+
+def build_document(elder_id):
+    """Build the full document from the live tables, or None if the elder no longer exists"""
+    profile = build_section(elder_id, 'elder')
+    if profile is None:
+        return None
+    document = {'version': DOCUMENT_VERSION, 'elder': profile}
+    for name in SECTIONS:
+        if name != 'elder':
+            document[name] = build_section(elder_id, name)
+    return document
+
+
+def refresh_summary(elder_id, sections=None):
+    """
+    Rebuild the given sections of an elder's document (all of them if sections is None).
+    Documents that are missing or from an older layout are always rebuilt in full.
+    """
+    with sharding.atomic():
+        summary = ElderCareSummary.objects.select_for_update().filter(pk=elder_id).first()
+        if summary is None or sections is None or summary.document.get('version') != DOCUMENT_VERSION:
+            document = build_document(elder_id)
+            if document is None:
+                return None
+            summary, _ = ElderCareSummary.objects.update_or_create(
+                elder_id=elder_id, defaults={'document': document}
+            )
+            return summary
+        for name in sections:
+            summary.document[name] = build_section(elder_id, name)
+        summary.save(update_fields=['document', 'updated_at'])
+        return summary
+
+
+def schedule_refresh(elder_ids, sections):
+    """Refresh the affected sections once the surrounding transaction commits"""
+    for elder_id in set(elder_ids):
+        if elder_id is not None:
+            transaction.on_commit(lambda elder_id=elder_id: refresh_summary(elder_id, sections))
+
+
+def load_care_summary(elder_id):
+    """
+    Return the elder detail context from a single summary row read, building the
+    document on first access. Returns None if the elder does not exist.
+    """
+    summary = ElderCareSummary.objects.filter(pk=elder_id).first()
+    if summary is None or summary.document.get('version') != DOCUMENT_VERSION:
+        summary = refresh_summary(elder_id)
+        if summary is None:
+            return None
+    document = summary.document
+    context = {}
+    for name, section in SECTIONS.items():
+        if name == 'elder':
+            context[name] = _hydrate(section.model, document[name], section.related)
+        else:
+            context[name] = [_hydrate(section.model, row, section.related) for row in document[name]]
+    return context
+
+
+def check_care_summaries(elder_ids=None, repair=False):
+    """
+    Compare stored documents with a fresh build from the live tables.
+    Returns a list of (elder_id, stale_sections); missing documents report every section.
+    """
+    elders = ElderProfile.objects.order_by('pk')
+    if elder_ids:
+        elders = elders.filter(pk__in=elder_ids)
+    ids = list(elders.values_list('pk', flat=True))
+    problems = []
+    for start in range(0, len(ids), CHECK_BATCH_SIZE):
+        batch = ids[start:start + CHECK_BATCH_SIZE]
+        stored = dict(ElderCareSummary.objects.filter(pk__in=batch).values_list('elder_id', 'document'))
+        for elder_id in batch:
+            fresh = build_document(elder_id)
+            if fresh is None:
+                continue
+            current = stored.get(elder_id) or {}
+            stale = [name for name in fresh if current.get(name) != fresh[name]]
+            if stale:
+                problems.append((elder_id, stale))
+                if repair:
+                    ElderCareSummary.objects.update_or_create(elder_id=elder_id, defaults={'document': fresh})
+    return problems
@@ -0,0 +1,74 @@
+"""
+Background tasks run by the job queue (see jobs.py).
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from . import archive, changelog, importer, outbox, partitions, recurrence, screening, sharding
+from .jobs import periodic, task
+from .models import Job
+
+FINISHED_JOB_RETENTION = timedelta(days=1)
+FAILED_JOB_RETENTION = timedelta(days=30)
+CHANGE_LOG_RETENTION = timedelta(days=30)
+
+
+@periodic(every=timedelta(seconds=5), concurrency=1, max_attempts=1, priority=10)
+def deliver_outbox():
+    while outbox.process_batch():
+        pass
+
+
+@periodic(every=timedelta(minutes=15), concurrency=1, max_attempts=3)
+def generate_recurring_tasks():
+    for alias in sharding.shard_aliases():
+        with sharding.use_shard(alias):
+            recurrence.generate_occurrences()
+
+
+@periodic(every=timedelta(minutes=5), concurrency=1, max_attempts=3)
+def sweep_overdue_tasks():
+    for alias in sharding.shard_aliases():
+        with sharding.use_shard(alias):
+            recurrence.sweep_overdue()
+
+
+# A retried attempt carries on after the last chunk the failed one committed
+@task(max_attempts=3)
+def import_csv(run_id):
+    importer.run_import(run_id)
+
+
+@task(max_attempts=3, concurrency=1)
+def rescan_medication_screening():
+    for alias in sharding.shard_aliases():
+        with sharding.use_shard(alias):
+            screening.rescan()
+
+
+@periodic(cron='30 3 * * *', max_attempts=3)
+def prune_change_log():
+    changelog.prune(CHANGE_LOG_RETENTION)
+
+
+# Ahead of the month turning; a late run only means the first inserts of a month create its partition
+@periodic(cron='15 3 * * *', concurrency=1, max_attempts=3)
+def maintain_partitions():
+    for alias in sharding.shard_aliases():
+        partitions.maintain(alias)
+
+
+# Before maintain_partitions, which may detach the months this would archive
+@periodic(cron='45 2 * * *', concurrency=1, max_attempts=3)
+def archive_history():
+    for alias in sharding.shard_aliases():
+        with sharding.use_shard(alias):
+            archive.archive_old_rows()
+
+
+@periodic(cron='0 4 * * *', max_attempts=3)
+def prune_jobs():
+    now = timezone.now()
+    Job.objects.filter(status__in=[Job.DONE, Job.CANCELLED], finished_at__lt=now - FINISHED_JOB_RETENTION).delete()
+    Job.objects.filter(status=Job.FAILED, finished_at__lt=now - FAILED_JOB_RETENTION).delete()
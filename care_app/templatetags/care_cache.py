@@ -0,0 +1,14 @@
+from django import template
+
+from care_app.cache_versions import get_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment_version(*labels, elder=None):
+    """
+    Version string for use as a {% cache %} vary-on argument, e.g.
+    {% fragment_version 'appointment' elder=elder.pk as version %}
+    """
+    return get_version(*labels, elder_id=elder)
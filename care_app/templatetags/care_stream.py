@@ -0,0 +1,34 @@
+from django import template
+
+from care_app.streaming import StreamedNode, StreamForNode
+
+register = template.Library()
+
+
+@register.tag
+def streamed(parser, token):
+    """
+    {% streamed %}...{% endstreamed %}: with stream_render(), send the page up
+    to here first and this region as it renders
+    """
+    nodelist = parser.parse(('endstreamed',))
+    parser.delete_first_token()
+    return StreamedNode(nodelist)
+
+
+@register.tag
+def streamfor(parser, token):
+    """
+    {% streamfor item in items %}...{% empty %}...{% endstreamfor %}: a loop
+    sent in chunks inside a {% streamed %} region
+    """
+    bits = token.split_contents()
+    if len(bits) != 4 or bits[2] != 'in':
+        raise template.TemplateSyntaxError(f"'{bits[0]}' statements should look like 'streamfor x in y'")
+    sequence = parser.compile_filter(bits[3])
+    nodelist_loop = parser.parse(('empty', 'endstreamfor'))
+    nodelist_empty = None
+    if parser.next_token().contents == 'empty':
+        nodelist_empty = parser.parse(('endstreamfor',))
+        parser.delete_first_token()
+    return StreamForNode(bits[1], sequence, nodelist_loop, nodelist_empty)
@@ -0,0 +1,41 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.test import TestCase
+
+from care_app.admin_tools import bulk_transition
+from care_app.models import CareTask, ChangeLogEntry, ElderProfile
+
+
+class BulkTransitionTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        guardian = User.objects.create_user('alice')
+        self.elder = ElderProfile.objects.create(guardian=guardian, full_name='Ada Lovelace')
+        self.tasks = [
+            CareTask.objects.create(elder=self.elder, title=title, description=title, status='PENDING')
+            for title in ('Walk', 'Bath', 'Lunch')
+        ]
+
+    def test_rows_moved_on_since_the_read_are_neither_updated_nor_logged(self):
+        raced = self.tasks[1]
+        lock = CareTask._base_manager.select_for_update
+
+        def completed_first(*args, **kwargs):
+            # Another admin finishing the task between the read and the batch
+            CareTask.objects.filter(pk=raced.pk).update(status='COMPLETED')
+            return lock(*args, **kwargs)
+
+        logged = ChangeLogEntry.objects.count()
+        with mock.patch.object(CareTask._base_manager, 'select_for_update', side_effect=completed_first):
+            updated, elder_ids = bulk_transition(
+                CareTask.objects.all(), Q(status='PENDING'), {'status': 'CANCELLED'}, batch_size=2
+            )
+        self.assertEqual((updated, elder_ids), (2, {self.elder.pk}))
+        self.assertEqual(
+            sorted(ChangeLogEntry.objects.order_by('pk')[logged:].values_list('object_id', flat=True)),
+            [self.tasks[0].pk, self.tasks[2].pk],
+        )
+        self.assertEqual(CareTask.objects.get(pk=raced.pk).status, 'COMPLETED')
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from care_app import changelog
+from care_app.models import ChangeLogEntry, ElderProfile, EmergencyContact
+
+
+@override_settings(ROOT_URLCONF='care_app.tests.urls')
+@mock.patch.object(changelog, 'SETTLE_DELAY', timedelta(0))
+class ChangesFeedTests(TestCase):
+    # With sharding configured, user and elder writes reach every shard
+    databases = '__all__'
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='x')
+        self.bob = User.objects.create_user('bob', password='x')
+        self.elder = ElderProfile.objects.create(guardian=self.alice, full_name='Ada Lovelace')
+
+    def _token(self, user):
+        self.client.force_login(user)
+        return self.client.get('/api/v1/changes/').json()['next']
+
+    def _changes(self, user, token):
+        self.client.force_login(user)
+        response = self.client.get('/api/v1/changes/', {'since': token})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_upserts_and_deletes_of_own_elders(self):
+        token = self._token(self.alice)
+        contact = EmergencyContact.objects.create(
+            elder=self.elder, name='Charles', phone='555-0100'
+        )
+        feed = self._changes(self.alice, token)
+        self.assertEqual([row['id'] for row in feed['changes']['contacts']['upserts']], [contact.pk])
+
+        token = feed['next']
+        contact_pk = contact.pk
+        contact.delete()
+        feed = self._changes(self.alice, token)
+        self.assertEqual(feed['changes']['contacts'], {'upserts': [], 'deletes': [contact_pk]})
+
+    def test_other_guardians_changes_are_hidden(self):
+        token = self._token(self.bob)
+        self.elder.full_name = 'Ada King'
+        self.elder.save()
+        feed = self._changes(self.bob, token)
+        self.assertEqual(feed['changes'], {})
+
+    def test_guardian_handover_revokes_and_grants(self):
+        alice_token, bob_token = self._token(self.alice), self._token(self.bob)
+        elder = ElderProfile.objects.get(pk=self.elder.pk)
+        elder.guardian = self.bob
+        elder.save()
+
+        feed = self._changes(self.alice, alice_token)
+        self.assertEqual(feed['revoked'], [elder.pk])
+        self.assertEqual(feed['granted'], [])
+        self.assertEqual(feed['changes'], {})
+
+        feed = self._changes(self.bob, bob_token)
+        self.assertEqual(feed['granted'], [elder.pk])
+        self.assertEqual(feed['revoked'], [])
+        self.assertEqual([row['id'] for row in feed['changes']['elders']['upserts']], [elder.pk])
+
+    def test_saving_without_handover_records_no_scope_entry(self):
+        elder = ElderProfile.objects.get(pk=self.elder.pk)
+        elder.full_name = 'Ada King'
+        elder.save()
+        elder.save()
+        self.assertFalse(ChangeLogEntry.objects.filter(
+            action__in=[ChangeLogEntry.GRANT, ChangeLogEntry.REVOKE]
+        ).exists())
+
+    def test_deleted_elder_is_revoked(self):
+        token = self._token(self.alice)
+        EmergencyContact.objects.create(elder=self.elder, name='Charles', phone='555-0100')
+        elder_pk = self.elder.pk
+        self.elder.delete()
+        feed = self._changes(self.alice, token)
+        self.assertEqual(feed['revoked'], [elder_pk])
+
+    def test_scope_entries_go_only_to_their_user(self):
+        token = self._token(self.bob)
+        changelog.record_scope_change(self.elder.pk, self.alice.pk, ChangeLogEntry.REVOKE)
+        feed = self._changes(self.bob, token)
+        self.assertEqual(feed['revoked'], [])
+        entries, _, _ = changelog.changes_since(0, None, 100)
+        self.assertFalse(any(entry.user_id for entry in entries))
+
+    def test_elder_ids_past_32_bits(self):
+        # Ids of shards after the first start at sharding.SHARD_ID_SPAN
+        elder = ElderProfile.objects.create(pk=2 ** 31 + 7, guardian=self.alice, full_name='Grace Hopper')
+        contact = EmergencyContact.objects.create(elder=elder, name='Charles', phone='555-0100')
+        changelog.record_changes(EmergencyContact, [contact.pk])
+        changelog.record_scope_change(elder.pk, self.bob.pk, ChangeLogEntry.GRANT)
+        entries = ChangeLogEntry.objects.filter(elder_id=elder.pk)
+        self.assertEqual(entries.filter(resource='contacts').count(), 2)
+        self.assertTrue(entries.filter(user_id=self.bob.pk, action=ChangeLogEntry.GRANT).exists())
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from care_app.forms import AppointmentForm
+from care_app.models import Appointment, ElderProfile
+
+
+class AppointmentConflictTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        guardian = User.objects.create_user('alice')
+        self.elder = ElderProfile.objects.create(guardian=guardian, full_name='Ada Lovelace')
+        self.other = ElderProfile.objects.create(guardian=User.objects.create_user('bob'), full_name='Grace Hopper')
+        self.start = timezone.make_aware(datetime(2030, 3, 4, 10, 0))
+
+    def _form(self, doctor_name='Smith'):
+        return AppointmentForm(data={
+            'elder': self.elder.pk, 'title': 'Checkup', 'appointment_type': 'DOCTOR',
+            'appointment_date': '2030-03-04T10:15', 'duration': 30, 'doctor_name': doctor_name,
+        })
+
+    def _book(self, elder, title, doctor_name):
+        return Appointment.objects.create(
+            elder=elder, title=title, appointment_type='DOCTOR', appointment_date=self.start,
+            duration=60, doctor_name=doctor_name,
+        )
+
+    def test_clash_with_the_same_elder_is_described(self):
+        self._book(self.elder, 'Dentist', 'Jones')
+        form = self._form()
+        self.assertFalse(form.is_valid())
+        self.assertIn('Dentist at 2030-03-04 10:00 (60 min)', form.non_field_errors()[0])
+
+    def test_clash_with_another_elder_only_names_the_doctor(self):
+        self._book(self.other, 'Oncology review', 'Smith')
+        form = self._form()
+        self.assertFalse(form.is_valid())
+        message = form.non_field_errors()[0]
+        self.assertIn('Dr. Smith is booked 10:00–11:00', message)
+        self.assertNotIn('Oncology', message)
+        self.assertNotIn('Grace', message)
+
+    def test_no_clash(self):
+        self._book(self.other, 'Oncology review', 'Jones')
+        self.assertTrue(self._form().is_valid())
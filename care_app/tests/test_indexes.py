@@ -0,0 +1,25 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from care_app.models import CareTask
+
+
+class CareTaskIndexTests(TestCase):
+    databases = '__all__'
+
+    def test_assignee_index_covers_the_queue_order(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, CareTask._meta.db_table)
+        self.assertEqual(
+            constraints['caretask_assignee_idx']['columns'], ['assigned_to_id', 'status', 'priority_rank', 'due_date']
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'planner output differs per database')
+    def test_assigned_queue_is_read_in_order(self):
+        user = User.objects.create_user('carol')
+        plan = CareTask.objects.filter(assigned_to=user, status='PENDING').order_by('priority_rank', 'due_date').explain()
+        self.assertIn('caretask_assignee_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,166 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from care_app import jobs
+from care_app.models import Job, PeriodicSlot
+
+
+def _registered(**tasks):
+    return mock.patch.dict(jobs.TASKS, {
+        name: jobs.Task(func, max_attempts=3, concurrency=concurrency, priority=0)
+        for name, (func, concurrency) in tasks.items()
+    })
+
+
+class ClaimTests(TestCase):
+    def setUp(self):
+        patcher = _registered(noop=(lambda: None, None), single=(lambda: None, 1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_claims_highest_priority_due_job(self):
+        jobs.enqueue('noop', priority=1)
+        urgent = jobs.enqueue('noop', priority=5)
+        jobs.enqueue('noop', priority=9, run_at=timezone.now() + timedelta(hours=1))
+        job = jobs.claim('w1')
+        self.assertEqual(job.pk, urgent.pk)
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'w1', 1))
+
+    def test_claimed_job_is_not_handed_out_twice(self):
+        jobs.enqueue('noop')
+        self.assertIsNotNone(jobs.claim('w1'))
+        self.assertIsNone(jobs.claim('w2'))
+
+    def test_concurrency_limit(self):
+        jobs.enqueue('single')
+        jobs.enqueue('single')
+        self.assertIsNotNone(jobs.claim('w1'))
+        self.assertIsNone(jobs.claim('w2'))
+
+    def test_expired_lease_is_handed_out_again(self):
+        job = jobs.enqueue('noop')
+        jobs.claim('w1')
+        later = timezone.now() + jobs.LEASE_TIMEOUT + timedelta(seconds=1)
+        self.assertEqual(jobs.requeue_expired(later), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.PENDING, ''))
+
+    def test_expired_lease_on_last_attempt_fails_the_job(self):
+        job = jobs.enqueue('noop')
+        Job.objects.filter(pk=job.pk).update(attempts=job.max_attempts - 1)
+        jobs.claim('w1')
+        jobs.requeue_expired(timezone.now() + jobs.LEASE_TIMEOUT + timedelta(seconds=1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_renewed_lease_does_not_expire(self):
+        job = jobs.enqueue('noop')
+        claimed = jobs.claim('w1')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - jobs.LEASE_TIMEOUT * 2)
+        self.assertTrue(jobs.renew_lease(claimed))
+        self.assertEqual(jobs.requeue_expired(timezone.now()), 0)
+
+    def test_result_of_a_job_taken_over_is_dropped(self):
+        jobs.enqueue('noop')
+        first = jobs.claim('w1')
+        jobs.requeue_expired(timezone.now() + jobs.LEASE_TIMEOUT + timedelta(seconds=1))
+        second = jobs.claim('w2')
+        self.assertFalse(jobs.renew_lease(first))
+        jobs.execute(first)
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.locked_by), (Job.RUNNING, 'w2'))
+
+    def test_failure_is_retried_with_backoff(self):
+        def boom():
+            raise RuntimeError('boom')
+
+        with _registered(boom=(boom, None)):
+            job = jobs.enqueue('boom')
+            self.assertEqual(jobs.execute(jobs.claim('w1')), Job.PENDING)
+            job.refresh_from_db()
+            self.assertGreater(job.run_at, timezone.now())
+            self.assertIn('RuntimeError: boom', job.last_error)
+
+
+def _local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class ScheduleTests(TestCase):
+    def setUp(self):
+        for patcher in (
+            _registered(nightly=(lambda: None, None)),
+            mock.patch.object(jobs, 'SCHEDULES', [jobs.Schedule('nightly', jobs.Cron('15 3 * * *'), None)]),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def queued(self):
+        return list(Job.objects.filter(task='nightly').order_by('run_at').values_list('run_at', flat=True))
+
+    def test_latest_matching_minute(self):
+        weekly = jobs.Cron('30 3 * * 1')  # Mondays
+        self.assertEqual(weekly.latest(_local(2026, 3, 4, 12, 0)), _local(2026, 3, 2, 3, 30))
+        self.assertEqual(weekly.latest(_local(2026, 3, 2, 3, 30, 45)), _local(2026, 3, 2, 3, 30))
+        self.assertEqual(weekly.latest(_local(2026, 3, 2, 3, 29)), _local(2026, 2, 23, 3, 30))
+
+    def test_slot_is_queued_once_across_workers(self):
+        jobs.enqueue_due(_local(2026, 3, 2, 3, 15, 5), {})
+        jobs.enqueue_due(_local(2026, 3, 2, 3, 15, 40), {})
+        self.assertEqual(self.queued(), [_local(2026, 3, 2, 3, 15)])
+
+    def test_missed_cron_minute_is_caught_up(self):
+        seen = {}
+        jobs.enqueue_due(_local(2026, 3, 1, 3, 15), seen)
+        # Every worker busy through the next 03:15, or restarting: the first pass after queues it
+        jobs.enqueue_due(_local(2026, 3, 2, 4, 40), {})
+        jobs.enqueue_due(_local(2026, 3, 2, 4, 41), seen)
+        self.assertEqual(self.queued(), [_local(2026, 3, 1, 3, 15), _local(2026, 3, 2, 3, 15)])
+        self.assertEqual(PeriodicSlot.objects.get(task='nightly').slot, _local(2026, 3, 2, 3, 15))
+
+    def test_only_the_latest_missed_slot_runs(self):
+        jobs.enqueue_due(_local(2026, 3, 1, 3, 15), {})
+        jobs.enqueue_due(_local(2026, 3, 5, 9, 0), {})
+        self.assertEqual(self.queued(), [_local(2026, 3, 1, 3, 15), _local(2026, 3, 5, 3, 15)])
+
+
+class HeartbeatTests(TransactionTestCase):
+    def test_long_job_keeps_its_lease(self):
+        seen = []
+
+        def slow():
+            time.sleep(0.5)
+            seen.append(Job.objects.get(task='slow').locked_at)
+
+        with _registered(slow=(slow, None)), mock.patch.object(jobs, 'HEARTBEAT_INTERVAL', timedelta(seconds=0.1)):
+            jobs.enqueue('slow')
+            job = jobs.claim('w1')
+            self.assertEqual(jobs.execute(job), Job.DONE)
+        self.assertGreater(seen[0], job.locked_at)
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_locked_candidate_is_skipped(self):
+        with _registered(noop=(lambda: None, None)):
+            first = jobs.enqueue('noop', priority=5)
+            second = jobs.enqueue('noop')
+            claimed = []
+
+            def other_worker():
+                try:
+                    claimed.append(jobs.claim('w2'))
+                finally:
+                    connection.close()
+
+            with transaction.atomic():
+                Job.objects.select_for_update().get(pk=first.pk)
+                thread = threading.Thread(target=other_worker)
+                thread.start()
+                thread.join()
+        self.assertEqual(claimed[0].pk, second.pk)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from care_app import outbox
+from care_app.models import ElderProfile, IncidentReport, Notification, OutboxEvent
+
+
+class OutboxTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        guardian = User.objects.create_user('alice')
+        self.elder = ElderProfile.objects.create(guardian=guardian, full_name='Ada Lovelace')
+
+    def test_events_with_the_same_text_are_all_delivered(self):
+        for _ in range(2):
+            outbox.enqueue_notification(self.elder, 'New incident reported: FALL', notification_type='INCIDENT')
+        self.assertEqual(outbox.process_batch(), 2)
+        self.assertEqual(Notification.objects.filter(elder=self.elder).count(), 2)
+
+    def test_repeated_action_is_delivered_once(self):
+        incident = IncidentReport(pk=7)
+        key = outbox.action_key(incident, 'reported')
+        outbox.enqueue_notification(self.elder, 'first', key=key)
+        outbox.process_batch()
+        outbox.enqueue_notification(self.elder, 'second', key=key)
+        outbox.process_batch()
+        self.assertEqual(list(Notification.objects.values_list('message', flat=True)), ['first'])
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by('pk').values_list('status', flat=True)),
+            [OutboxEvent.DONE, OutboxEvent.SKIPPED],
+        )
+
+    def test_event_already_delivered_is_not_delivered_again(self):
+        event = outbox.enqueue_notification(self.elder, 'Fall')
+        # The notification committed on its shard but the DONE status did not
+        Notification.objects.create(elder=self.elder, message='Fall', outbox_event_id=event.pk)
+        outbox.process_batch()
+        self.assertEqual(Notification.objects.count(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.status, OutboxEvent.DONE)
+
+    def test_failing_event_is_retried_then_parked(self):
+        event = outbox.enqueue_notification(self.elder, 'Fall')
+        failing = mock.Mock(side_effect=RuntimeError('boom'))
+        with mock.patch.dict(outbox.HANDLERS, {OutboxEvent.NOTIFICATION: failing}):
+            for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+                OutboxEvent.objects.filter(pk=event.pk).update(available_at=event.created_at)
+                outbox.process_batch()
+                event.refresh_from_db()
+                self.assertEqual(event.attempts, attempt)
+        self.assertEqual(event.status, OutboxEvent.FAILED)
+        self.assertEqual(event.last_error, 'RuntimeError: boom')
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_bad_event_does_not_hold_back_the_batch(self):
+        good = outbox.enqueue_notification(self.elder, 'ok')
+        bad = outbox.enqueue_notification(self.elder, 'bad')
+        original = outbox._deliver_notifications
+
+        def deliver(events):
+            if any(event.pk == bad.pk for event in events):
+                raise RuntimeError('boom')
+            return original(events)
+
+        with mock.patch.dict(outbox.HANDLERS, {OutboxEvent.NOTIFICATION: deliver}):
+            outbox.process_batch()
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual((good.status, bad.status), (OutboxEvent.DONE, OutboxEvent.PENDING))
+        self.assertEqual(bad.attempts, 1)
+        self.assertGreater(bad.available_at, bad.created_at)
+
+    def test_event_of_deleted_elder_is_skipped(self):
+        event = outbox.enqueue_notification(self.elder, 'Fall')
+        self.elder.delete()
+        outbox.process_batch()
+        event.refresh_from_db()
+        self.assertEqual(event.status, OutboxEvent.SKIPPED)
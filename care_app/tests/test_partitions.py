@@ -0,0 +1,146 @@
+from datetime import date, datetime, timezone as dt_timezone
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from care_app import partitions
+from care_app.models import ElderProfile, VitalsLog
+
+TABLE = VitalsLog._meta.db_table
+
+
+def _at(year, month, day=10):
+    return datetime(year, month, day, 12, tzinfo=dt_timezone.utc)
+
+
+def _partition(year, month):
+    return partitions.partition_name(TABLE, date(year, month, 1))
+
+
+def _rows_in(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT id FROM {connection.ops.quote_name(table)} ORDER BY id')
+        return [pk for (pk,) in cursor.fetchall()]
+
+
+def _relkind(table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        return cursor.fetchone()[0]
+
+
+class _Elder:
+    databases = '__all__'
+
+    def setUp(self):
+        super().setUp()
+        self.guardian = User.objects.create_user('alice')
+        self.elder = ElderProfile.objects.create(guardian=self.guardian, full_name='Ada Lovelace')
+
+    def log(self, when, **values):
+        return VitalsLog.objects.create(elder=self.elder, recorded_at=when, heart_rate=70, **values)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'the month tables behind a view are SQLite only')
+class SQLiteViewTests(_Elder, TestCase):
+    def test_rows_go_to_the_table_of_their_month(self):
+        march, april = self.log(_at(2025, 3)), self.log(_at(2025, 4))
+        self.assertEqual(_rows_in(_partition(2025, 3)), [march.pk])
+        self.assertEqual(_rows_in(_partition(2025, 4)), [april.pk])
+        self.assertEqual(set(VitalsLog.objects.values_list('pk', flat=True)), {march.pk, april.pk})
+
+    def test_update_moves_a_row_to_its_new_month(self):
+        march = self.log(_at(2025, 3))
+        self.log(_at(2025, 4))
+        VitalsLog.objects.filter(pk=march.pk).update(recorded_at=_at(2025, 4, 20))
+        self.assertEqual(_rows_in(_partition(2025, 3)), [])
+        self.assertIn(march.pk, _rows_in(_partition(2025, 4)))
+
+    def test_row_without_a_month_is_refused(self):
+        march = self.log(_at(2025, 3))
+        # A queryset update does not create the partition of the month it moves a row to
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VitalsLog.objects.filter(pk=march.pk).update(recorded_at=_at(2019, 1))
+        self.assertEqual(VitalsLog.objects.get(pk=march.pk).recorded_at, _at(2025, 3))
+
+    def test_ids_come_from_the_counter(self):
+        first, second = self.log(_at(2025, 3)), self.log(_at(2025, 4))
+        self.assertEqual(second.pk, first.pk + 1)
+        self.assertTrue(partitions.set_last_id(VitalsLog, second.pk + 100, 'default'))
+        self.assertEqual(self.log(_at(2025, 3)).pk, second.pk + 101)
+        bulk = VitalsLog.objects.bulk_create([
+            VitalsLog(elder=self.elder, recorded_at=_at(2024, 12), heart_rate=60) for _ in range(2)
+        ])
+        self.assertEqual([obj.pk for obj in bulk], [second.pk + 102, second.pk + 103])
+
+    def test_update_and_delete_count_their_rows(self):
+        for month in (3, 4, 5):
+            self.log(_at(2025, month))
+        logs = VitalsLog.objects.filter(elder=self.elder)
+        self.assertEqual(logs.update(notes='checked'), 3)
+        self.assertEqual(logs.filter(recorded_at__month__gte=4).update(notes='again'), 2)
+        deleted, per_model = logs.delete()
+        self.assertEqual((deleted, per_model[VitalsLog._meta.label]), (3, 3))
+        self.assertFalse(VitalsLog.objects.exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'the month tables behind a view are SQLite only')
+class SQLiteMigrateTests(_Elder, TransactionTestCase):
+    def tearDown(self):
+        # flush empties tables, and the view is none: its rows would still point at the elder
+        VitalsLog.objects.all().delete()
+        super().tearDown()
+
+    def assertSplit(self, split):
+        tables = connection.introspection.table_names()
+        self.assertEqual(TABLE not in tables, split)
+        self.assertEqual(partitions.attached_months(VitalsLog, 'default') is not None, split)
+
+    def test_fold_and_split_keep_rows_and_ids(self):
+        march, april = self.log(_at(2025, 3)), self.log(_at(2025, 4))
+        partitions.fold_tables('default')
+        self.assertSplit(False)
+        self.assertEqual(_rows_in(TABLE), [march.pk, april.pk])
+        partitions.split_tables('default')
+        self.assertSplit(True)
+        self.assertEqual(_rows_in(_partition(2025, 3)), [march.pk])
+        self.assertEqual(self.log(_at(2025, 3)).pk, april.pk + 1)
+
+    def test_migrate_folds_and_splits_again(self):
+        march, april = self.log(_at(2025, 3)), self.log(_at(2025, 4))
+        call_command('migrate', 'care_app', '0022', verbosity=0)
+        self.assertSplit(False)
+        self.assertEqual(_rows_in(TABLE), [march.pk, april.pk])
+        call_command('migrate', 'care_app', verbosity=0)
+        self.assertSplit(True)
+        self.assertEqual(_rows_in(_partition(2025, 4)), [april.pk])
+        self.assertEqual(self.log(_at(2025, 4)).pk, april.pk + 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL partitioning')
+class PostgreSQLPartitionTests(_Elder, TransactionTestCase):
+    def test_logs_are_partitioned_by_month(self):
+        self.assertEqual(_relkind(TABLE), 'p')
+        march = self.log(_at(2025, 3))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT tableoid::regclass::text FROM {TABLE} WHERE id = %s', [march.pk])
+            self.assertEqual(cursor.fetchone()[0], _partition(2025, 3))
+        self.assertEqual(VitalsLog.objects.filter(elder=self.elder).update(notes='checked'), 1)
+
+    def test_migration_converts_both_ways(self):
+        march, april = self.log(_at(2025, 3)), self.log(_at(2025, 4))
+        call_command('migrate', 'care_app', '0022', verbosity=0)
+        self.assertEqual(_relkind(TABLE), 'r')
+        self.assertEqual(_rows_in(TABLE), [march.pk, april.pk])
+        self.assertIsNone(partitions.attached_months(VitalsLog, 'default'))
+
+        call_command('migrate', 'care_app', verbosity=0)
+        self.assertEqual(_relkind(TABLE), 'p')
+        self.assertEqual(_rows_in(_partition(2025, 3)), [march.pk])
+        self.assertLessEqual(
+            {date(2025, month, 1) for month in (3, 4)}, partitions.attached_months(VitalsLog, 'default')
+        )
+        self.assertGreater(self.log(_at(2025, 3)).pk, april.pk)
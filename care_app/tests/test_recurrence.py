@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from care_app import recurrence
+from care_app.models import CareTask, ChangeLogEntry, ElderProfile
+
+
+@override_settings(ROOT_URLCONF='care_app.tests.urls')
+class SweepOverdueTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.guardian = User.objects.create_user('alice', password='x')
+        self.elder = ElderProfile.objects.create(guardian=self.guardian, full_name='Ada Lovelace')
+        yesterday = timezone.now() - timedelta(days=1)
+        self.late = CareTask.objects.create(
+            elder=self.elder, title='Refill pill box', description='Weekly', status='PENDING', due_date=yesterday
+        )
+        self.done = CareTask.objects.create(
+            elder=self.elder, title='Call pharmacy', description='Refill', status='COMPLETED', due_date=yesterday
+        )
+        CareTask.objects.create(
+            elder=self.elder, title='Walk', description='Walk', status='PENDING', due_date=timezone.now() + timedelta(days=1)
+        )
+
+    def test_marks_late_open_tasks(self):
+        logged = ChangeLogEntry.objects.count()
+        self.assertEqual(recurrence.sweep_overdue(batch_size=1), 1)
+        self.late.refresh_from_db()
+        self.assertEqual(self.late.status, 'OVERDUE')
+        self.assertEqual(
+            list(ChangeLogEntry.objects.order_by('pk')[logged:].values_list('object_id', flat=True)), [self.late.pk]
+        )
+        self.assertEqual(recurrence.sweep_overdue(), 0)
+
+    def test_dashboard_lists_overdue_tasks(self):
+        recurrence.sweep_overdue()
+        self.client.force_login(self.guardian)
+        response = self.client.get('/')
+        self.assertContains(response, 'Refill pill box')
+        self.assertNotContains(response, 'Call pharmacy')
@@ -0,0 +1,109 @@
+from datetime import timedelta
+from unittest import mock, skipIf
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from care_app import changelog, sharding
+from care_app.models import CareTask, ElderProfile, ElderShard, ElderShardUser, VitalsLog
+
+SHARDS = sharding.shard_aliases()
+
+
+@skipIf(len(SHARDS) < 2, 'needs settings.CARE_SHARDS with at least two shards')
+@override_settings(ROOT_URLCONF='care_app.tests.urls')
+class ShardingTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.home, self.other = SHARDS[0], SHARDS[1]
+        for alias in SHARDS:
+            sharding.seed_sequences(alias)
+        self.guardian = User.objects.create_user('alice')
+        with sharding.use_shard(self.home):
+            self.elder = ElderProfile.objects.create(guardian=self.guardian, full_name='Ada Lovelace')
+            self.task = CareTask.objects.create(elder=self.elder, title='Walk', description='Walk', status='PENDING')
+            self.vital = VitalsLog.objects.create(elder=self.elder, heart_rate=70)
+
+    def test_new_elder_is_placed_in_the_directory(self):
+        self.assertEqual(self.elder._state.db, self.home)
+        self.assertEqual(ElderShard.objects.get(elder_id=self.elder.pk).shard, self.home)
+        self.assertEqual(sharding.locate(ElderProfile, self.elder.pk), self.home)
+        first, last = sharding.id_range(self.home)
+        self.assertTrue(first <= self.task.pk <= last)
+
+    def test_queries_from_an_elder_go_to_its_shard(self):
+        with sharding.use_shard(self.other):
+            self.assertEqual(list(self.elder.care_tasks.values_list('pk', flat=True)), [self.task.pk])
+            self.assertFalse(CareTask.objects.filter(pk=self.task.pk).exists())
+            with sharding.for_elder(self.elder.pk):
+                self.assertTrue(CareTask.objects.filter(pk=self.task.pk).exists())
+
+    def test_move_elder_keeps_ids(self):
+        moved = sharding.move_elder(self.elder.pk, self.other)
+        self.assertEqual(moved['care_app.CareTask'], 1)
+        self.assertEqual(sharding.locate(ElderProfile, self.elder.pk), self.other)
+        self.assertTrue(CareTask.objects.using(self.other).filter(pk=self.task.pk).exists())
+        self.assertFalse(CareTask.objects.using(self.home).filter(pk=self.task.pk).exists())
+        self.assertTrue(VitalsLog.objects.using(self.other).filter(pk=self.vital.pk).exists())
+
+    def test_directory_records_guardian_and_caregivers(self):
+        caregiver = User.objects.create_user('carol')
+        self.elder.caregivers.add(caregiver)
+        members = set(ElderShardUser.objects.filter(elder_id=self.elder.pk).values_list('user_id', flat=True))
+        self.assertEqual(members, {self.guardian.pk, caregiver.pk})
+        self.elder.caregivers.remove(caregiver)
+        self.assertEqual(list(ElderShardUser.objects.filter(elder_id=self.elder.pk).values_list('user_id', flat=True)),
+                         [self.guardian.pk])
+        self.assertEqual(sharding.user_shards(self.guardian), [self.home])
+
+    def test_user_shards_follow_a_moved_elder(self):
+        caregiver = User.objects.create_user('carol')
+        self.elder.caregivers.add(caregiver)
+        sharding.move_elder(self.elder.pk, self.other)
+        with sharding.use_shard(self.home):
+            self.assertEqual(sharding.user_shards(self.guardian), [self.home, self.other])
+            self.assertEqual(sharding.user_shards(caregiver), [self.home, self.other])
+
+    def test_pages_of_a_guardian_show_moved_elders(self):
+        sharding.move_elder(self.elder.pk, self.other)
+        self.client.force_login(self.guardian)
+        for url in ['/', '/elders/', '/tasks/', '/vitals/']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            self.assertIn(b'Ada Lovelace', content, url)
+        data = self.client.get('/api/v1/elders/').json()['data']
+        self.assertEqual([row['id'] for row in data], [self.elder.pk])
+        self.assertEqual(self.client.get(f'/api/v1/elders/{self.elder.pk}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/v1/tasks/{self.task.pk}/').status_code, 200)
+
+    def test_sync_feed_covers_moved_elders(self):
+        with mock.patch.object(changelog, 'SETTLE_DELAY', timedelta(0)):
+            self.client.force_login(self.guardian)
+            token = self.client.get('/api/v1/changes/').json()['next']
+            sharding.move_elder(self.elder.pk, self.other)
+            with sharding.for_elder(self.elder.pk):
+                task = CareTask.objects.get(pk=self.task.pk)
+                task.status = 'COMPLETED'
+                task.save()
+            feed = self.client.get('/api/v1/changes/', {'since': token}).json()
+        self.assertEqual([row['id'] for row in feed['changes']['tasks']['upserts']], [self.task.pk])
+
+    def test_cross_shard_merge_keeps_the_order(self):
+        with sharding.use_shard(self.other):
+            later = ElderProfile.objects.create(guardian=self.guardian, full_name='Grace Hopper',
+                                                date_of_birth=timezone.localdate() - timedelta(days=365 * 80))
+        ElderProfile.objects.using(self.home).filter(pk=self.elder.pk).update(
+            date_of_birth=timezone.localdate() - timedelta(days=365 * 90)
+        )
+        with sharding.use_shard(self.home):
+            blank = ElderProfile.objects.create(guardian=self.guardian, full_name='Alan Turing')
+        elders = ElderProfile.objects.filter(guardian=self.guardian)
+        youngest = elders.order_by(F('date_of_birth').desc(nulls_last=True), 'full_name').across_shards()
+        self.assertEqual([elder.pk for elder in youngest], [later.pk, self.elder.pk, blank.pk])
+        self.assertEqual([elder.pk for elder in youngest.iterator()], [later.pk, self.elder.pk, blank.pk])
+        names = elders.order_by('-full_name').values_list('full_name', flat=True).across_shards()
+        self.assertEqual(list(names), ['Grace Hopper', 'Alan Turing', 'Ada Lovelace'])
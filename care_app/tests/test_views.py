@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from care_app.models import ElderProfile, UserProfile
+
+
+@override_settings(ROOT_URLCONF='care_app.tests.urls')
+class AppointmentAccessTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.elder = ElderProfile.objects.create(guardian=self.alice, full_name='Ada Lovelace')
+
+    def _free_slot(self, user):
+        self.client.force_login(user)
+        return self.client.get('/appointments/free-slot/', {'elder': self.elder.pk, 'doctor': 'Smith'})
+
+    def test_free_slot_of_own_elder(self):
+        response = self._free_slot(self.alice)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('start', response.json())
+
+    def test_free_slot_of_another_users_elder_is_not_found(self):
+        self.assertEqual(self._free_slot(self.bob).status_code, 404)
+
+    def test_administrator_sees_every_elder(self):
+        UserProfile.objects.create(user=self.bob, user_type='ADMIN')
+        self.assertEqual(self._free_slot(self.bob).status_code, 200)
+
+    def test_calendar_of_another_users_elder_is_not_found(self):
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get(f'/elders/{self.elder.pk}/appointments/calendar/').status_code, 404)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(f'/elders/{self.elder.pk}/appointments/calendar/').status_code, 200)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     # Dashboard and main views
@@ -15,6 +15,7 @@ urlpatterns = [
     # Medication management
     path('medications/', views.medication_list, name='medication_list'),
     path('medications/add/', views.medication_add, name='medication_add'),
+    path('medications/autocomplete/', views.medication_autocomplete, name='medication_autocomplete'),
     path('medications/<int:medication_id>/edit/', views.medication_edit, name='medication_edit'),
     path('medications/<int:medication_id>/delete/', views.medication_delete, name='medication_delete'),
     path('medications/schedule/add/', views.med_schedule_add, name='med_schedule_add'),
@@ -25,9 +26,14 @@ urlpatterns = [
     # Appointment management
     path('appointments/', views.appointment_list, name='appointment_list'),
     path('appointments/add/', views.appointment_add, name='appointment_add'),
+    path('appointments/calendar/', views.appointment_calendar, name='appointment_calendar'),
+    path('appointments/free-slot/', views.appointment_free_slot, name='appointment_free_slot'),
     path('appointments/<int:appointment_id>/edit/', views.appointment_edit, name='appointment_edit'),
     path('appointments/<int:appointment_id>/delete/', views.appointment_delete, name='appointment_delete'),
     path('elders/<int:elder_id>/appointments/', views.appointment_list, name='elder_appointments'),
+    path('elders/<int:elder_id>/appointments/calendar/', views.appointment_calendar, name='elder_appointment_calendar'),
+    path('calendar/feeds/', views.calendar_feeds, name='calendar_feeds'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     
     # Care task management
     path('tasks/', views.care_task_list, name='care_task_list'),
@@ -69,4 +75,9 @@ urlpatterns = [
     # User management
     path('profile/', views.user_profile, name='user_profile'),
     path('register/', views.register, name='register'),
+    
+    # Read API
+    path('api/v1/changes/', api.api_changes, name='api_changes'),
+    path('api/v1/<str:resource_name>/', api.api_list, name='api_list'),
+    path('api/v1/<str:resource_name>/<int:pk>/', api.api_detail, name='api_detail'),
 ]
@@ -2,22 +2,37 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Q, Count
+from django.http import JsonResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.db.models import Q, Count, Max
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 import json
 
 from .models import (
     ElderProfile, MedicationSchedule, Notification, Medication, 
     MedicationLog, Appointment, CareTask, EmergencyContact, 
-    VitalsLog, IncidentReport, UserProfile
+    VitalsLog, IncidentReport, UserProfile, CalendarFeed, new_feed_token
 )
 from .forms import (
     MedicationScheduleForm, MedicationForm, ElderForm, AppointmentForm,
     CareTaskForm, EmergencyContactForm, VitalsLogForm, IncidentReportForm,
     NotificationForm, UserProfileForm, UserRegistrationForm, QuickVitalsForm,
-    SearchForm
+    SearchForm, ElderFilterForm
+)
+from .summary import load_care_summary
+from .changelog import record_changes
+from .outbox import action_key, enqueue_notification
+from .streaming import stream_render
+from .replicas import replica_reads
+from .recurrence import start_series, generate_occurrences
+from . import archive, catalog, ics, scheduling, screening, sharding, workload
+from .conditional import (
+    across_scope, conditional_page, elder_detail_validator, scoped_elders, vitals_list_validator,
+    notification_list_validator,
 )
 
 @login_required
@@ -36,51 +51,53 @@ def dashboard(request):
             appointment_date__gte=timezone.now(),
             status__in=['SCHEDULED', 'CONFIRMED']
         ).order_by('appointment_date')[:5]
-        pending_tasks = CareTask.objects.filter(status='PENDING').order_by('priority', 'due_date')[:10]
+        pending_tasks = CareTask.objects.filter(status__in=workload.OPEN_STATUSES).order_by('priority_rank', 'due_date')[:10]
         recent_incidents = IncidentReport.objects.filter(is_resolved=False).order_by('-incident_date')[:5]
     else:
-        # For caregivers, show only assigned elders
+        # For caregivers, show only assigned elders, from every shard holding one
         elders = ElderProfile.objects.filter(guardian=request.user)
-        total_elders = elders.count()
-        upcoming_appointments = Appointment.objects.filter(
+        total_elders = across_scope(request, elders).count()
+        upcoming_appointments = across_scope(request, Appointment.objects.filter(
             elder__in=elders,
             appointment_date__gte=timezone.now(),
             status__in=['SCHEDULED', 'CONFIRMED']
-        ).order_by('appointment_date')[:5]
-        pending_tasks = CareTask.objects.filter(
+        ).order_by('appointment_date'))[:5]
+        pending_tasks = across_scope(request, CareTask.objects.filter(
             elder__in=elders,
-            status='PENDING'
-        ).order_by('priority', 'due_date')[:10]
-        recent_incidents = IncidentReport.objects.filter(
+            status__in=workload.OPEN_STATUSES
+        ).order_by('priority_rank', 'due_date'))[:10]
+        recent_incidents = across_scope(request, IncidentReport.objects.filter(
             elder__in=elders,
             is_resolved=False
-        ).order_by('-incident_date')[:5]
+        ).order_by('-incident_date'))[:5]
     
     # Get notifications
-    notifications = Notification.objects.filter(
+    notifications = across_scope(request, Notification.objects.filter(
         Q(elder__in=elders) | Q(elder__isnull=True),
         is_read=False
-    ).order_by('-created_at')[:10]
+    ).order_by('-created_at'))[:10]
     
     # Get today's medication schedules
     today = timezone.now().date()
-    today_medications = MedicationSchedule.objects.filter(
+    today_medications = across_scope(request, MedicationSchedule.objects.filter(
         elder__in=elders,
         is_active=True,
         start_date__lte=today
     ).filter(
         Q(end_date__isnull=True) | Q(end_date__gte=today)
-    )
+    ))
     
-    # Get vitals due today
-    vitals_due = []
-    for elder in elders:
-        last_vitals = VitalsLog.objects.filter(elder=elder).order_by('-recorded_at').first()
-        if not last_vitals or (today - last_vitals.recorded_at.date()).days >= 7:
-            vitals_due.append(elder)
+    # Get vitals due today (no reading within the last week); left lazy so a
+    # cached dashboard fragment never runs the query
+    week_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=6)
+    vitals_due = across_scope(request, elders.annotate(
+        last_recorded=Max('vitals_logs__recorded_at')
+    ).filter(
+        Q(last_recorded__isnull=True) | Q(last_recorded__lt=week_start)
+    ))
     
     context = {
-        'elders': elders,
+        'elders': across_scope(request, elders),
         'total_elders': total_elders,
         'upcoming_appointments': upcoming_appointments,
         'pending_tasks': pending_tasks,
@@ -89,12 +106,14 @@ def dashboard(request):
         'today_medications': today_medications,
         'vitals_due': vitals_due,
         'user_profile': user_profile,
+        'today': today,
     }
     return render(request, 'dashboard.html', context)
 
 @login_required
 def elder_list(request):
     search_form = SearchForm(request.GET)
+    filter_form = ElderFilterForm(request.GET)
     query = request.GET.get('query', '')
     category = request.GET.get('category', 'all')
     
@@ -107,6 +126,9 @@ def elder_list(request):
     except UserProfile.DoesNotExist:
         elders = ElderProfile.objects.filter(guardian=request.user)
     
+    # Card counts are annotated onto the elder rows instead of three queries per card
+    elders = elders.select_related('guardian').with_summary_counts()
+    
     if query:
         if category == 'elders' or category == 'all':
             elders = elders.filter(
@@ -114,46 +136,37 @@ def elder_list(request):
                 Q(medical_conditions__icontains=query) |
                 Q(address__icontains=query)
             )
+    # Age bands filter on date_of_birth ranges, which its index answers
+    elders = across_scope(request, filter_form.filter(elders))
     
     context = {
         'elders': elders,
         'search_form': search_form,
+        'filter_form': filter_form,
         'query': query,
     }
-    return render(request, 'elder_list.html', context)
+    return stream_render(request, 'elder_list.html', context)
 
 @login_required
+@conditional_page(elder_detail_validator)
 def elder_detail(request, elder_id):
-    elder = get_object_or_404(ElderProfile, pk=elder_id)
+    # Everything the page shows comes from the elder's care summary document
+    context = load_care_summary(elder_id)
+    if context is None:
+        raise Http404("Elder not found.")
+    elder = context['elder']
     
     # Check if user has access to this elder
     try:
         user_profile = request.user.profile
-        if user_profile and user_profile.user_type != 'ADMIN' and elder.guardian != request.user:
+        if user_profile and user_profile.user_type != 'ADMIN' and elder.guardian_id != request.user.pk:
             messages.error(request, "You don't have permission to view this elder's details.")
             return redirect('elder_list')
     except UserProfile.DoesNotExist:
-        if elder.guardian != request.user:
+        if elder.guardian_id != request.user.pk:
             messages.error(request, "You don't have permission to view this elder's details.")
             return redirect('elder_list')
     
-    # Get related data
-    medications = MedicationSchedule.objects.filter(elder=elder, is_active=True)
-    appointments = Appointment.objects.filter(elder=elder).order_by('-appointment_date')[:10]
-    care_tasks = CareTask.objects.filter(elder=elder).order_by('-created_at')[:10]
-    emergency_contacts = EmergencyContact.objects.filter(elder=elder)
-    recent_vitals = VitalsLog.objects.filter(elder=elder).order_by('-recorded_at')[:5]
-    recent_incidents = IncidentReport.objects.filter(elder=elder).order_by('-incident_date')[:5]
-    
-    context = {
-        'elder': elder,
-        'medications': medications,
-        'appointments': appointments,
-        'care_tasks': care_tasks,
-        'emergency_contacts': emergency_contacts,
-        'recent_vitals': recent_vitals,
-        'recent_incidents': recent_incidents,
-    }
     return render(request, 'elder_detail.html', context)
 
 @login_required
@@ -193,7 +206,10 @@ def elder_edit(request, elder_id):
     if request.method == 'POST':
         form = ElderForm(request.POST, instance=elder)
         if form.is_valid():
-            form.save()
+            with sharding.atomic():
+                form.save()
+                if 'allergies' in form.changed_data:
+                    screening.rescan([elder.pk])
             messages.success(request, f'Elder profile for {elder.full_name} updated successfully!')
             return redirect('elder_detail', elder_id=elder.pk)
     else:
@@ -203,10 +219,11 @@ def elder_edit(request, elder_id):
     return render(request, 'elder_form.html', context)
 
 @login_required
+@replica_reads
 def medication_list(request, elder_id=None):
     if elder_id:
         elder = get_object_or_404(ElderProfile, pk=elder_id)
-        medications = Medication.objects.filter(medicationschedule__elder=elder).distinct()
+        medications = Medication.objects.filter(pk__in=MedicationSchedule.objects.filter(elder=elder).values('medication_id'))
         elders = [elder]
     else:
         elder = None
@@ -217,14 +234,36 @@ def medication_list(request, elder_id=None):
                 elders = ElderProfile.objects.all()
             else:
                 elders = ElderProfile.objects.filter(guardian=request.user)
-                medications = Medication.objects.filter(medicationschedule__elder__in=elders).distinct()
+                medications = _medications_of(request, elders)
         except UserProfile.DoesNotExist:
             elders = ElderProfile.objects.filter(guardian=request.user)
-            medications = Medication.objects.filter(medicationschedule__elder__in=elders).distinct()
+            medications = _medications_of(request, elders)
+        elders = across_scope(request, elders)
     
     context = {'elder': elder, 'medications': medications, 'elders': elders}
     return render(request, 'medication_list.html', context)
 
+def _medications_of(request, elders):
+    # Schedules live on the elders' shards and medications on every one, so the ids are collected first
+    schedules = across_scope(request, MedicationSchedule.objects.filter(elder__in=elders))
+    return Medication.objects.filter(pk__in=set(schedules.values_list('medication_id', flat=True)))
+
+@login_required
+def medication_autocomplete(request):
+    try:
+        limit = min(max(int(request.GET.get('limit') or 10), 1), 50)
+    except ValueError:
+        limit = 10
+    results = catalog.search(request.GET.get('q', ''), limit)
+    return JsonResponse({'results': [
+        {
+            'id': entry.id, 'name': entry.name, 'strength': entry.strength,
+            'manufacturer': entry.manufacturer, 'medication_type': entry.medication_type,
+            'label': catalog.label(entry),
+        }
+        for entry in results
+    ]})
+
 @login_required
 def medication_add(request):
     if request.method == 'POST':
@@ -294,7 +333,9 @@ def med_schedule_add(request):
     if request.method == 'POST':
         form = MedicationScheduleForm(request.POST)
         if form.is_valid():
-            schedule = form.save()
+            with sharding.atomic():
+                schedule = form.save()
+                screening.notify((schedule.elder_id, message) for message in schedule.screening_warnings)
             messages.success(request, f'Medication schedule for {schedule.medication.name} created successfully!')
             return redirect('elder_detail', elder_id=schedule.elder.pk)
     else:
@@ -317,16 +358,18 @@ def medication_log(request, schedule_id):
             log = form.save(commit=False)
             log.schedule = schedule
             log.taken_by = request.user
-            log.save()
-            
-            # Create notification if medication was skipped
-            if log.was_skipped:
-                Notification.objects.create(
-                    elder=schedule.elder,
-                    notification_type='MEDICATION',
-                    message=f'Medication {schedule.medication.name} was skipped. Reason: {log.skip_reason}',
-                    priority='HIGH'
-                )
+            with sharding.atomic():
+                log.save()
+                
+                # Notify if medication was skipped
+                if log.was_skipped:
+                    enqueue_notification(
+                        schedule.elder,
+                        f'Medication {schedule.medication.name} was skipped. Reason: {log.skip_reason}',
+                        notification_type='MEDICATION',
+                        priority='HIGH',
+                        key=action_key(log, 'skipped')
+                    )
             
             messages.success(request, 'Medication log updated successfully!')
             return redirect('elder_detail', elder_id=schedule.elder.pk)
@@ -337,6 +380,7 @@ def medication_log(request, schedule_id):
     return render(request, 'medication_log_form.html', context)
 
 @login_required
+@replica_reads
 def appointment_list(request, elder_id=None):
     if elder_id:
         elder = get_object_or_404(ElderProfile, pk=elder_id)
@@ -353,10 +397,177 @@ def appointment_list(request, elder_id=None):
         except UserProfile.DoesNotExist:
             elders = ElderProfile.objects.filter(guardian=request.user)
             appointments = Appointment.objects.filter(elder__in=elders).order_by('-appointment_date')
+        appointments = across_scope(request, appointments)
     
     context = {'appointments': appointments, 'elder': elder}
     return render(request, 'appointment_list.html', context)
 
+@login_required
+@replica_reads
+def appointment_calendar(request, elder_id=None):
+    if elder_id:
+        # The user's own elders, or any for an administrator
+        elders = scoped_elders(request)
+        elder = get_object_or_404(ElderProfile if elders is None else elders, pk=elder_id)
+        appointments = Appointment.objects.filter(elder=elder)
+    else:
+        elder = None
+        try:
+            user_profile = request.user.profile
+            if user_profile and user_profile.user_type == 'ADMIN':
+                appointments = Appointment.objects.all()
+            else:
+                elders = ElderProfile.objects.filter(guardian=request.user)
+                appointments = Appointment.objects.filter(elder__in=elders)
+        except UserProfile.DoesNotExist:
+            elders = ElderProfile.objects.filter(guardian=request.user)
+            appointments = Appointment.objects.filter(elder__in=elders)
+        appointments = across_scope(request, appointments)
+    
+    view = request.GET.get('view', 'week')
+    if view not in scheduling.CALENDAR_VIEWS:
+        view = 'week'
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        day = timezone.localdate()
+    first, after, previous_day, next_day = scheduling.calendar_range(view, day)
+    if view == 'month':
+        # Month pages show whole weeks
+        grid_first = first - timedelta(days=first.weekday())
+        grid_after = after + timedelta(days=-after.weekday() % 7)
+    else:
+        grid_first, grid_after = first, after
+    
+    by_day = defaultdict(list)
+    for appointment in scheduling.overlapping(
+        appointments.select_related('elder'),
+        timezone.make_aware(datetime.combine(grid_first, datetime.min.time())),
+        timezone.make_aware(datetime.combine(grid_after, datetime.min.time())),
+    ):
+        by_day[timezone.localtime(appointment.appointment_date).date()].append(appointment)
+    days = [grid_first + timedelta(days=offset) for offset in range((grid_after - grid_first).days)]
+    weeks = [
+        [{'date': d, 'appointments': by_day.get(d, []), 'outside': not first <= d < after} for d in days[i:i + 7]]
+        for i in range(0, len(days), 7)
+    ]
+    
+    context = {
+        'elder': elder,
+        'view': view,
+        'views': scheduling.CALENDAR_VIEWS,
+        'day': day,
+        'first': first,
+        'last': after - timedelta(days=1),
+        'previous_day': previous_day,
+        'next_day': next_day,
+        'today': timezone.localdate(),
+        'weeks': weeks,
+    }
+    return render(request, 'appointment_calendar.html', context)
+
+@login_required
+def appointment_free_slot(request):
+    # Busy times of other users' elders and their doctors are not for everyone to probe
+    elders = scoped_elders(request)
+    elder = get_object_or_404(ElderProfile if elders is None else elders, pk=request.GET.get('elder') or 0)
+    try:
+        duration = int(request.GET.get('duration') or 30)
+        after = datetime.fromisoformat(request.GET['after']) if request.GET.get('after') else timezone.now()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid duration or start time.'}, status=400)
+    if not 1 <= duration <= Appointment.MAX_DURATION_MINUTES:
+        return JsonResponse({'error': 'Invalid duration or start time.'}, status=400)
+    if timezone.is_naive(after):
+        after = timezone.make_aware(after)
+    exclude_pk = request.GET.get('appointment')
+    slot = scheduling.next_free_slot(
+        elder.pk, request.GET.get('doctor', '').strip(), duration, after,
+        exclude_pk=int(exclude_pk) if exclude_pk and exclude_pk.isdigit() else None,
+    )
+    if slot is None:
+        return JsonResponse({'start': None})
+    slot = timezone.localtime(slot)
+    return JsonResponse({
+        'start': slot.strftime('%Y-%m-%dT%H:%M'),
+        'end': (slot + timedelta(minutes=duration)).strftime('%Y-%m-%dT%H:%M'),
+    })
+
+def _calendar_feed_state(request, token):
+    # condition() asks for the ETag and Last-Modified separately; look the feed up once
+    if not hasattr(request, '_calendar_feed'):
+        # No user to say which facility the feed belongs to
+        feed = CalendarFeed.objects.select_related('user', 'elder').across_shards().filter(
+            token=token, user__is_active=True
+        ).first()
+        if feed is None:
+            raise Http404('Calendar feed not found.')
+        sharding.activate(feed._state.db)
+        try:
+            elders = ics.feed_elders(feed)
+        except ElderProfile.DoesNotExist:
+            raise Http404('Calendar feed not found.')
+        request._calendar_feed = (feed, elders, *ics.feed_validators(feed, elders))
+    return request._calendar_feed
+
+@require_safe
+@condition(
+    etag_func=lambda request, token: _calendar_feed_state(request, token)[2],
+    last_modified_func=lambda request, token: _calendar_feed_state(request, token)[3],
+)
+def calendar_feed(request, token):
+    # No login: calendar apps authenticate with the secret token in the URL
+    feed, elders, _, _ = _calendar_feed_state(request, token)
+    response = StreamingHttpResponse(
+        ics.stream_feed(feed, elders, request.get_host()), content_type='text/calendar; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'inline; filename="care-calendar.ics"'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@login_required
+def calendar_feeds(request):
+    elders = ElderProfile.objects.filter(Q(guardian=request.user) | Q(caregivers=request.user)).distinct()
+    if request.method == 'POST':
+        elder = None
+        if request.POST.get('elder'):
+            # The elder's feed lives on the elder's shard
+            sharding.activate(sharding.shard_of_elder(request.POST['elder']))
+            elder = get_object_or_404(ElderProfile, pk=request.POST['elder'])
+            try:
+                ics.feed_elders(CalendarFeed(user=request.user, elder=elder))
+            except ElderProfile.DoesNotExist:
+                raise Http404('Elder not found.')
+        action = request.POST.get('action')
+        feed = CalendarFeed.objects.filter(user=request.user, elder=elder).first()
+        if action == 'create' and feed is None:
+            CalendarFeed.objects.create(user=request.user, elder=elder)
+            messages.success(request, 'Calendar link created.')
+        elif action == 'reset' and feed is not None:
+            feed.token = new_feed_token()
+            feed.save(update_fields=['token'])
+            messages.success(request, 'Calendar link reset; subscribe again with the new link.')
+        elif action == 'delete' and feed is not None:
+            feed.delete()
+            messages.success(request, 'Calendar link removed.')
+        return redirect('calendar_feeds')
+    
+    feeds = {
+        feed.elder_id: feed
+        for feed in across_scope(request, CalendarFeed.objects.filter(user=request.user).select_related('elder'))
+    }
+    rows = [{'elder': None, 'feed': feeds.pop(None, None)}]
+    rows += [
+        {'elder': elder, 'feed': feeds.pop(elder.pk, None)}
+        for elder in across_scope(request, elders.order_by('full_name'))
+    ]
+    # Feeds for elders picked elsewhere (administrators can subscribe to any elder)
+    rows += [{'elder': feed.elder, 'feed': feed} for feed in feeds.values()]
+    for row in rows:
+        if row['feed']:
+            row['url'] = request.build_absolute_uri(reverse('calendar_feed', args=[row['feed'].token]))
+    return render(request, 'calendar_feeds.html', {'rows': rows})
+
 @login_required
 def appointment_add(request):
     if request.method == 'POST':
@@ -409,24 +620,58 @@ def appointment_delete(request, appointment_id):
     return render(request, 'appointment_confirm_delete.html', context)
 
 @login_required
+@replica_reads
 def care_task_list(request, elder_id=None):
     if elder_id:
         elder = get_object_or_404(ElderProfile, pk=elder_id)
-        tasks = CareTask.objects.filter(elder=elder).order_by('-created_at')
+        tasks = CareTask.objects.filter(elder=elder)
     else:
         elder = None
         try:
             user_profile = request.user.profile
             if user_profile and user_profile.user_type == 'ADMIN':
-                tasks = CareTask.objects.all().order_by('-created_at')
+                tasks = CareTask.objects.all()
             else:
                 elders = ElderProfile.objects.filter(guardian=request.user)
-                tasks = CareTask.objects.filter(elder__in=elders).order_by('-created_at')
+                tasks = CareTask.objects.filter(elder__in=elders)
         except UserProfile.DoesNotExist:
             elders = ElderProfile.objects.filter(guardian=request.user)
-            tasks = CareTask.objects.filter(elder__in=elders).order_by('-created_at')
+            tasks = CareTask.objects.filter(elder__in=elders)
+        tasks = across_scope(request, tasks)
+    
+    status = request.GET.get('status', '')
+    priority = request.GET.get('priority', '')
+    assignee = request.GET.get('assignee', '')
+    if status in dict(CareTask.STATUS_CHOICES):
+        tasks = tasks.filter(status=status)
+    else:
+        status = ''
+    if priority in CareTask.PRIORITY_RANKS:
+        tasks = tasks.filter(priority_rank=CareTask.PRIORITY_RANKS[priority])
+    else:
+        priority = ''
+    if assignee == 'me':
+        tasks = tasks.filter(assigned_to=request.user)
+    elif assignee == 'unassigned':
+        tasks = tasks.filter(assigned_to__isnull=True)
+    else:
+        assignee = ''
+    
+    if status:
+        # A single status is a work queue: most urgent first, read in order from the queue indexes
+        tasks = tasks.order_by('priority_rank', 'due_date')
+    else:
+        tasks = tasks.order_by('-created_at')
     
-    context = {'tasks': tasks, 'elder': elder}
+    context = {
+        'tasks': tasks.select_related('elder', 'assigned_to'),
+        'elder': elder,
+        'status': status,
+        'priority': priority,
+        'assignee': assignee,
+        'status_choices': CareTask.STATUS_CHOICES,
+        'priority_choices': CareTask.PRIORITY_CHOICES,
+    }
     return render(request, 'care_task_list.html', context)
 
 @login_required
@@ -434,7 +679,13 @@ def care_task_add(request):
     if request.method == 'POST':
         form = CareTaskForm(request.POST)
         if form.is_valid():
-            task = form.save()
+            with sharding.atomic():
+                task = form.save()
+                if task.task_type in ('DAILY', 'WEEKLY', 'MONTHLY') and task.due_date:
+                    start_series(
+                        task, interval=form.cleaned_data['repeat_interval'] or 1,
+                        ends_at=form.cleaned_data['repeat_until'],
+                    )
             messages.success(request, f'Care task "{task.title}" created successfully!')
             return redirect('care_task_list')
     else:
@@ -494,7 +745,11 @@ def care_task_complete(request, task_id):
         task.status = 'COMPLETED'
         task.completed_at = timezone.now()
         task.completed_by = request.user
-        task.save()
+        with sharding.atomic():
+            task.save()
+            if task.recurrence_id:
+                # Normally the generate_recurring_tasks job has already created the next occurrences
+                generate_occurrences(rule_ids=[task.recurrence_id])
         messages.success(request, f'Task "{task.title}" marked as completed!')
         return redirect('care_task_list')
     
@@ -506,17 +761,16 @@ def emergency_contacts(request, elder_id):
     elder = get_object_or_404(ElderProfile, pk=elder_id)
     contacts = EmergencyContact.objects.filter(elder=elder).select_related('created_by', 'updated_by')
     
-    # Get contact statistics
-    total_contacts = contacts.count()
-    primary_contacts = contacts.filter(is_primary=True).count()
-    recent_updates = contacts.filter(updated_at__gte=timezone.now() - timedelta(days=7)).count()
+    # Get contact statistics in a single aggregate query
+    stats = EmergencyContact.objects.filter(elder=elder).summary(
+        since=timezone.now() - timedelta(days=7)
+    )
     
     context = {
         'elder': elder, 
         'contacts': contacts,
-        'total_contacts': total_contacts,
-        'primary_contacts': primary_contacts,
-        'recent_updates': recent_updates
+        'primary_contact': EmergencyContact.objects.primary_for(elder),
+        **stats
     }
     return render(request, 'emergency_contacts.html', context)
 
@@ -534,22 +788,20 @@ def emergency_contact_add(request, elder_id):
             
             # Validate primary contact uniqueness
             if contact.is_primary:
-                existing_primary = EmergencyContact.objects.filter(
-                    elder=elder, 
-                    is_primary=True
-                ).first()
+                existing_primary = EmergencyContact.objects.primary_for(elder)
                 if existing_primary:
                     messages.warning(request, f'Primary contact already exists ({existing_primary.name}). This contact will be set as primary instead.')
             
-            contact.save()
-            
-            # Create notification for contact addition
-            Notification.objects.create(
-                elder=elder,
-                notification_type='GENERAL',
-                message=f'New emergency contact added: {contact.name} ({contact.relation})',
-                priority='MEDIUM'
-            )
+            with sharding.atomic():
+                contact.save()
+                
+                # Notify about the contact addition
+                enqueue_notification(
+                    elder,
+                    f'New emergency contact added: {contact.name} ({contact.relation})',
+                    priority='MEDIUM',
+                    key=action_key(contact, 'added')
+                )
             
             messages.success(request, f'Emergency contact {contact.name} added successfully!')
             return redirect('emergency_contacts', elder_id=elder.pk)
@@ -573,9 +825,8 @@ def emergency_contact_edit(request, contact_id):
             
             contact = form.save(commit=False)
             contact.updated_by = request.user
-            contact.save()
             
-            # Create notification for significant changes
+            # Notify about significant changes
             changes = []
             if old_name != contact.name:
                 changes.append(f"name from '{old_name}' to '{contact.name}'")
@@ -584,13 +835,15 @@ def emergency_contact_edit(request, contact_id):
             if old_is_primary != contact.is_primary:
                 changes.append("primary contact status")
             
-            if changes:
-                Notification.objects.create(
-                    elder=contact.elder,
-                    notification_type='GENERAL',
-                    message=f'Emergency contact updated: {", ".join(changes)}',
-                    priority='MEDIUM'
-                )
+            with sharding.atomic():
+                contact.save()
+                if changes:
+                    enqueue_notification(
+                        contact.elder,
+                        f'Emergency contact updated: {", ".join(changes)}',
+                        priority='MEDIUM',
+                        key=action_key(contact, 'updated')
+                    )
             
             messages.success(request, f'Emergency contact {contact.name} updated successfully!')
             return redirect('emergency_contacts', elder_id=contact.elder.pk)
@@ -605,17 +858,16 @@ def emergency_contact_delete(request, contact_id):
     contact = get_object_or_404(EmergencyContact, pk=contact_id)
     
     if request.method == 'POST':
-        # Create notification before deletion
-        Notification.objects.create(
-            elder=contact.elder,
-            notification_type='GENERAL',
-            message=f'Emergency contact deleted: {contact.name} ({contact.relation})',
-            priority='HIGH'
-        )
-        
         contact_name = contact.name
-        elder_id = contact.elder.pk
-        contact.delete()
+        elder_id = contact.elder_id
+        with sharding.atomic():
+            enqueue_notification(
+                contact.elder,
+                f'Emergency contact deleted: {contact.name} ({contact.relation})',
+                priority='HIGH',
+                key=action_key(contact, 'deleted')
+            )
+            contact.delete()
         
         messages.success(request, f'Emergency contact {contact_name} deleted successfully!')
         return redirect('emergency_contacts', elder_id=elder_id)
@@ -624,15 +876,18 @@ def emergency_contact_delete(request, contact_id):
     return render(request, 'emergency_contact_confirm_delete.html', context)
 
 @login_required
+@conditional_page(vitals_list_validator)
 def vitals_list(request, elder_id=None):
     search_form = SearchForm(request.GET)
     query = request.GET.get('query', '')
     category = request.GET.get('category', 'all')
+    include_archived = request.GET.get('archived') == '1'
     
     if elder_id:
         elder = get_object_or_404(ElderProfile, pk=elder_id)
         vitals = VitalsLog.objects.filter(elder=elder).order_by('-recorded_at')
         elders = [elder]
+        archived_elders = [elder.pk]
     else:
         elder = None
         try:
@@ -640,12 +895,17 @@ def vitals_list(request, elder_id=None):
             if user_profile and user_profile.user_type == 'ADMIN':
                 vitals = VitalsLog.objects.all().order_by('-recorded_at')
                 elders = ElderProfile.objects.all()
+                archived_elders = None
             else:
                 elders = ElderProfile.objects.filter(guardian=request.user)
                 vitals = VitalsLog.objects.filter(elder__in=elders).order_by('-recorded_at')
+                archived_elders = elders
         except UserProfile.DoesNotExist:
             elders = ElderProfile.objects.filter(guardian=request.user)
             vitals = VitalsLog.objects.filter(elder__in=elders).order_by('-recorded_at')
+            archived_elders = elders
+        vitals = across_scope(request, vitals)
+        elders = across_scope(request, elders)
     
     # Apply search filter if query is provided
     if query:
@@ -661,8 +921,29 @@ def vitals_list(request, elder_id=None):
             Q(oxygen_saturation__icontains=query)
         )
     
-    context = {'elder': elder, 'vitals': vitals, 'elders': elders, 'search_form': search_form, 'query': query}
-    return render(request, 'vitals_list.html', context)
+    # Rows are streamed in chunks; each row shows its elder and who logged it
+    vitals = vitals.select_related('elder', 'logged_by')
+    # Months moved to the archive files are only read when asked for; see archive.py
+    has_archive = across_scope(request, archive.archived_months(VitalsLog, archived_elders)).exists()
+    if include_archived and has_archive:
+        vitals = archive.WithArchive(vitals, archived_elders, _vital_matches(query) if query else None)
+    context = {
+        'elder': elder, 'vitals': vitals, 'elders': elders, 'search_form': search_form, 'query': query,
+        'has_archive': has_archive, 'include_archived': include_archived,
+    }
+    return stream_render(request, 'vitals_list.html', context)
+
+def _vital_matches(query):
+    """vitals_list's search for archived rows, which the database cannot filter"""
+    query = query.lower()
+
+    def matches(vital):
+        values = [
+            vital.elder.full_name, vital.notes, vital.blood_pressure_systolic, vital.blood_pressure_diastolic,
+            vital.heart_rate, vital.temperature, vital.weight, vital.blood_sugar, vital.oxygen_saturation,
+        ]
+        return any(value is not None and query in str(value).lower() for value in values)
+    return matches
 
 @login_required
 def vitals_add(request, elder_id=None):
@@ -722,7 +1003,13 @@ def vitals_delete(request, vital_id):
 
 @login_required
 def vitals_detail(request, vital_id):
-    vital = get_object_or_404(VitalsLog, pk=vital_id)
+    vital = VitalsLog.objects.filter(pk=vital_id).first()
+    if vital is None:
+        # Archived rows are linked with their elder, whose files are the only ones read
+        elder_id = request.GET.get('elder_id', '')
+        vital = archive.find(VitalsLog, vital_id, int(elder_id) if elder_id.isdigit() else None)
+        if vital is None:
+            raise Http404('No vital signs record matches the given query.')
     
     # Check permissions
     try:
@@ -764,6 +1051,7 @@ def quick_vitals(request, elder_id):
     return render(request, 'quick_vitals.html', context)
 
 @login_required
+@replica_reads
 def incident_list(request, elder_id=None):
     if elder_id:
         elder = get_object_or_404(ElderProfile, pk=elder_id)
@@ -780,6 +1068,7 @@ def incident_list(request, elder_id=None):
         except UserProfile.DoesNotExist:
             elders = ElderProfile.objects.filter(guardian=request.user)
             incidents = IncidentReport.objects.filter(elder__in=elders).order_by('-incident_date')
+        incidents = across_scope(request, incidents)
     
     context = {'incidents': incidents, 'elder': elder}
     return render(request, 'incident_list.html', context)
@@ -791,15 +1080,17 @@ def incident_add(request):
         if form.is_valid():
             incident = form.save(commit=False)
             incident.reported_by = request.user
-            incident.save()
-            
-            # Create notification
-            Notification.objects.create(
-                elder=incident.elder,
-                notification_type='INCIDENT',
-                message=f'New incident reported: {incident.incident_type} - {incident.description[:50]}...',
-                priority='HIGH'
-            )
+            with sharding.atomic():
+                incident.save()
+                
+                # Notify about the incident
+                enqueue_notification(
+                    incident.elder,
+                    f'New incident reported: {incident.incident_type} - {incident.description[:50]}...',
+                    notification_type='INCIDENT',
+                    priority='HIGH',
+                    key=action_key(incident, 'reported')
+                )
             
             messages.success(request, 'Incident report created successfully!')
             return redirect('incident_list')
@@ -842,6 +1133,7 @@ def incident_delete(request, incident_id):
     return render(request, 'incident_confirm_delete.html', context)
 
 @login_required
+@conditional_page(notification_list_validator)
 def notification_list(request):
     try:
         user_profile = request.user.profile
@@ -858,7 +1150,7 @@ def notification_list(request):
             Q(elder__in=elders) | Q(elder__isnull=True)
         ).order_by('-created_at')
     
-    context = {'notifications': notifications}
+    context = {'notifications': across_scope(request, notifications)}
     return render(request, 'notification_list.html', context)
 
 
@@ -879,11 +1171,15 @@ def notification_delete(request, notification_id):
 def notification_mark_all_read(request):
     if request.method == 'POST':
         notifications = Notification.objects.filter(is_read=False)
-        notifications.update(
-            is_read=True,
-            read_at=timezone.now(),
-            read_by=request.user
-        )
+        now = timezone.now()
+        with sharding.atomic():
+            record_changes(Notification, notifications.values_list('pk', flat=True))
+            notifications.update(
+                is_read=True,
+                read_at=now,
+                read_by=request.user,
+                updated_at=now
+            )
         messages.success(request, 'All notifications marked as read!')
     
     return redirect('notification_list')
@@ -940,6 +1236,7 @@ def register(request):
     return render(request, 'registration/register.html', context)
 
 @login_required
+@replica_reads
 def search(request):
     search_form = SearchForm(request.GET)
     query = request.GET.get('query', '')
@@ -990,7 +1287,7 @@ def search(request):
     context = {
         'search_form': search_form,
         'query': query,
-        'results': results,
+        'results': {name: across_scope(request, rows) for name, rows in results.items()},
     }
     return render(request, 'search_results.html', context)
 
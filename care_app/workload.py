@@ -0,0 +1,166 @@
+"""
+Caregiver workloads and automatic task assignment.
+
+Each caregiver has a CaregiverWorkload row counting their open tasks, plain
+and weighted by priority. Signals (see signals.py) recompute the rows of the
+caregivers a task write touches once the transaction commits, the same way
+care summaries are kept current, so reading a load is one primary-key read.
+
+auto_assign() hands unassigned open tasks to the caregivers assigned to each
+task's elder (ElderProfile.caregivers). Tasks are placed most urgent first,
+each on whichever of its elder's caregivers has the lowest weighted load at
+that moment. Elders looked after by the same team share a min-heap of loads;
+a caregiver can sit in several teams' heaps, so an entry whose load has grown
+since it was pushed is pushed again with the current load when it reaches the
+top. Picking a caregiver is O(log team size), and the whole run is a few
+reads plus one UPDATE per caregiver and chunk of tasks.
+"""
+import heapq
+from collections import defaultdict, namedtuple
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Count, Sum, Value, When
+from django.utils import timezone
+
+from . import cache_versions, sharding
+from .changelog import record_changes
+from .models import CaregiverWorkload, CareTask, ElderProfile
+from .summary import schedule_refresh as schedule_summary_refresh
+
+# Overdue tasks still have to be done, so they count towards the load
+OPEN_STATUSES = ['PENDING', 'IN_PROGRESS', 'OVERDUE']
+PRIORITY_WEIGHTS = {'URGENT': 8, 'HIGH': 4, 'MEDIUM': 2, 'LOW': 1}
+REFRESH_BATCH_SIZE = 500
+UPDATE_BATCH_SIZE = 1000
+
+Assignment = namedtuple('Assignment', ['assigned', 'unassignable', 'caregivers'])
+
+_WEIGHT = Case(
+    *[When(priority=priority, then=Value(weight)) for priority, weight in PRIORITY_WEIGHTS.items()],
+    default=Value(PRIORITY_WEIGHTS['MEDIUM']),
+)
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def refresh_workloads(user_ids=None):
+    """Recompute the workload rows of ``user_ids`` (every user if None) from the live tasks"""
+    if user_ids is None:
+        user_ids = User.objects.values_list('pk', flat=True)
+    for batch in _chunks({user_id for user_id in user_ids if user_id is not None}, REFRESH_BATCH_SIZE):
+        # A caregiver can look after elders on several shards
+        rows = (
+            CareTask.objects.across_shards().filter(assigned_to__in=batch, status__in=OPEN_STATUSES)
+            .order_by().values('assigned_to').annotate(open_tasks=Count('pk'), weighted_load=Sum(_WEIGHT))
+        )
+        loads = defaultdict(lambda: {'open_tasks': 0, 'weighted_load': 0})
+        for row in rows:
+            for name in ('open_tasks', 'weighted_load'):
+                loads[row['assigned_to']][name] += row[name]
+        now = timezone.now()
+        CaregiverWorkload.objects.bulk_create(
+            [
+                CaregiverWorkload(
+                    user_id=user_id,
+                    open_tasks=loads.get(user_id, {}).get('open_tasks', 0),
+                    weighted_load=loads.get(user_id, {}).get('weighted_load', 0),
+                    updated_at=now,
+                )
+                for user_id in batch
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['open_tasks', 'weighted_load', 'updated_at'],
+        )
+
+
+def schedule_refresh(user_ids):
+    """Refresh the workloads of ``user_ids`` once the surrounding transaction commits"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: refresh_workloads(user_ids))
+
+
+def _teams(elder_ids):
+    """Active caregivers assigned to each of ``elder_ids``"""
+    Team = ElderProfile.caregivers.through
+    teams = defaultdict(set)
+    for batch in _chunks(elder_ids, REFRESH_BATCH_SIZE):
+        rows = Team.objects.filter(elderprofile_id__in=batch, user__is_active=True)
+        for elder_id, user_id in rows.values_list('elderprofile_id', 'user_id'):
+            teams[elder_id].add(user_id)
+    return {elder_id: frozenset(team) for elder_id, team in teams.items()}
+
+
+def _loads(user_ids):
+    """Current (weighted load, open tasks) of each caregiver, creating missing workload rows"""
+    loads = {}
+    for batch in _chunks(user_ids, REFRESH_BATCH_SIZE):
+        missing = set(batch) - set(
+            CaregiverWorkload.objects.filter(user_id__in=batch).values_list('user_id', flat=True)
+        )
+        refresh_workloads(missing)
+        rows = CaregiverWorkload.objects.filter(user_id__in=batch)
+        for user_id, weighted, count in rows.values_list('user_id', 'weighted_load', 'open_tasks'):
+            loads[user_id] = (weighted, count)
+    return loads
+
+
+def auto_assign(tasks):
+    """
+    Assign the unassigned open tasks in the ``tasks`` queryset to the least
+    loaded caregiver of their elder. Tasks whose elder has no caregivers stay
+    unassigned. Returns an Assignment of counts.
+    """
+    with sharding.atomic():
+        # Locked so two concurrent runs cannot both hand out the same task
+        rows = list(
+            tasks.filter(assigned_to__isnull=True, status__in=OPEN_STATUSES)
+            .select_for_update(skip_locked=True)
+            .order_by('priority_rank', 'due_date')
+            .values_list('pk', 'elder_id', 'priority')
+        )
+        teams = _teams({elder_id for _, elder_id, _ in rows})
+        loads = _loads({user_id for team in teams.values() for user_id in team})
+
+        heaps = {}
+        picked = defaultdict(list)
+        unassignable = 0
+        for task_id, elder_id, priority in rows:
+            team = teams.get(elder_id)
+            if not team:
+                unassignable += 1
+                continue
+            heap = heaps.get(team)
+            if heap is None:
+                heap = heaps[team] = [(*loads[user_id], user_id) for user_id in team]
+                heapq.heapify(heap)
+            # Entries pushed before the caregiver took tasks from another team's heap are stale
+            while heap[0][:2] != loads[heap[0][2]]:
+                user_id = heap[0][2]
+                heapq.heapreplace(heap, (*loads[user_id], user_id))
+            user_id = heap[0][2]
+            weighted, count = loads[user_id]
+            loads[user_id] = (weighted + PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS['MEDIUM']), count + 1)
+            heapq.heapreplace(heap, (*loads[user_id], user_id))
+            picked[user_id].append(task_id)
+
+        now = timezone.now()
+        for user_id, task_ids in picked.items():
+            for batch in _chunks(task_ids, UPDATE_BATCH_SIZE):
+                CareTask.objects.filter(pk__in=batch).update(assigned_to_id=user_id, updated_at=now)
+
+        # Bulk updates bypass the signals, so do their work here
+        assigned_ids = [task_id for task_ids in picked.values() for task_id in task_ids]
+        elder_ids = {elder_id for task_id, elder_id, _ in rows if elder_id in teams}
+        record_changes(CareTask, assigned_ids)
+        schedule_summary_refresh(elder_ids, ['care_tasks'])
+        for elder_id in elder_ids:
+            transaction.on_commit(lambda elder_id=elder_id: cache_versions.bump('caretask', elder_id))
+        refresh_workloads(picked)
+    return Assignment(len(assigned_ids), unassignable, len(picked))